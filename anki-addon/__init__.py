@@ -5,47 +5,19 @@ Syncs flashcards from cloud database to Anki Desktop
 
 from aqt import gui_hooks, mw
 from aqt.qt import QAction
-from aqt.utils import showInfo, tooltip
 
+from .background_sync import runner
 from .gui import show_settings_dialog
-from .sync_service import sync_flashcards
+from .sync_service import close_session
 
 
 def on_sync_flashcards():
     """
     Main sync action - called when user clicks sync button
-    """
-    try:
-        config = mw.addonManager.getConfig(__name__)
-
-        # Validate config
-        user_id = config.get("user_id")
-        if not user_id:
-            showInfo(
-                "Please configure your User ID first!\n\n"
-                "Go to: Tools → Add-ons → Flashcard Sync → Config\n\n"
-                "Copy your User ID from the Chrome extension settings."
-            )
-            return
-
-        # Show progress
-        tooltip("Syncing flashcards...", parent=mw)
-
-        # Perform sync
-        result = sync_flashcards(user_id, config.get("api_url"), config.get("deck_name"))
-
-        # Show result
-        if result["success"]:
-            count = result["synced_count"]
-            if count > 0:
-                tooltip(f"✅ Synced {count} flashcard{'s' if count != 1 else ''}!", parent=mw)
-            else:
-                tooltip("No new flashcards to sync.", parent=mw)
-        else:
-            showInfo(f"❌ Sync failed:\n\n{result['error']}")
 
-    except Exception as e:
-        showInfo(f"❌ Error during sync:\n\n{str(e)}")
+    The sync runs in the background; its result is shown when it finishes.
+    """
+    runner.sync_now(manual=True)
 
 
 def on_show_settings():
@@ -69,5 +41,16 @@ def setup_menu():
     mw.form.menuTools.addAction(settings_action)
 
 
+def on_config_updated(config):
+    """Apply auto-sync changes made in Anki's add-on config editor (already saved)"""
+    runner.start()
+
+
 # Initialize addon when Anki starts
 gui_hooks.main_window_did_init.append(setup_menu)
+
+# Auto-sync runs while a profile (and with it the collection) is open
+gui_hooks.profile_did_open.append(runner.start)
+gui_hooks.profile_will_close.append(runner.stop)
+gui_hooks.profile_will_close.append(close_session)
+mw.addonManager.setConfigUpdatedAction(__name__, on_config_updated)
@@ -0,0 +1,195 @@
+"""
+Background sync: runs network I/O off Anki's main thread and auto-syncs when new cards arrive
+"""
+
+import random
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aqt import mw
+from aqt.qt import QTimer
+from aqt.utils import showInfo, tooltip
+
+from .sync_service import load_cursor, sync_flashcards, wait_for_changes
+
+# Longest wait between auto-sync attempts after repeated failures
+MAX_BACKOFF_SECONDS = 60 * 60
+
+# Wait before retrying when the collection was busy at the scheduled time
+BUSY_RETRY_SECONDS = 30
+
+# Scheduled syncs are spread by up to this fraction of the interval
+INTERVAL_JITTER = 0.1
+
+
+def _config() -> Dict[str, Any]:
+    return mw.addonManager.getConfig(__name__) or {}
+
+
+def _collection_busy() -> bool:
+    """Whether the collection is closed or another operation (e.g. Anki's own sync) is running"""
+    return mw.col is None or mw.progress.busy()
+
+
+class SyncRunner:
+    """Runs syncs in the background, one at a time, and schedules auto-sync
+
+    A sync does its HTTP requests on a worker thread; sync_service hands each
+    batch of collection changes to the main thread, so Anki stays responsive.
+    Scheduled syncs are skipped while the collection is busy, and failures
+    back off exponentially (with jitter) up to MAX_BACKOFF_SECONDS.
+
+    Between syncs, auto-sync also long-polls the server, which answers as
+    soon as new cards arrive. The interval timer stays as a fallback for
+    servers without the long-poll endpoint.
+    """
+
+    def __init__(self):
+        self._running = False
+        self._watching = False
+        self._failures = 0
+        self._timer: Optional[QTimer] = None
+        # (user_id, api_url) -> change version the last sync saw, including its own acknowledgements
+        self._seen_versions: Dict[Tuple[str, str], int] = {}
+
+    def start(self):
+        """Arm auto-sync from the current config (profile opened or settings changed)"""
+        self.schedule()
+        self.watch()
+
+    def sync_now(self, manual: bool = True):
+        """Start a sync unless one is already running"""
+        if self._running:
+            if manual:
+                tooltip("Flashcard sync is already running.", parent=mw)
+            return
+
+        config = _config()
+        user_id = config.get("user_id")
+        if not user_id:
+            if manual:
+                showInfo(
+                    "Please configure your User ID first!\n\n"
+                    "Go to: Tools → Add-ons → Flashcard Sync → Config\n\n"
+                    "Copy your User ID from the Chrome extension settings."
+                )
+            return
+
+        self._running = True
+        progress: Optional[Callable[[int], None]] = None
+        if manual:
+            mw.progress.start(label="Syncing flashcards...", immediate=True)
+
+            def report_progress(done: int):
+                mw.taskman.run_on_main(lambda: mw.progress.update(label=f"Imported {done} flashcards..."))
+
+            progress = report_progress
+
+        mw.taskman.run_in_background(
+            lambda: sync_flashcards(user_id, config.get("api_url"), config.get("deck_name"), progress=progress),
+            lambda future: self._on_done(future, manual, (user_id, config.get("api_url"))),
+        )
+
+    def _on_done(self, future: Future, manual: bool, account: Tuple[str, str]):
+        """Report the result on the main thread and schedule the next auto-sync"""
+        self._running = False
+        if manual:
+            mw.progress.finish()
+
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        if result["success"]:
+            self._failures = 0
+            if result.get("version") is not None:
+                # The watcher waits past this, so the sync's own acknowledgements do not start another one
+                self._seen_versions[account] = result["version"]
+            count = result["synced_count"]
+            if count > 0:
+                tooltip(f"✅ Synced {count} flashcard{'s' if count != 1 else ''}!", parent=mw)
+            elif manual:
+                tooltip("No new flashcards to sync.", parent=mw)
+        else:
+            self._failures += 1
+            if manual:
+                showInfo(f"❌ Sync failed:\n\n{result['error']}")
+            else:
+                print(f"[Flashcard Sync] Auto-sync failed ({self._failures} in a row): {result['error']}")
+
+        self.schedule()
+        if not self._failures:
+            self.watch()
+
+    def schedule(self, delay_seconds: Optional[float] = None):
+        """(Re)arm the auto-sync timer from the current config; stops it when auto-sync is off"""
+        self.stop()
+        config = _config()
+        if not config.get("auto_sync") or mw.col is None:
+            return
+
+        if delay_seconds is None:
+            delay_seconds = self._next_delay(config.get("sync_interval_minutes", 5) * 60)
+        self._timer = mw.progress.timer(int(delay_seconds * 1000), self._on_timer, False, parent=mw)
+
+    def _next_delay(self, interval_seconds: float) -> float:
+        if self._failures:
+            # Exponential backoff with full jitter so clients that failed together retry apart
+            backoff = min(interval_seconds * 2 ** min(self._failures, 16), MAX_BACKOFF_SECONDS)
+            return random.uniform(interval_seconds, max(interval_seconds, backoff))
+        return interval_seconds * random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+
+    def _on_timer(self):
+        self._timer = None
+        if self._running:
+            # A manual sync is underway; its completion schedules the next one
+            return
+        if _collection_busy():
+            print("[Flashcard Sync] Collection busy, postponing auto-sync")
+            self.schedule(BUSY_RETRY_SECONDS)
+            return
+        self.sync_now(manual=False)
+
+    def watch(self):
+        """Long-poll for new cards in the background; a change starts a sync"""
+        config = _config()
+        if self._watching or not config.get("auto_sync") or not config.get("user_id") or mw.col is None:
+            return
+
+        user_id, api_url = config["user_id"], config.get("api_url")
+        cursor = load_cursor(user_id, api_url)
+        version = self._seen_versions.get((user_id, api_url))
+        self._watching = True
+        mw.taskman.run_in_background(lambda: wait_for_changes(user_id, api_url, cursor, version), self._on_watch_done)
+
+    def _on_watch_done(self, future: Future):
+        self._watching = False
+        try:
+            changed = future.result()
+        except Exception as e:
+            # Server unreachable or without long-poll: the interval timer keeps syncing
+            print(f"[Flashcard Sync] Waiting for new cards failed: {str(e)}")
+            return
+
+        if not _config().get("auto_sync"):
+            # Auto-sync was turned off while the long-poll was waiting
+            return
+        if not changed:
+            self.watch()
+        elif self._running:
+            # The running sync picks the changes up and watches again when done
+            return
+        elif _collection_busy():
+            self.schedule(BUSY_RETRY_SECONDS)
+        else:
+            self.sync_now(manual=False)
+
+    def stop(self):
+        """Cancel the pending auto-sync, if any"""
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+
+runner = SyncRunner()
@@ -15,6 +15,7 @@ from aqt.qt import (
 )
 from aqt.utils import showInfo
 
+from .background_sync import runner
 from .sync_service import test_connection
 
 
@@ -65,10 +66,9 @@ class SettingsDialog(QDialog):
         self.deck_input.setPlaceholderText("Default")
         layout.addWidget(self.deck_input)
 
-        # Auto-sync section (future feature)
+        # Auto-sync section
         auto_sync_layout = QHBoxLayout()
         self.auto_sync_checkbox = QCheckBox("Enable auto-sync")
-        self.auto_sync_checkbox.setEnabled(False)  # Disabled for now
         auto_sync_layout.addWidget(self.auto_sync_checkbox)
 
         auto_sync_layout.addWidget(QLabel("Interval (minutes):"))
@@ -76,7 +76,6 @@ class SettingsDialog(QDialog):
         self.interval_spinbox.setMinimum(1)
         self.interval_spinbox.setMaximum(60)
         self.interval_spinbox.setValue(5)
-        self.interval_spinbox.setEnabled(False)  # Disabled for now
         auto_sync_layout.addWidget(self.interval_spinbox)
         auto_sync_layout.addStretch()
         layout.addLayout(auto_sync_layout)
@@ -157,6 +156,7 @@ class SettingsDialog(QDialog):
         }
 
         mw.addonManager.writeConfig(__name__, config)
+        runner.start()
         showInfo("✅ Settings saved!")
         self.accept()
 
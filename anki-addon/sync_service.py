@@ -2,106 +2,437 @@
 API communication service for syncing flashcards
 """
 
-from typing import Any, Dict
+import importlib.util
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import requests
 from aqt import mw
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    from anki.collection import AddNoteRequest
+except ImportError:  # Anki < 2.1.55 has no bulk add; notes are added one at a time
+    AddNoteRequest = None
 
-def sync_flashcards(user_id: str, api_url: str, deck_name: str) -> Dict[str, Any]:
+
+# Cards requested per change feed page
+CHANGES_PAGE_SIZE = 100
+
+# Seconds the server holds fetched cards for this client before offering them again
+LEASE_SECONDS = 600
+
+# (connect, read) timeouts in seconds for API requests
+REQUEST_TIMEOUT = (5, 30)
+
+# Seconds the server holds a long-poll for new cards open before answering "no change"
+WAIT_SECONDS = 25
+
+# Collection config key holding the change feed cursor per server and user
+CURSOR_CONFIG_KEY = "flashcard_sync_cursors"
+
+# Collection config key holding imported cards whose acknowledgement has not reached the server
+UNACKED_CONFIG_KEY = "flashcard_sync_unacked"
+
+# Notes added per main-thread task; keeps each pause of Anki's UI short
+NOTE_BATCH_SIZE = 100
+
+# Label of the undo step covering everything one sync added
+UNDO_LABEL = "Sync Flashcards"
+
+# Called with the number of cards imported so far
+ProgressCallback = Callable[[int], None]
+
+T = TypeVar("T")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _accept_encoding() -> str:
+    """Encodings requests can decode here; brotli only when a decoder ships with this Anki"""
+    encodings = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+def get_session() -> requests.Session:
+    """Shared HTTP session, so syncs reuse keep-alive connections instead of new TCP+TLS handshakes"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers["Accept-Encoding"] = _accept_encoding()
+            # Retry only requests that never reached the server. Fetching changes leases
+            # cards, so a retried GET after a 502 from a proxy (or a dropped response)
+            # would skip cards the server already leased to the lost response
+            retries = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.5)
+            session.mount("http://", HTTPAdapter(max_retries=retries))
+            session.mount("https://", HTTPAdapter(max_retries=retries))
+            _session = session
+        return _session
+
+
+def close_session():
+    """Close the shared session's connections (e.g. when the profile closes)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _on_main(fn: Callable[[], T]) -> T:
+    """Run ``fn`` on Anki's main thread and wait for its result
+
+    The collection may only be used from the main thread, while a sync does
+    its network I/O on a background thread. On the main thread ``fn`` simply
+    runs inline.
     """
-    Fetch pending flashcards from API and add them to Anki
+    if threading.current_thread() is threading.main_thread():
+        return fn()
 
-    Args:
-        user_id: User's unique identifier
-        api_url: Base API URL (e.g., http://localhost:8000)
-        deck_name: Name of deck to add cards to
+    future: Future = Future()
 
-    Returns:
-        Dict with success status and count of synced cards
+    def run():
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    mw.taskman.run_on_main(run)
+    return future.result()
+
+
+class _UndoGroup:
+    """Folds the collection changes of one sync into a single undo step
+
+    Changes arrive in several main-thread tasks. If the user changed the
+    collection in between, a new step is started instead of merging their
+    change into the sync's.
+    """
+
+    def __init__(self):
+        self._entry = None
+        self._last_step = None
+
+    def apply(self, change: Callable[[], T]) -> T:
+        """Run ``change`` on the main thread as part of this group's undo step"""
+        if self._entry is None or mw.col.undo_status().last_step != self._last_step:
+            self._entry = mw.col.add_custom_undo_entry(UNDO_LABEL)
+        try:
+            return change()
+        finally:
+            mw.col.merge_undo_entries(self._entry)
+            self._last_step = mw.col.undo_status().last_step
+
+
+def _cursor_key(user_id: str, api_url: str) -> str:
+    return f"{api_url.rstrip('/')}|{user_id}"
+
+
+def load_cursor(user_id: str, api_url: str) -> Optional[str]:
+    """Change feed cursor saved by the last sync into this collection (None before the first sync)"""
+    return mw.col.get_config(CURSOR_CONFIG_KEY, {}).get(_cursor_key(user_id, api_url))
+
+
+def save_cursor(user_id: str, api_url: str, cursor: str):
+    """Remember how far this collection has read the user's change feed"""
+    cursors = mw.col.get_config(CURSOR_CONFIG_KEY, {})
+    cursors[_cursor_key(user_id, api_url)] = cursor
+    mw.col.set_config(CURSOR_CONFIG_KEY, cursors)
+
+
+def _load_unacked(user_id: str, api_url: str) -> Dict[str, List[int]]:
+    """Imported card ids per lease that still need to be acknowledged"""
+    return mw.col.get_config(UNACKED_CONFIG_KEY, {}).get(_cursor_key(user_id, api_url), {})
+
+
+def _save_unacked(user_id: str, api_url: str, unacked: Dict[str, List[int]]):
+    pending = mw.col.get_config(UNACKED_CONFIG_KEY, {})
+    if unacked:
+        pending[_cursor_key(user_id, api_url)] = unacked
+    else:
+        pending.pop(_cursor_key(user_id, api_url), None)
+    mw.col.set_config(UNACKED_CONFIG_KEY, pending)
+
+
+def _new_note(card_data: Dict[str, Any], model):
+    """Build an unsaved note for a flashcard; the deck is chosen when it is added"""
+    note = mw.col.new_note(model)
+    note.fields[0] = card_data.get("front", "")  # Front field
+    note.fields[1] = card_data.get("back", "")  # Back field
+
+    tags = card_data.get("tags", "")
+    if tags:
+        note.tags = tags.split(",")
+    return note
+
+
+def _add_note_batch(cards: List[Dict[str, Any]], model, deck_id: int) -> Tuple[List[int], List[int]]:
+    """Add one batch of cards to a deck; returns (added ids, failed ids)"""
+    notes = []
+    failed_ids = []
+    for card_data in cards:
+        try:
+            notes.append((card_data.get("id"), _new_note(card_data, model)))
+        except Exception as e:
+            print(f"[Flashcard Sync] ✗ Failed to build card {card_data.get('id')}: {str(e)}")
+            failed_ids.append(card_data.get("id"))
+
+    if AddNoteRequest is not None:
+        try:
+            # One backend call and one transaction for the whole batch
+            mw.col.add_notes([AddNoteRequest(note=note, deck_id=deck_id) for _, note in notes])
+            return [card_id for card_id, _ in notes], failed_ids
+        except Exception as e:
+            # Nothing from the batch was added; find the bad cards one by one
+            print(f"[Flashcard Sync] Bulk add failed, adding {len(notes)} cards individually: {str(e)}")
+
+    added_ids = []
+    for card_id, note in notes:
+        try:
+            mw.col.add_note(note, deck_id)
+            added_ids.append(card_id)
+        except Exception as e:
+            print(f"[Flashcard Sync] ✗ Failed to add card {card_id}: {str(e)}")
+            failed_ids.append(card_id)
+    return added_ids, failed_ids
+
+
+def _add_notes(
+    flashcards: List[Dict[str, Any]],
+    model,
+    deck_name: str,
+    progress: Optional[ProgressCallback] = None,
+    undo: Optional[_UndoGroup] = None,
+) -> Tuple[List[int], List[int]]:
+    """Add flashcards as notes, grouped by deck, as a single undo step; returns (added ids, failed ids)
+
+    Each deck is looked up (or created) once and its cards are added
+    NOTE_BATCH_SIZE at a time, each batch in its own main-thread task.
+    ``progress`` is called after every batch. Pass ``undo`` to share one
+    undo step across several calls.
+    """
+    by_deck: Dict[str, List[Dict[str, Any]]] = {}
+    for card_data in flashcards:
+        # Fall back to the configured deck when the card does not name one
+        by_deck.setdefault(card_data.get("deck_name") or deck_name, []).append(card_data)
+
+    undo = undo or _UndoGroup()
+    added_ids = []
+    failed_ids = []
+    for card_deck_name, cards in by_deck.items():
+        # _on_main waits for each task, so the lambdas never outlive their loop values
+        deck_id = _on_main(lambda: undo.apply(lambda: mw.col.decks.id(card_deck_name)))
+        for start in range(0, len(cards), NOTE_BATCH_SIZE):
+            batch = cards[start : start + NOTE_BATCH_SIZE]
+            added, failed = _on_main(lambda: undo.apply(lambda: _add_note_batch(batch, model, deck_id)))
+            added_ids += added
+            failed_ids += failed
+            print(f"[Flashcard Sync] Added {len(added)} cards to '{card_deck_name}' ({len(failed)} failed)")
+            if progress is not None:
+                progress(len(added_ids) + len(failed_ids))
+
+    return added_ids, failed_ids
+
+
+def _acknowledge(api_url: str, user_id: str, lease_id: Optional[str], synced_ids: List[int]) -> Optional[Dict[str, Any]]:
+    """Mark imported cards as synced and return the server's answer (None when it failed)
+
+    Acknowledgements are idempotent per lease, so retrying is safe.
     """
     try:
-        # 1. Fetch pending flashcards from API
-        request_url = f"{api_url}/api/v1/flashcards/pending/{user_id}"
-        print(f"[Flashcard Sync] Fetching pending flashcards from: {request_url}")
-        print(f"[Flashcard Sync] User ID: {user_id}")
+        sync_url = f"{api_url}/api/v1/flashcards/sync"
+        print(f"[Flashcard Sync] Marking {len(synced_ids)} cards as synced (lease={lease_id})")
+        sync_response = get_session().post(
+            sync_url,
+            json={"user_id": user_id, "flashcard_ids": synced_ids, "lease_id": lease_id},
+            timeout=REQUEST_TIMEOUT,
+        )
+        sync_response.raise_for_status()
+        result = sync_response.json()
+        print(f"[Flashcard Sync] Successfully marked cards as synced: {result}")
+        return result
+    except Exception as e:
+        print(f"[Flashcard Sync] Failed to mark cards as synced: {str(e)}")
+        return None
 
-        response = requests.get(request_url, timeout=10)
+
+def _retry_acknowledgements(api_url: str, user_id: str) -> Dict[str, List[int]]:
+    """Resend acknowledgements that failed during earlier syncs; returns those still outstanding"""
+    unacked = _on_main(lambda: _load_unacked(user_id, api_url))
+    for lease_id, card_ids in list(unacked.items()):
+        if _acknowledge(api_url, user_id, lease_id, card_ids) is not None:
+            del unacked[lease_id]
+    _on_main(lambda: _save_unacked(user_id, api_url, unacked))
+    return unacked
+
+
+def _report_failed(api_url: str, user_id: str, lease_id: Optional[str], failed_ids: List[int]) -> Optional[Dict[str, Any]]:
+    """Tell the API which cards could not be added to Anki, in one request; returns its answer"""
+    if not failed_ids:
+        return None
+    try:
+        response = get_session().post(
+            f"{api_url}/api/v1/flashcards/failed",
+            json={"user_id": user_id, "flashcard_ids": failed_ids, "lease_id": lease_id},
+            timeout=REQUEST_TIMEOUT,
+        )
         response.raise_for_status()
-        flashcards = response.json()
+        result = response.json()
+        print(f"[Flashcard Sync] Reported {result['failed_count']} cards as failed")
+        return result
+    except Exception as e:
+        print(f"[Flashcard Sync] Failed to report {len(failed_ids)} cards as failed: {str(e)}")
+        return None
 
-        print(f"[Flashcard Sync] Received {len(flashcards)} pending flashcards")
 
-        if not flashcards:
-            return {"success": True, "synced_count": 0, "message": "No pending flashcards found"}
+def _seen_version(page_version: Optional[int], own_versions: List[Optional[int]]) -> Optional[int]:
+    """Latest change version a sync has seen, counting the versions its own writes created
 
-        # 2. Get the note type (Basic is default)
-        model = mw.col.models.by_name("Basic")
-        if not model:
-            return {"success": False, "error": "Basic note type not found. Please ensure you have the default note types."}
+    Every change up to the last page's version was in the feed. The sync's
+    own acknowledgements and failure reports only count while they directly
+    follow it: a gap means another client changed cards in between.
+    """
+    if page_version is None:
+        return None
+    seen = page_version
+    for version in sorted(version for version in own_versions if version is not None):
+        if version > seen + 1:
+            break
+        seen = max(seen, version)
+    return seen
 
-        # 3. Add each flashcard to Anki
-        synced_ids = []
-        failed_cards = []
 
-        print(f"[Flashcard Sync] Processing {len(flashcards)} flashcards...")
+def _fetch_changes(changes_url: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Fetch one page of the change feed after ``cursor``, leasing its pending cards"""
+    params = {"limit": CHANGES_PAGE_SIZE, "lease_seconds": LEASE_SECONDS}
+    if cursor:
+        params["cursor"] = cursor
+    response = get_session().get(changes_url, params=params, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
 
-        for idx, card_data in enumerate(flashcards, 1):
-            try:
-                card_id = card_data.get("id")
-                print(f"[Flashcard Sync] Processing card {idx}/{len(flashcards)}: ID={card_id}")
 
-                # Get deck name from flashcard data, fallback to config default
-                card_deck_name = card_data.get("deck_name", deck_name)
-                deck_id = mw.col.decks.id(card_deck_name)
+def wait_for_changes(user_id: str, api_url: str, cursor: Optional[str], version: Optional[int] = None) -> bool:
+    """Block until the server has changes after ``cursor`` (True) or the long-poll times out (False)
+
+    ``version`` is the change version the last sync has seen (see
+    ``sync_flashcards``), so the sync's own acknowledgements do not count as
+    new changes.
+    """
+    params: Dict[str, Any] = {"timeout": WAIT_SECONDS}
+    if cursor:
+        params["cursor"] = cursor
+    if version is not None:
+        params["version"] = version
+    response = get_session().get(
+        f"{api_url}/api/v1/flashcards/changes/{user_id}/wait",
+        params=params,
+        timeout=(REQUEST_TIMEOUT[0], WAIT_SECONDS + REQUEST_TIMEOUT[1]),
+    )
+    response.raise_for_status()
+    return response.json()["changed"]
 
-                # Create new note
-                note = mw.col.newNote(model)
-                note.note_type()["did"] = deck_id
 
-                # Set fields
-                note.fields[0] = card_data.get("front", "")  # Front field
-                note.fields[1] = card_data.get("back", "")  # Back field
+def sync_flashcards(user_id: str, api_url: str, deck_name: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """
+    Fetch new flashcards from the API's change feed and add them to Anki
 
-                # Add tags
-                tags = card_data.get("tags", "")
-                if tags:
-                    note.tags = tags.split(",")
+    Only cards created or changed since the cursor saved by the previous sync
+    are downloaded, one page at a time. The next page is fetched while the
+    current one is imported. The cursor is saved after every page, so an
+    interrupted sync resumes where it stopped.
+
+    Pending cards are leased to this client while it imports them and then
+    acknowledged with their lease. Acknowledgements that fail are kept in the
+    collection and retried on the next sync, so cards are never imported twice.
+
+    Safe to call from a background thread: HTTP requests run on the calling
+    thread and every collection access is handed to the main thread.
+
+    Args:
+        user_id: User's unique identifier
+        api_url: Base API URL (e.g., http://localhost:8000)
+        deck_name: Name of deck to add cards to
+        progress: Called with the number of cards imported so far during the sync
+
+    Returns:
+        Dict with success status, count of synced cards and the change
+        ``version`` the sync has seen, including its own writes (None when
+        the server does not report versions)
+    """
+    try:
+        # Get the note type (Basic is default)
+        model = _on_main(lambda: mw.col.models.by_name("Basic"))
+        if not model:
+            return {"success": False, "error": "Basic note type not found. Please ensure you have the default note types."}
+
+        changes_url = f"{api_url}/api/v1/flashcards/changes/{user_id}"
+        cursor = _on_main(lambda: load_cursor(user_id, api_url))
+        print(f"[Flashcard Sync] Fetching changes from: {changes_url} (cursor={cursor})")
+        print(f"[Flashcard Sync] User ID: {user_id}")
 
-                # Add note to collection
-                mw.col.addNote(note)
-                synced_ids.append(card_id)
-                print(f"[Flashcard Sync] ✓ Successfully added card {card_id} to Anki")
+        # Cards imported by an earlier sync whose acknowledgement never arrived
+        unacked = _retry_acknowledgements(api_url, user_id)
+        already_imported = {card_id for card_ids in unacked.values() for card_id in card_ids}
 
-            except Exception as e:
-                error_msg = f"Failed to add card {card_data.get('id')}: {str(e)}"
-                print(f"[Flashcard Sync] ✗ {error_msg}")
-                failed_cards.append(card_data.get("id"))
-                continue
+        synced_count = 0
+        failed_count = 0
+        # Change versions created by this sync's acknowledgements and failure reports
+        own_versions: List[Optional[int]] = []
+        undo = _UndoGroup()
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            next_page = prefetcher.submit(_fetch_changes, changes_url, cursor)
+            while True:
+                # 1. Take the page fetched while the previous one was imported
+                page = next_page.result()
+                if page["has_more"]:
+                    # Fetch the next page while this one goes into the collection
+                    next_page = prefetcher.submit(_fetch_changes, changes_url, page["next_cursor"])
 
-        print(f"[Flashcard Sync] Summary: {len(synced_ids)} successful, {len(failed_cards)} failed")
+                # Changes also include cards that were already synced or failed
+                flashcards = [card for card in page["changes"] if card.get("status") == "pending"]
+                print(f"[Flashcard Sync] Received {len(page['changes'])} changes, {len(flashcards)} pending")
 
-        # 5. Save changes to collection
-        mw.col.save()
+                # 2. Add the pending cards and acknowledge them under this page's lease
+                if flashcards:
+                    new_cards = [card for card in flashcards if card.get("id") not in already_imported]
+                    imported_before = synced_count + failed_count
+                    page_progress = (lambda done: progress(imported_before + done)) if progress else None
+                    synced_ids, failed_ids = _add_notes(new_cards, model, deck_name, page_progress, undo)
+                    synced_ids += [card["id"] for card in flashcards if card.get("id") in already_imported]
 
-        # 6. Mark flashcards as synced in database
-        if synced_ids:
-            try:
-                sync_url = f"{api_url}/api/v1/flashcards/sync"
-                sync_payload = {"user_id": user_id, "flashcard_ids": synced_ids}
-                print(f"[Flashcard Sync] Marking {len(synced_ids)} cards as synced")
-                print(f"[Flashcard Sync] Sync URL: {sync_url}")
-                print(f"[Flashcard Sync] Payload: {sync_payload}")
+                    lease_id = page.get("lease_id")
+                    if synced_ids:
+                        acknowledged = _acknowledge(api_url, user_id, lease_id, synced_ids)
+                        if acknowledged is None:
+                            unacked[lease_id] = synced_ids
+                            _on_main(lambda: _save_unacked(user_id, api_url, unacked))
+                        else:
+                            own_versions.append(acknowledged.get("version"))
+                    reported = _report_failed(api_url, user_id, lease_id, failed_ids)
+                    if reported is not None:
+                        own_versions.append(reported.get("version"))
+                    synced_count += len(synced_ids)
+                    failed_count += len(failed_ids)
 
-                sync_response = requests.post(sync_url, json=sync_payload, timeout=10)
-                sync_response.raise_for_status()
+                # 3. Only move the cursor once the page is in the collection
+                cursor = page["next_cursor"]
+                _on_main(lambda: save_cursor(user_id, api_url, cursor))
+                if not page["has_more"]:
+                    break
 
-                print(f"[Flashcard Sync] Successfully marked cards as synced: {sync_response.json()}")
-            except Exception as e:
-                print(f"[Flashcard Sync] Failed to mark cards as synced: {str(e)}")
-                # Continue anyway - cards are already in Anki
+        print(f"[Flashcard Sync] Summary: {synced_count} successful, {failed_count} failed")
 
-        return {"success": True, "synced_count": len(synced_ids)}
+        version = _seen_version(page.get("version"), own_versions)
+        if not synced_count and not failed_count:
+            return {"success": True, "synced_count": 0, "version": version, "message": "No pending flashcards found"}
+        return {"success": True, "synced_count": synced_count, "version": version}
 
     except requests.exceptions.ConnectionError as e:
         error_msg = f"Cannot connect to API at {api_url}\n\nMake sure the server is running.\n\nDetails: {str(e)}"
@@ -132,7 +463,7 @@ def test_connection(api_url: str) -> Dict[str, Any]:
         Dict with success status and message
     """
     try:
-        response = requests.get(f"{api_url}/health", timeout=5)
+        response = get_session().get(f"{api_url}/health", timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return {"success": True, "message": "✅ Connected successfully!"}
     except requests.exceptions.ConnectionError:
@@ -1,37 +1,142 @@
-from typing import Callable, Dict, Type, TypeVar
+import inspect
+import threading
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
 
 from fcg.config.settings import Settings
+from fcg.utils.logging import logger
 
 T = TypeVar("T")
 
+Hook = Callable[[Any], Any]
+
+
+class Lifetime(str, Enum):
+    """How long a resolved service instance lives"""
+
+    SINGLETON = "singleton"  # One instance per container, disposed at shutdown
+    TRANSIENT = "transient"  # A new instance on every get()
+
+
+class _Registration:
+    """Factory and lifecycle hooks for one interface"""
+
+    def __init__(
+        self,
+        factory: Callable[[Settings], object],
+        lifetime: Lifetime,
+        warm_up: Optional[Hook] = None,
+        dispose: Optional[Hook] = None,
+        eager: bool = False,
+    ):
+        self.factory = factory
+        self.lifetime = lifetime
+        self.warm_up = warm_up
+        self.dispose = dispose
+        self.eager = eager
+
+
+async def _run_hook(hook: Hook, instance: object):
+    """Call a sync or async lifecycle hook"""
+    result = hook(instance)
+    if inspect.isawaitable(result):
+        await result
+
 
 class ServiceContainer:
-    """Simple dependency injection container"""
+    """Simple dependency injection container with singleton and transient lifetimes"""
 
     def __init__(self, settings: Settings):
         self.settings = settings
         self._services: Dict[Type, object] = {}
-        self._factories: Dict[Type, Callable[[Settings], object]] = {}
+        self._registrations: Dict[Type, _Registration] = {}
+        # Singletons in creation order so shutdown disposes dependents first
+        self._created: List[Type] = []
+        self._lock = threading.RLock()
+
+    def register_factory(
+        self,
+        interface: Type,
+        factory: Callable[[Settings], object],
+        lifetime: Lifetime = Lifetime.SINGLETON,
+        warm_up: Optional[Hook] = None,
+        dispose: Optional[Hook] = None,
+        eager: bool = False,
+    ):
+        """Register a factory function for an interface.
 
-    def register_factory(self, interface: Type, factory: Callable[[Settings], object]):
-        """Register a factory function for an interface"""
-        self._factories[interface] = factory
+        Args:
+            interface: Type used to look the service up
+            factory: Builds an instance from the application settings
+            lifetime: How long a built instance is reused
+            warm_up: Called with a singleton right after it is built at startup
+            dispose: Called with a singleton when the container shuts down
+            eager: Build this singleton during startup instead of on first use
+        """
+        self._registrations[interface] = _Registration(factory, lifetime, warm_up, dispose, eager)
+
+    def register_singleton(self, interface: Type, factory: Callable[[Settings], object], **hooks: Any):
+        """Register a factory whose instance is shared for the container's lifetime"""
+        self.register_factory(interface, factory, Lifetime.SINGLETON, **hooks)
+
+    def register_transient(self, interface: Type, factory: Callable[[Settings], object]):
+        """Register a factory that builds a new instance on every get()"""
+        self.register_factory(interface, factory, Lifetime.TRANSIENT)
 
     def register_instance(self, interface: Type, instance: object):
         """Register a singleton instance for an interface"""
         self._services[interface] = instance
 
+    def is_registered(self, interface: Type) -> bool:
+        """Whether get() can resolve the interface"""
+        return interface in self._services or interface in self._registrations
+
     def get(self, interface: Type[T]) -> T:
         """Get an instance of the requested interface"""
         if interface in self._services:
             return self._services[interface]  # type: ignore
 
-        if interface in self._factories:
-            instance = self._factories[interface](self.settings)
-            self._services[interface] = instance
-            return instance  # type: ignore
+        registration = self._registrations.get(interface)
+        if registration is None:
+            raise ValueError(f"No registration found for {interface}")
+
+        if registration.lifetime == Lifetime.TRANSIENT:
+            return registration.factory(self.settings)  # type: ignore
+
+        with self._lock:
+            # Re-check under the lock so concurrent first calls build one instance
+            if interface not in self._services:
+                self._services[interface] = registration.factory(self.settings)
+                self._created.append(interface)
+            return self._services[interface]  # type: ignore
+
+    async def startup(self):
+        """Build eager singletons and run their warm-up hooks"""
+        for interface, registration in self._registrations.items():
+            if registration.lifetime != Lifetime.SINGLETON or not (registration.eager or registration.warm_up):
+                continue
+            instance = self.get(interface)
+            if registration.warm_up is not None:
+                await _run_hook(registration.warm_up, instance)
+
+    async def shutdown(self):
+        """Dispose built singletons in reverse creation order"""
+        with self._lock:
+            created, self._created = self._created, []
+            instances = [(interface, self._services.pop(interface)) for interface in reversed(created)]
+
+        for interface, instance in instances:
+            await self._dispose(interface, instance)
 
-        raise ValueError(f"No registration found for {interface}")
+    async def _dispose(self, interface: Type, instance: object):
+        registration = self._registrations.get(interface)
+        if registration is None or registration.dispose is None:
+            return
+        try:
+            await _run_hook(registration.dispose, instance)
+        except Exception as e:
+            # One failing hook must not keep the rest from being released
+            logger.warning("Disposing %s failed: %s", getattr(interface, "__name__", interface), e)
 
     def get_settings(self) -> Settings:
         """Get application settings"""
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -11,15 +11,84 @@ class Settings(BaseSettings):
     openrouter_url: str = "https://openrouter.ai/api/v1/chat/completions"
     openrouter_model: str = "qwen/qwen3-4b:free"
     openrouter_max_tokens: int = 4096
+    # Tried in order when openrouter_model keeps failing (JSON list in the environment)
+    openrouter_fallback_models: List[str] = []
+
+    # LLM resilience settings
+    llm_stage_deadlines: Dict[str, float] = {"analysis": 45.0, "prioritization": 30.0, "generation": 60.0, "fused": 60.0}
+    llm_stage_default_deadline_seconds: float = 60.0
+    llm_max_retries: int = 2  # Retries per model for 429/5xx/timeouts
+    llm_backoff_base_seconds: float = 0.5
+    llm_backoff_max_seconds: float = 8.0
+    llm_hedging_enabled: bool = False  # Send a duplicate request once a stage passes its p95 latency
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20  # Latency samples needed before hedging starts
+
+    # LLM executor settings
+    llm_max_workers: int = 16  # Maximum concurrent LLM calls per process
+    llm_max_queue: int = 256  # Maximum calls waiting for a worker (0 = unbounded)
+    llm_timeout_seconds: float = 120.0  # Per-call deadline, including queue wait
+    llm_http_max_connections: int = 32  # Pooled HTTP connections shared by all LMs
+    llm_http_max_keepalive_connections: int = 16
+    llm_eager_init: bool = False  # Build the default LM at startup instead of on the first generation
+
+    # Inputs up to this many words use the single-call "fast" tier when the tier is auto
+    fast_tier_max_words: int = 600
+
+    # Longer inputs are split into chunks of about this many words and generated in parallel
+    chunk_max_words: int = 1500
+    max_cards_per_request: int = 50  # Upper bound on merged cards from chunked generation
+
+    # Identical concurrent /generate requests from one user share a single LLM call.
+    # "per_caller": each request still saves its own rows; "shared": duplicates return the first request's rows
+    generation_coalescing_enabled: bool = True
+    generation_coalesce_mode: Literal["per_caller", "shared"] = "per_caller"
+
+    # Generation cache settings (stored in the application database)
+    generation_cache_enabled: bool = True
+    generation_cache_ttl_seconds: int = 7 * 24 * 3600  # Entries older than this are ignored and evicted
+    generation_cache_max_entries: int = 10000  # Least recently used entries beyond this are evicted
+
+    # In-process memo for the analysis and prioritization pipeline stages
+    stage_memo_max_entries: int = 1024
+    stage_memo_ttl_seconds: float = 3600.0
 
     # Notion API settings
     notion_api_key: Optional[str] = None
     notion_page_id: Optional[str] = None
 
+    # AnkiConnect export
+    anki_connect_url: str = "http://127.0.0.1:8765"
+    anki_connect_connect_timeout_seconds: float = 3.0  # Fail fast when Anki is not running
+    anki_connect_timeout_seconds: float = 30.0  # Per-request deadline, so a hung Anki cannot block an export forever
+    anki_connect_batch_size: int = 500  # Notes per addNotes request
+    anki_connect_max_concurrency: int = 2  # Requests in flight to Anki at once from the API
+    anki_connect_export_deadline_seconds: float = 120.0  # Whole-export deadline for API exports
+
     # Database settings - Auto-detects PostgreSQL vs SQLite
     postgres_enabled: bool = False  # Set to true to use PostgreSQL
     database_url: str = "sqlite:///data/flashcards.db"  # Default: local SQLite
 
+    # Connection pool settings (per engine, per process)
+    db_pool_size: int = 5  # Connections kept open
+    db_max_overflow: int = 10  # Extra connections allowed under burst load
+    db_pool_timeout_seconds: float = 30.0  # Wait for a free connection before failing
+    db_pool_recycle_seconds: int = 300  # Reconnect connections older than this
+
+    # SQLite tuning (file databases only)
+    sqlite_wal_enabled: bool = True  # WAL journaling lets readers run alongside the writer
+    sqlite_busy_timeout_ms: int = 5000  # Wait this long for another process's write lock
+    sqlite_synchronous: str = "NORMAL"  # NORMAL only fsyncs at checkpoints in WAL mode
+    sqlite_mmap_size: int = 268_435_456  # Bytes of the file read through mmap (0 disables)
+
+    # Group commit: coalesce writes from concurrent requests into shared transactions
+    db_group_commit_enabled: bool = False
+    db_group_commit_window_ms: float = 5.0  # How long the first write waits for others to join
+    db_group_commit_max_batch: int = 256  # Commit early once this many writes are waiting
+
+    # Long-poll: how often one shared query checks the change versions of all waiting users
+    change_poll_interval_seconds: float = 1.0
+
     # PostgreSQL settings (when postgres_enabled=true)
     postgres_host: Optional[str] = None  # Database host
     postgres_user: Optional[str] = None  # Database user
@@ -43,6 +112,7 @@ class Settings(BaseSettings):
     ]
     host: str = "0.0.0.0"
     port: int = 8000
+    gzip_minimum_size: int = 1000  # Gzip responses of at least this many bytes (0 disables)
 
     class Config:
         env_file = ".env"
@@ -55,10 +125,53 @@ class Settings(BaseSettings):
             "openrouter_url": "OPENROUTER_URL",
             "openrouter_model": "OPENROUTER_MODEL",
             "openrouter_max_tokens": "OPENROUTER_MAX_TOKENS",
+            "openrouter_fallback_models": "OPENROUTER_FALLBACK_MODELS",
+            "llm_stage_deadlines": "LLM_STAGE_DEADLINES",
+            "llm_stage_default_deadline_seconds": "LLM_STAGE_DEFAULT_DEADLINE_SECONDS",
+            "llm_max_retries": "LLM_MAX_RETRIES",
+            "llm_backoff_base_seconds": "LLM_BACKOFF_BASE_SECONDS",
+            "llm_backoff_max_seconds": "LLM_BACKOFF_MAX_SECONDS",
+            "llm_hedging_enabled": "LLM_HEDGING_ENABLED",
+            "llm_hedge_percentile": "LLM_HEDGE_PERCENTILE",
+            "llm_hedge_min_samples": "LLM_HEDGE_MIN_SAMPLES",
+            "llm_max_workers": "LLM_MAX_WORKERS",
+            "llm_max_queue": "LLM_MAX_QUEUE",
+            "llm_timeout_seconds": "LLM_TIMEOUT_SECONDS",
+            "llm_http_max_connections": "LLM_HTTP_MAX_CONNECTIONS",
+            "llm_http_max_keepalive_connections": "LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS",
+            "llm_eager_init": "LLM_EAGER_INIT",
+            "fast_tier_max_words": "FAST_TIER_MAX_WORDS",
+            "chunk_max_words": "CHUNK_MAX_WORDS",
+            "max_cards_per_request": "MAX_CARDS_PER_REQUEST",
+            "generation_coalescing_enabled": "GENERATION_COALESCING_ENABLED",
+            "generation_coalesce_mode": "GENERATION_COALESCE_MODE",
+            "generation_cache_enabled": "GENERATION_CACHE_ENABLED",
+            "generation_cache_ttl_seconds": "GENERATION_CACHE_TTL_SECONDS",
+            "generation_cache_max_entries": "GENERATION_CACHE_MAX_ENTRIES",
+            "stage_memo_max_entries": "STAGE_MEMO_MAX_ENTRIES",
+            "stage_memo_ttl_seconds": "STAGE_MEMO_TTL_SECONDS",
             "notion_api_key": "NOTION_API_KEY",
             "notion_page_id": "NOTION_PAGE_ID",
             "postgres_enabled": "POSTGRES_ENABLED",
             "database_url": "DATABASE_URL",
+            "db_pool_size": "DB_POOL_SIZE",
+            "db_max_overflow": "DB_MAX_OVERFLOW",
+            "db_pool_timeout_seconds": "DB_POOL_TIMEOUT_SECONDS",
+            "db_pool_recycle_seconds": "DB_POOL_RECYCLE_SECONDS",
+            "sqlite_wal_enabled": "SQLITE_WAL_ENABLED",
+            "sqlite_busy_timeout_ms": "SQLITE_BUSY_TIMEOUT_MS",
+            "sqlite_synchronous": "SQLITE_SYNCHRONOUS",
+            "sqlite_mmap_size": "SQLITE_MMAP_SIZE",
+            "db_group_commit_enabled": "DB_GROUP_COMMIT_ENABLED",
+            "db_group_commit_window_ms": "DB_GROUP_COMMIT_WINDOW_MS",
+            "db_group_commit_max_batch": "DB_GROUP_COMMIT_MAX_BATCH",
+            "change_poll_interval_seconds": "CHANGE_POLL_INTERVAL_SECONDS",
+            "anki_connect_url": "ANKI_CONNECT_URL",
+            "anki_connect_connect_timeout_seconds": "ANKI_CONNECT_CONNECT_TIMEOUT_SECONDS",
+            "anki_connect_timeout_seconds": "ANKI_CONNECT_TIMEOUT_SECONDS",
+            "anki_connect_batch_size": "ANKI_CONNECT_BATCH_SIZE",
+            "anki_connect_max_concurrency": "ANKI_CONNECT_MAX_CONCURRENCY",
+            "anki_connect_export_deadline_seconds": "ANKI_CONNECT_EXPORT_DEADLINE_SECONDS",
             "postgres_host": "POSTGRES_HOST",
             "postgres_user": "POSTGRES_USER",
             "postgres_password": "POSTGRES_PASSWORD",
@@ -68,4 +181,5 @@ class Settings(BaseSettings):
             "celery_broker_url": "CELERY_BROKER_URL",
             "celery_result_backend": "CELERY_RESULT_BACKEND",
             "use_celery": "USE_CELERY",
+            "gzip_minimum_size": "GZIP_MINIMUM_SIZE",
         }
@@ -13,6 +13,10 @@ Classes
 - ConfigurationError: Raised for configuration-related problems.
 - FlashcardGenerationError: Raised when flashcard creation or transformation
     fails.
+- GenerationTimeoutError: Raised when an LLM call misses its deadline
+    (subclass of FlashcardGenerationError).
+- GenerationCapacityError: Raised when the LLM executor queue is full
+    (subclass of FlashcardGenerationError).
 - RepositoryError: Raised for errors interacting with storage/repositories.
 - ExportError: Raised for export-related failures (e.g., file output, network).
 - ValidationError: Raised when input data fails validation checks.
@@ -70,6 +74,14 @@ class ValidationError(FlashcardGeneratorException):
     """Raised when data validation fails"""
 
 
+class GenerationTimeoutError(FlashcardGenerationError):
+    """Raised when an LLM call does not finish before its deadline"""
+
+
+class GenerationCapacityError(FlashcardGenerationError):
+    """Raised when there is no capacity left to queue another LLM call"""
+
+
 class AnkiConnectionError(ExportError):
     """Raised when cannot connect to Anki or AnkiConnect"""
 
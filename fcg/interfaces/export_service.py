@@ -8,3 +8,11 @@ class ExportService(ABC):
     @abstractmethod
     def export_flashcards(self, flashcards: List[Dict[str, Any]]) -> str:
         """Export flashcards and return file path or identifier"""
+
+
+class AsyncExportService(ABC):
+    """Abstract interface for exporting flashcards without blocking the event loop"""
+
+    @abstractmethod
+    async def export_flashcards(self, flashcards: List[Dict[str, Any]]) -> str:
+        """Export flashcards and return file path or identifier"""
@@ -1,11 +1,37 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fcg.schemas import GenerationTier
 
 
 class FlashcardGeneratorService(ABC):
     """Abstract interface for flashcard generation"""
 
     @abstractmethod
-    async def generate_flashcards(self, conversation: List[Dict[str, Any]]) -> List[dict]:
+    async def generate_flashcards(
+        self,
+        conversation: List[Dict[str, Any]],
+        bypass_cache: bool = False,
+        tier: GenerationTier = GenerationTier.AUTO,
+        user_id: Optional[str] = None,
+        model: Optional[str] = None,
+        num_cards: Optional[int] = None,
+    ) -> List[dict]:
         """Generate flashcards from conversation"""
         pass
+
+    async def stream_flashcards(
+        self,
+        conversation: List[Dict[str, Any]],
+        bypass_cache: bool = False,
+        tier: GenerationTier = GenerationTier.AUTO,
+        user_id: Optional[str] = None,
+        model: Optional[str] = None,
+        num_cards: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """Yield flashcards as they become available (default: all at once after generation)"""
+        cards = await self.generate_flashcards(
+            conversation, bypass_cache=bypass_cache, tier=tier, user_id=user_id, model=model, num_cards=num_cards
+        )
+        for card in cards:
+            yield card
@@ -1,22 +1,31 @@
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from fcg.config.container import ServiceContainer
 from fcg.config.settings import Settings
-from fcg.interfaces.export_service import ExportService
+from fcg.interfaces.export_service import AsyncExportService, ExportService
 from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
 from fcg.interfaces.flashcard_repository import FlashcardRepository
 from fcg.repositories.notion_repository import NotionFlashcardRepository
 from fcg.routes.flashcard_api import router as flashcard_router
 from fcg.routes.flashcard_generation import router as generation_router
 from fcg.schemas import FlashcardRequest, FlashcardResponse, TextFlashcardRequest
-from fcg.services.anki_export_service import AnkiExportService
-from fcg.services.database import db_service
+from fcg.services.anki_export_service import AnkiExportService, AsyncAnkiExportService
+from fcg.services.change_notifier import ChangeNotifier
+from fcg.services.database import GroupCommitter, db_service
+from fcg.services.generation_cache import GenerationCache
+from fcg.services.llm_client import LLMClient
 from fcg.services.openrouter_flashcard_service import OpenRouterFlashcardService
 from fcg.use_cases.flashcard_use_case import FlashcardUseCase
+from fcg.utils.flashcard_generator import GenerationContext
+from fcg.utils.llm_executor import LLMExecutor
+from fcg.utils.single_flight import SingleFlight
+from fcg.utils.stage_memo import StageMemos
 
 
 def create_app() -> FastAPI:
@@ -27,14 +36,96 @@ def create_app() -> FastAPI:
     # Create service container
     container = ServiceContainer(settings)
 
-    # Register services
-    container.register_factory(FlashcardGeneratorService, lambda s: OpenRouterFlashcardService(s))
-    container.register_factory(FlashcardRepository, lambda s: NotionFlashcardRepository(s))
-    container.register_factory(ExportService, lambda s: AnkiExportService())
+    # Register services; singletons are built once per app, never per request
+    container.register_singleton(
+        LLMClient, lambda s: LLMClient(s), warm_up=lambda client: client.warm_up(), dispose=lambda client: client.close()
+    )
+    container.register_singleton(
+        LLMExecutor,
+        lambda s: LLMExecutor(max_workers=s.llm_max_workers, max_queue=s.llm_max_queue, timeout=s.llm_timeout_seconds),
+        dispose=lambda executor: executor.shutdown(),
+    )
+    container.register_singleton(
+        GenerationCache,
+        lambda s: GenerationCache(
+            db_service,
+            ttl_seconds=s.generation_cache_ttl_seconds,
+            max_entries=s.generation_cache_max_entries,
+            enabled=s.generation_cache_enabled,
+        ),
+        dispose=lambda cache: cache.flush(),
+    )
+    container.register_singleton(
+        StageMemos, lambda s: StageMemos(max_entries=s.stage_memo_max_entries, ttl_seconds=s.stage_memo_ttl_seconds)
+    )
+    container.register_singleton(
+        GenerationContext,
+        lambda s: GenerationContext(
+            s,
+            container.get(LLMClient),
+            container.get(LLMExecutor),
+            container.get(GenerationCache),
+            container.get(StageMemos),
+        ),
+    )
+    container.register_singleton(
+        FlashcardGeneratorService,
+        lambda s: OpenRouterFlashcardService(s, context=container.get(GenerationContext)),
+        eager=True,
+    )
+    # Coalesces generate+save for duplicate requests when generation_coalesce_mode is "shared"
+    container.register_singleton(SingleFlight, lambda s: SingleFlight())
+    container.register_singleton(FlashcardRepository, lambda s: NotionFlashcardRepository(s))
+    container.register_singleton(
+        ExportService,
+        lambda s: AnkiExportService(
+            s.anki_connect_url,
+            timeout=s.anki_connect_timeout_seconds,
+            connect_timeout=s.anki_connect_connect_timeout_seconds,
+            batch_size=s.anki_connect_batch_size,
+        ),
+        dispose=lambda service: service.close(),
+    )
+    container.register_singleton(
+        AsyncExportService,
+        lambda s: AsyncAnkiExportService(
+            s.anki_connect_url,
+            timeout=s.anki_connect_timeout_seconds,
+            connect_timeout=s.anki_connect_connect_timeout_seconds,
+            batch_size=s.anki_connect_batch_size,
+            max_concurrency=s.anki_connect_max_concurrency,
+            deadline=s.anki_connect_export_deadline_seconds,
+        ),
+        dispose=lambda service: service.close(),
+    )
+    container.register_singleton(FlashcardUseCase, lambda s: FlashcardUseCase(container), eager=True)
+    container.register_singleton(
+        GroupCommitter,
+        lambda s: GroupCommitter(
+            lambda: db_service.AsyncSessionLocal(),
+            window_seconds=s.db_group_commit_window_ms / 1000,
+            max_batch=s.db_group_commit_max_batch,
+        ),
+        dispose=lambda committer: committer.close(),
+    )
+    container.register_singleton(
+        ChangeNotifier,
+        lambda s: ChangeNotifier(lambda: db_service.AsyncReadSessionLocal(), poll_interval=s.change_poll_interval_seconds),
+        dispose=lambda notifier: notifier.close(),
+    )
 
     # Initialize database
     db_service.init_database()
 
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        """Warm up app-scoped services at startup and release them at shutdown"""
+        await container.startup()
+        try:
+            yield
+        finally:
+            await container.shutdown()
+
     # Create FastAPI app with organized tags
     app = FastAPI(
         title="Flashcard Generator API",
@@ -46,6 +137,7 @@ def create_app() -> FastAPI:
         **Recommended Endpoints**: Use the "Flashcards API (Database)" section for all new integrations.
         """,
         version="2.0.0",
+        lifespan=lifespan,
         openapi_tags=[
             {
                 "name": "Flashcards API (Database)",
@@ -77,6 +169,10 @@ def create_app() -> FastAPI:
         max_age=600,
     )
 
+    # Compress large JSON (change feed pages, pending lists) for clients that accept gzip
+    if settings.gzip_minimum_size > 0:
+        app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size)
+
     # Store container in app state
     app.state.container = container
 
@@ -95,6 +191,22 @@ def create_app() -> FastAPI:
         """Check if the API service is healthy and running"""
         return {"status": "healthy", "service": "flashcard-generator", "version": "2.0.0"}
 
+    # Metrics endpoint
+    @app.get("/metrics", tags=["Health"])
+    async def get_metrics():
+        """Runtime gauges and counters for capacity monitoring"""
+        return {
+            "llm_executor": container.get(LLMExecutor).stats(),
+            "generation_cache": container.get(GenerationCache).stats(),
+            "stage_memos": container.get(StageMemos).stats(),
+            "generation_coalescing": container.get(GenerationContext).flight.stats(),
+            "persist_coalescing": container.get(SingleFlight).stats(),
+            "llm_client": container.get(LLMClient).stats(),
+            "database_pools": db_service.pool_stats(),
+            "group_commit": container.get(GroupCommitter).stats() if settings.db_group_commit_enabled else None,
+            "change_notifier": container.get(ChangeNotifier).stats(),
+        }
+
     # Config endpoint
     @app.get("/config", tags=["Config"])
     async def get_config():
@@ -127,7 +239,7 @@ async def create_flashcards(request: FlashcardRequest) -> FlashcardResponse:
     """
     try:
         # Get use case from container
-        use_case = FlashcardUseCase(app.state.container)
+        use_case = app.state.container.get(FlashcardUseCase)
 
         # Process the request
         response = await use_case.generate_and_save_flashcards(request)
@@ -163,7 +275,7 @@ async def create_flashcards_from_text(request: TextFlashcardRequest) -> Flashcar
     """
     try:
         # Get use case from container
-        use_case = FlashcardUseCase(app.state.container)
+        use_case = app.state.container.get(FlashcardUseCase)
 
         # Process the text request
         response = await use_case.generate_flashcards_from_text(request)
@@ -10,11 +10,13 @@ from fcg.models.api import (
 from fcg.models.api import FlashcardResponse as APIFlashcardResponse
 from fcg.models.flashcard import Flashcard as DBFlashcard
 from fcg.models.flashcard import FlashcardBatch
+from fcg.models.generation_cache import GenerationCacheEntry
 
 __all__ = [
     # Database models
     "DBFlashcard",
     "FlashcardBatch",
+    "GenerationCacheEntry",
     # API models
     "FlashcardCreate",
     "APIFlashcardResponse",
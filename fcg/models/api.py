@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
+from fcg.models.flashcard import AckOutcome
+
 
 class FlashcardCreate(BaseModel):
     """Model for creating a new flashcard"""
@@ -27,11 +29,14 @@ class FlashcardResponse(BaseModel):
     source_url: Optional[str] = None
     source_text: Optional[str] = None
     deck_name: str
+    batch_id: Optional[str] = None
     status: str
     created_at: datetime
     synced_at: Optional[datetime] = None
     tags: Optional[str] = None
     difficulty: Optional[str] = None
+    lease_id: Optional[str] = None  # Lease the card was last handed out under, if any
+    lease_expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -50,6 +55,54 @@ class SyncRequest(BaseModel):
 
     user_id: str
     flashcard_ids: List[int]
+    lease_id: Optional[str] = None  # Acknowledge cards received under this lease (idempotent)
+
+
+class SyncResponse(BaseModel):
+    """Result of acknowledging synced flashcards"""
+
+    message: str
+    user_id: str
+    lease_id: Optional[str] = None
+    synced_count: int  # Cards now synced, including ones acknowledged before
+    outcomes: Dict[int, AckOutcome]  # What happened to each requested id
+    version: Optional[int] = None  # The user's change version after this request; None when it changed nothing
+
+
+class FailureReport(BaseModel):
+    """Model for reporting flashcards a client could not import"""
+
+    user_id: str
+    flashcard_ids: List[int]
+    lease_id: Optional[str] = None  # Only fail cards received under this lease
+
+
+class FailureReportResponse(BaseModel):
+    """Result of a failure report"""
+
+    user_id: str
+    failed_count: int  # Cards now failed, including ones reported before
+    outcomes: Dict[int, AckOutcome]
+    version: Optional[int] = None  # The user's change version after this request; None when it changed nothing
+
+
+class FlashcardChangesResponse(BaseModel):
+    """One page of a user's change feed"""
+
+    user_id: str
+    changes: List[FlashcardResponse]
+    next_cursor: str  # Pass back as ``cursor`` to continue after this page
+    has_more: bool  # More changes are available right now
+    lease_id: Optional[str] = None  # Lease on the pending cards of this page, when one was requested
+    version: int = 0  # The user's change version before the page was read; every change up to it is in the feed
+
+
+class ChangeWaitResponse(BaseModel):
+    """Result of waiting for a user's changes"""
+
+    user_id: str
+    changed: bool  # Changes after the cursor exist; fetch them from /changes
+    version: int  # The user's current change version
 
 
 class UserStatsResponse(BaseModel):
@@ -1,28 +1,88 @@
 from datetime import datetime
+from enum import Enum
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, SmallInteger, String, Text, text
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
 
+# Flashcard statuses and their stored codes; append new statuses, never renumber
+FLASHCARD_STATUS_CODES = {"pending": 0, "synced": 1, "failed": 2}
+FLASHCARD_STATUS_NAMES = {code: name for name, code in FLASHCARD_STATUS_CODES.items()}
+
+
+class AckOutcome(str, Enum):
+    """What happened to one card of an acknowledgement or failure report"""
+
+    SYNCED = "synced"
+    ALREADY_SYNCED = "already_synced"  # Acknowledged before; repeating an ack is harmless
+    FAILED = "failed"
+    ALREADY_FAILED = "already_failed"
+    NOT_FOUND = "not_found"  # No such card for this user
+    LEASE_MISMATCH = "lease_mismatch"  # The card is held under another lease
+
+
+class FlashcardStatusType(TypeDecorator):
+    """Flashcard status stored as a SMALLINT code but exposed as its name"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return FLASHCARD_STATUS_CODES[value]
+        except KeyError:
+            raise ValueError(f"Unknown flashcard status: {value!r}") from None
+
+    def process_literal_param(self, value, dialect):
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return FLASHCARD_STATUS_NAMES.get(value, str(value))
+
 
 class Flashcard(Base):
     """Model for individual flashcards"""
 
     __tablename__ = "flashcards"
+    __table_args__ = (
+        # Serves per-user listings filtered by status and ordered by age
+        Index("ix_flashcards_user_status_created", "user_id", "status", "created_at"),
+        # Pending cards are the hot set; keep a small index over just those rows
+        Index(
+            "ix_flashcards_pending",
+            "user_id",
+            "created_at",
+            postgresql_where=text("status = 0"),
+            sqlite_where=text("status = 0"),
+        ),
+        # Serves the per-user change feed, paged by (change_seq, id)
+        Index("ix_flashcards_user_change", "user_id", "change_seq", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String(255), index=True, nullable=False)
+    user_id = Column(String(255), nullable=False)
     front = Column(Text, nullable=False)
     back = Column(Text, nullable=False)
     source_url = Column(String(500), nullable=True)
     source_text = Column(Text, nullable=True)
     deck_name = Column(String(255), default="Default")
+    batch_id = Column(String(100), index=True, nullable=True)  # FlashcardBatch.batch_id when created in a batch
 
     # Status tracking
-    status = Column(String(50), default="pending")  # pending, synced, failed
+    status = Column(FlashcardStatusType(), nullable=False, default="pending")  # see FLASHCARD_STATUS_CODES
     created_at = Column(DateTime, default=datetime.utcnow)
     synced_at = Column(DateTime, nullable=True)
+    # The user's change version (UserChangeVersion) at the card's last write
+    change_seq = Column(BigInteger, nullable=False, default=0, server_default=text("0"))
+    # Two-phase sync: a card handed to a client stays leased until acknowledged or expired
+    lease_id = Column(String(36), index=True, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)  # NULL once reclaimed; lease_id is kept for late acks
 
     # Metadata
     tags = Column(String(500), nullable=True)  # comma-separated
@@ -36,10 +96,19 @@ class FlashcardBatch(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String(255), index=True, nullable=False)
-    batch_id = Column(String(100), nullable=False)  # UUID for grouping
+    batch_id = Column(String(100), index=True, nullable=False)  # UUID for grouping
     source_url = Column(String(500), nullable=True)
     total_cards = Column(Integer, default=0)
     processed_cards = Column(Integer, default=0)
     status = Column(String(50), default="processing")  # processing, completed, failed
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+
+
+class UserChangeVersion(Base):
+    """Per-user counter bumped by every transaction that writes the user's flashcards"""
+
+    __tablename__ = "user_change_versions"
+
+    user_id = Column(String(255), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
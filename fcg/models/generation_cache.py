@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from fcg.models.flashcard import Base
+
+
+class GenerationCacheEntry(Base):
+    """Model for cached LLM flashcard generations, keyed by content hash"""
+
+    __tablename__ = "generation_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # sha256 hex digest
+    model = Column(String(255), nullable=False)
+    num_cards = Column(Integer, nullable=False)
+    pipeline_version = Column(String(50), nullable=False)
+    flashcards = Column(Text, nullable=False)  # JSON-encoded list of cards
+
+    # Usage tracking for TTL and size-based eviction
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
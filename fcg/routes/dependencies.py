@@ -0,0 +1,61 @@
+"""
+FastAPI dependencies shared by the routers.
+"""
+
+from typing import AsyncIterator
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fcg.config.container import ServiceContainer
+from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
+from fcg.services.change_notifier import ChangeNotifier
+from fcg.services.database import FlashcardWriter, GroupCommitter, SessionWriter, db_service
+from fcg.utils.single_flight import SingleFlight
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Request-scoped async database session.
+
+    The session (and its pooled connection) is closed as soon as the request
+    finishes, including when the handler raises.
+    """
+    async with db_service.AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db() -> AsyncIterator[AsyncSession]:
+    """Request-scoped async session for handlers that only read.
+
+    On SQLite this comes from a separate read-only pool, so reads never
+    queue behind the single writer connection.
+    """
+    async with db_service.AsyncReadSessionLocal() as db:
+        yield db
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """Dependency returning the app-scoped service container"""
+    return request.app.state.container
+
+
+def get_llm_service(container: ServiceContainer = Depends(get_container)) -> FlashcardGeneratorService:
+    """Dependency returning the app-scoped flashcard generator"""
+    return container.get(FlashcardGeneratorService)
+
+
+def get_change_notifier(container: ServiceContainer = Depends(get_container)) -> ChangeNotifier:
+    """Dependency returning the app-scoped long-poll notifier"""
+    return container.get(ChangeNotifier)
+
+
+def get_persist_flight(container: ServiceContainer = Depends(get_container)) -> SingleFlight:
+    """Dependency returning the app-scoped flight that coalesces generate+save"""
+    return container.get(SingleFlight)
+
+
+def get_writer(db: AsyncSession = Depends(get_db), container: ServiceContainer = Depends(get_container)) -> FlashcardWriter:
+    """Dependency running write operations, group-committed when DB_GROUP_COMMIT_ENABLED is set"""
+    if container.get_settings().db_group_commit_enabled:
+        return container.get(GroupCommitter)
+    return SessionWriter(db)
@@ -1,39 +1,45 @@
-from typing import List
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from fcg.exceptions import ValidationError
 from fcg.models.api import (
+    ChangeWaitResponse,
+    FailureReport,
+    FailureReportResponse,
     FlashcardBatchCreate,
+    FlashcardChangesResponse,
     FlashcardCreate,
     FlashcardResponse,
     SyncRequest,
+    SyncResponse,
     UserStatsResponse,
 )
-from fcg.services.database import FlashcardService, db_service
+from fcg.models.flashcard import AckOutcome
+from fcg.routes.dependencies import get_change_notifier, get_read_db, get_writer
+from fcg.services.change_notifier import ChangeNotifier
+from fcg.services.database import AsyncFlashcardService, FlashcardWriter, decode_change_cursor, encode_change_cursor
 
 router = APIRouter(prefix="/api/v1/flashcards", tags=["Flashcards API (Database)"])
 
 
-def get_db():
-    """Dependency to get database session"""
-    return next(db_service.get_db())
-
-
 @router.post("/", response_model=FlashcardResponse)
-async def create_flashcard(flashcard: FlashcardCreate, db: Session = Depends(get_db)):
+async def create_flashcard(flashcard: FlashcardCreate, writer: FlashcardWriter = Depends(get_writer)):
     """Create a single flashcard"""
     try:
-        service = FlashcardService(db)
-        result = service.add_flashcard(
-            user_id=flashcard.user_id,
-            front=flashcard.front,
-            back=flashcard.back,
-            source_url=flashcard.source_url,
-            source_text=flashcard.source_text,
-            deck_name=flashcard.deck_name,
-            tags=flashcard.tags,
-            difficulty=flashcard.difficulty,
+        result = await writer.run(
+            lambda service: service.add_flashcard(
+                user_id=flashcard.user_id,
+                front=flashcard.front,
+                back=flashcard.back,
+                source_url=flashcard.source_url,
+                source_text=flashcard.source_text,
+                deck_name=flashcard.deck_name,
+                tags=flashcard.tags,
+                difficulty=flashcard.difficulty,
+                commit=False,
+            )
         )
         return FlashcardResponse.model_validate(result)
     except Exception as e:
@@ -41,37 +47,49 @@ async def create_flashcard(flashcard: FlashcardCreate, db: Session = Depends(get
 
 
 @router.post("/batch", response_model=List[FlashcardResponse])
-async def create_flashcard_batch(batch: FlashcardBatchCreate, db: Session = Depends(get_db)):
+async def create_flashcard_batch(batch: FlashcardBatchCreate, writer: FlashcardWriter = Depends(get_writer)):
     """Create multiple flashcards in a batch"""
+
+    async def save(service: AsyncFlashcardService):
+        # Batch row and cards are committed together
+        batch_id = await service.create_batch(batch.user_id, batch.source_url, commit=False)
+        return await service.add_flashcards_bulk(
+            [flashcard_data.model_dump() for flashcard_data in batch.flashcards], batch_id=batch_id, commit=False
+        )
+
     try:
-        service = FlashcardService(db)
-        batch_id = service.create_batch(batch.user_id, batch.source_url)
-
-        results = []
-        for flashcard_data in batch.flashcards:
-            result = service.add_flashcard(
-                user_id=flashcard_data.user_id,
-                front=flashcard_data.front,
-                back=flashcard_data.back,
-                source_url=flashcard_data.source_url,
-                source_text=flashcard_data.source_text,
-                deck_name=flashcard_data.deck_name,
-                tags=flashcard_data.tags,
-                difficulty=flashcard_data.difficulty,
-            )
-            results.append(FlashcardResponse.model_validate(result))
+        flashcards = await writer.run(save)
 
-        return results
+        return [FlashcardResponse.model_validate(flashcard) for flashcard in flashcards]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create flashcard batch: {str(e)}")
 
 
+# Longest lease a client may ask for
+MAX_LEASE_SECONDS = 3600
+
+
 @router.get("/pending/{user_id}", response_model=List[FlashcardResponse])
-async def get_pending_flashcards(user_id: str, db: Session = Depends(get_db)):
-    """Get all pending flashcards for a user"""
+async def get_pending_flashcards(
+    user_id: str,
+    lease_seconds: Optional[int] = Query(None, ge=1, le=MAX_LEASE_SECONDS),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    writer: FlashcardWriter = Depends(get_writer),
+):
+    """Get pending flashcards for a user
+
+    Cards leased to a client are left out. With ``lease_seconds`` the
+    returned cards are leased to the caller for that long; acknowledge them
+    with their ``lease_id`` through ``/sync``.
+    """
     try:
-        service = FlashcardService(db)
-        flashcards = service.get_pending_flashcards(user_id)
+        if lease_seconds:
+            flashcards = await writer.run(
+                lambda service: service.lease_pending_flashcards(user_id, lease_seconds, limit=limit, commit=False)
+            )
+        else:
+            flashcards = await AsyncFlashcardService(db).get_pending_flashcards(user_id, limit=limit)
         print(f"[API] get_pending_flashcards: user_id={user_id}, found {len(flashcards)} pending cards")
         if flashcards:
             print(f"[API] Card IDs: {[fc.id for fc in flashcards]}")
@@ -80,34 +98,172 @@ async def get_pending_flashcards(user_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get pending flashcards: {str(e)}")
 
 
-@router.post("/sync")
-async def sync_flashcards(sync_request: SyncRequest, db: Session = Depends(get_db)):
-    """Mark flashcards as synced"""
+@router.get("/changes/{user_id}", response_model=FlashcardChangesResponse)
+async def get_flashcard_changes(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    lease_seconds: Optional[int] = Query(None, ge=1, le=MAX_LEASE_SECONDS),
+    db: AsyncSession = Depends(get_read_db),
+    writer: FlashcardWriter = Depends(get_writer),
+):
+    """Get cards created or changed since ``cursor`` (from the start when omitted)
+
+    Each page returns ``next_cursor``; store it and send it with the next
+    request to receive only newer changes.
+
+    With ``lease_seconds`` the page's pending cards are leased to the caller
+    under the returned ``lease_id``. Pending cards another client holds are
+    left out; if that lease expires they come back in the feed.
+    """
+    leased = {}
+    try:
+        if lease_seconds:
+            # Expired leases become changes, so reclaim them before reading
+            await writer.run(lambda service: service.reclaim_expired_leases(user_id, commit=False))
+
+        service = AsyncFlashcardService(db)
+        # Read before the page: every change up to this version is committed and so in the page or before it
+        version = await service.get_change_version(user_id)
+        # One extra row tells whether another page follows
+        flashcards = await service.get_changes(user_id, cursor, limit + 1)
+        page = flashcards[:limit]
+
+        if lease_seconds:
+            pending_ids = [fc.id for fc in page if fc.status == "pending"]
+            leased = {
+                fc.id: fc
+                for fc in await writer.run(
+                    lambda service: service.lease_flashcards(user_id, pending_ids, lease_seconds, commit=False)
+                )
+            }
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get flashcard changes: {str(e)}")
+
+    # The cursor moves past the whole page, including cards held by other clients
+    if page:
+        next_cursor = encode_change_cursor(page[-1].change_seq, page[-1].id)
+    else:
+        # Nothing new: keep the caller where it is
+        next_cursor = cursor or encode_change_cursor(0, 0)
+
+    if lease_seconds:
+        page = [leased.get(fc.id, fc) for fc in page if fc.status != "pending" or fc.id in leased]
+    return FlashcardChangesResponse(
+        user_id=user_id,
+        changes=[FlashcardResponse.model_validate(fc) for fc in page],
+        next_cursor=next_cursor,
+        has_more=len(flashcards) > limit,
+        lease_id=next(iter(leased.values())).lease_id if leased else None,
+        version=version,
+    )
+
+
+# Longest a long-poll request is held open
+MAX_WAIT_SECONDS = 60
+
+
+@router.get("/changes/{user_id}/wait", response_model=ChangeWaitResponse)
+async def wait_for_flashcard_changes(
+    user_id: str,
+    cursor: Optional[str] = None,
+    timeout: float = Query(25, ge=0, le=MAX_WAIT_SECONDS),
+    version: Optional[int] = Query(None, ge=0),
+    notifier: ChangeNotifier = Depends(get_change_notifier),
+):
+    """Long-poll: return as soon as the user has changes after ``cursor``, or after ``timeout`` seconds
+
+    Idle clients wait here instead of polling ``/changes``; the wait holds no
+    database connection. When ``changed`` is true, fetch the changes from
+    ``/changes`` with the same cursor.
+
+    A client that knows it has seen every change up to a later ``version``
+    than its cursor (e.g. its own acknowledgements) passes it to wait for
+    newer changes only.
+    """
+    try:
+        since, _ = decode_change_cursor(cursor)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    if version is not None:
+        since = max(since, version)
+
+    version = await notifier.wait_for_change(user_id, since, timeout)
+    return ChangeWaitResponse(user_id=user_id, changed=version > since, version=version)
+
+
+async def _version_after(service: AsyncFlashcardService, user_id: str, outcomes: Dict[int, AckOutcome]) -> Optional[int]:
+    """The user's change version once a status change is written; None when it changed no card
+
+    Clients compare it with the ``version`` of their last change feed page to
+    tell their own writes apart from changes they have not seen.
+    """
+    if not any(outcome in (AckOutcome.SYNCED, AckOutcome.FAILED) for outcome in outcomes.values()):
+        return None
+    return await service.get_change_version(user_id)
+
+
+@router.post("/sync", response_model=SyncResponse)
+async def sync_flashcards(sync_request: SyncRequest, writer: FlashcardWriter = Depends(get_writer)):
+    """Mark the user's flashcards as synced
+
+    Ids that do not belong to ``user_id`` are reported as ``not_found``;
+    ``outcomes`` has the result for every requested id.
+    """
+
+    async def acknowledge(service: AsyncFlashcardService):
+        outcomes = await service.acknowledge_flashcards(
+            sync_request.user_id, sync_request.flashcard_ids, lease_id=sync_request.lease_id, commit=False
+        )
+        return outcomes, await _version_after(service, sync_request.user_id, outcomes)
+
     try:
-        print(f"[API] sync_flashcards: user_id={sync_request.user_id}, flashcard_ids={sync_request.flashcard_ids}")
-        print(f"[API] Number of cards to sync: {len(sync_request.flashcard_ids)}")
+        print(f"[API] sync_flashcards: user_id={sync_request.user_id}, cards={len(sync_request.flashcard_ids)}")
 
-        service = FlashcardService(db)
-        updated_count = service.mark_flashcards_synced(sync_request.flashcard_ids)
+        outcomes, version = await writer.run(acknowledge)
+        synced_count = sum(outcome in (AckOutcome.SYNCED, AckOutcome.ALREADY_SYNCED) for outcome in outcomes.values())
 
-        print(f"[API] Successfully synced {updated_count} flashcards")
+        print(f"[API] Successfully synced {synced_count} flashcards")
 
-        return {
-            "message": f"Successfully synced {updated_count} flashcards",
-            "synced_count": updated_count,
-            "user_id": sync_request.user_id,
-        }
+        return SyncResponse(
+            message=f"Successfully synced {synced_count} flashcards",
+            user_id=sync_request.user_id,
+            lease_id=sync_request.lease_id,
+            synced_count=synced_count,
+            outcomes=outcomes,
+            version=version,
+        )
     except Exception as e:
         print(f"[API] Error syncing flashcards: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to sync flashcards: {str(e)}")
 
 
+@router.post("/failed", response_model=FailureReportResponse)
+async def report_failed_flashcards(report: FailureReport, writer: FlashcardWriter = Depends(get_writer)):
+    """Mark the user's flashcards as failed to sync, all in one request"""
+
+    async def report_failed(service: AsyncFlashcardService):
+        outcomes = await service.report_failed_flashcards(
+            report.user_id, report.flashcard_ids, lease_id=report.lease_id, commit=False
+        )
+        return outcomes, await _version_after(service, report.user_id, outcomes)
+
+    try:
+        outcomes, version = await writer.run(report_failed)
+        failed_count = sum(outcome in (AckOutcome.FAILED, AckOutcome.ALREADY_FAILED) for outcome in outcomes.values())
+        return FailureReportResponse(user_id=report.user_id, failed_count=failed_count, outcomes=outcomes, version=version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to report failed flashcards: {str(e)}")
+
+
 @router.get("/stats/{user_id}", response_model=UserStatsResponse)
-async def get_user_stats(user_id: str, db: Session = Depends(get_db)):
+async def get_user_stats(user_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get flashcard statistics for a user"""
     try:
-        service = FlashcardService(db)
-        stats = service.get_flashcard_stats(user_id)
+        service = AsyncFlashcardService(db)
+        stats = await service.get_flashcard_stats(user_id)
         total = sum(stats.values())
 
         return UserStatsResponse(
@@ -121,14 +277,13 @@ async def get_user_stats(user_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get user stats: {str(e)}")
 
 
-@router.delete("/failed/{flashcard_id}")
-async def mark_flashcard_failed(flashcard_id: int, db: Session = Depends(get_db)):
-    """Mark a flashcard as failed"""
+@router.delete("/failed/{flashcard_id}", deprecated=True)
+async def mark_flashcard_failed(flashcard_id: int, user_id: str, writer: FlashcardWriter = Depends(get_writer)):
+    """Mark one of the user's flashcards as failed (kept for older add-ons; use ``POST /failed``)"""
     try:
-        service = FlashcardService(db)
-        success = service.mark_flashcard_failed(flashcard_id)
+        outcomes = await writer.run(lambda service: service.report_failed_flashcards(user_id, [flashcard_id], commit=False))
 
-        if not success:
+        if outcomes[flashcard_id] == AckOutcome.NOT_FOUND:
             raise HTTPException(status_code=404, detail="Flashcard not found")
 
         return {"message": f"Flashcard {flashcard_id} marked as failed"}
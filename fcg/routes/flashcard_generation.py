@@ -1,17 +1,28 @@
-from typing import List, Optional
+import asyncio
+import contextlib
+import json
+from typing import AsyncIterator, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fcg.config.settings import Settings
+from fcg.config.container import ServiceContainer
+from fcg.exceptions import GenerationCapacityError, GenerationTimeoutError
+from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
 from fcg.models.api import FlashcardResponse
-from fcg.schemas import ChatMessage, ChatRole
-from fcg.services.database import FlashcardService, db_service
+from fcg.routes.dependencies import get_container, get_llm_service, get_persist_flight, get_read_db, get_writer
+from fcg.schemas import ChatMessage, ChatRole, GenerationTier
+from fcg.services.database import AsyncFlashcardService, FlashcardWriter
 from fcg.services.openrouter_flashcard_service import OpenRouterFlashcardService
+from fcg.utils.single_flight import SingleFlight
 
 router = APIRouter(prefix="/api/v1/flashcards", tags=["Flashcard Generation (LLM)"])
 
+# Seconds of silence before a keep-alive comment is sent on the SSE stream
+SSE_HEARTBEAT_SECONDS = 10.0
+
 
 class GenerateFlashcardsRequest(BaseModel):
     """Request to generate flashcards from text"""
@@ -22,15 +33,42 @@ class GenerateFlashcardsRequest(BaseModel):
     source_title: Optional[str] = None
     deck_name: str = "Web Learning"
     card_count: Optional[int] = 5
+    bypass_cache: bool = False  # Force a fresh LLM generation
+    quality: GenerationTier = GenerationTier.AUTO  # fast = one LLM call, full = 3-stage pipeline
+    model: Optional[str] = None  # OpenRouter model override for this request
+
+
+def _build_conversation(request: GenerateFlashcardsRequest) -> List[ChatMessage]:
+    """Wrap the request text as the conversation to generate from
+
+    Card instructions live in the DSPy signatures and the card count travels
+    as ``num_cards``, so the pipeline's stage inputs (and memo keys) are the
+    source text alone and a regeneration with another count reuses them.
+    """
+    return [ChatMessage(role=ChatRole.USER, content=request.text)]
 
 
-def get_db():
-    """Dependency to get database session"""
-    return next(db_service.get_db())
+def _card_fields(request: GenerateFlashcardsRequest, card: dict) -> dict:
+    """Database fields for one generated card of the requesting user"""
+    return {
+        "user_id": request.user_id,
+        "front": card.get("question", ""),
+        "back": card.get("answer", ""),
+        "deck_name": request.deck_name,
+        "source_url": request.source_url,
+        "source_text": request.text[:500] + "..." if len(request.text) > 500 else request.text,
+        "tags": f"web-learning,{card.get('topic', 'general').lower().replace(' ', '-')}",
+    }
 
 
 @router.post("/generate", response_model=List[FlashcardResponse])
-async def generate_flashcards(request: GenerateFlashcardsRequest, db: Session = Depends(get_db)):
+async def generate_flashcards(
+    request: GenerateFlashcardsRequest,
+    writer: FlashcardWriter = Depends(get_writer),
+    llm_service: FlashcardGeneratorService = Depends(get_llm_service),
+    container: ServiceContainer = Depends(get_container),
+    persist_flight: SingleFlight = Depends(get_persist_flight),
+):
     """
     Generate flashcards from text using LLM and save to database
 
@@ -41,56 +79,144 @@ async def generate_flashcards(request: GenerateFlashcardsRequest, db: Session =
     4. User can later sync to Anki via addon
     """
     try:
-        # Initialize OpenRouter service
-        settings = Settings()
-        llm_service = OpenRouterFlashcardService(settings)
-
-        # Create a conversation-style prompt for the LLM
-        system_prompt = f"""Create {request.card_count} concise, simple, straightforward and distinct Anki cards to study the following text.
-Each card should have a question, answer, and topic.
-Avoid repeating the content in the question as part of the answer.
-Avoid explicitly referring to the author or article in the cards."""
-
-        conversation = [
-            ChatMessage(role=ChatRole.SYSTEM, content=system_prompt),
-            ChatMessage(role=ChatRole.USER, content=request.text),
-        ]
-
-        # Generate flashcards using LLM
-        generated_cards = await llm_service.generate_flashcards(conversation)
-
-        if not generated_cards:
-            raise HTTPException(status_code=400, detail="No flashcards could be generated from the provided text")
-
-        # Save all flashcards to database
-        service = FlashcardService(db)
-        results = []
-
-        # TODO: batch it
-        for card in generated_cards:
-            flashcard = service.add_flashcard(
+        settings = container.get_settings()
+        conversation = _build_conversation(request)
+
+        async def generate_and_save() -> List[FlashcardResponse]:
+            # Generate flashcards using LLM
+            generated_cards = await llm_service.generate_flashcards(
+                conversation,
+                bypass_cache=request.bypass_cache,
+                tier=request.quality,
                 user_id=request.user_id,
-                front=card.get("question", ""),
-                back=card.get("answer", ""),
-                deck_name=request.deck_name,
-                source_url=request.source_url,
-                source_text=request.text[:500] + "..." if len(request.text) > 500 else request.text,
-                tags=f"web-learning,{card.get('topic', 'general').lower().replace(' ', '-')}",
+                model=request.model,
+                num_cards=request.card_count,
+            )
+
+            if not generated_cards:
+                raise HTTPException(status_code=400, detail="No flashcards could be generated from the provided text")
+
+            async def save(service: AsyncFlashcardService):
+                # Save all flashcards and their batch in one transaction
+                batch_id = await service.create_batch(request.user_id, request.source_url, commit=False)
+                return await service.add_flashcards_bulk(
+                    [_card_fields(request, card) for card in generated_cards], batch_id=batch_id, commit=False
+                )
+
+            flashcards = await writer.run(save)
+
+            return [FlashcardResponse.model_validate(flashcard) for flashcard in flashcards]
+
+        if settings.generation_coalescing_enabled and settings.generation_coalesce_mode == "shared":
+            # Duplicates return the rows saved by the first request instead of saving their own
+            key = OpenRouterFlashcardService.coalescing_key(
+                request.user_id,
+                conversation,
+                **request.model_dump(exclude={"user_id", "text"}),
             )
-            results.append(FlashcardResponse.model_validate(flashcard))
+            results, _ = await persist_flight.do(key, generate_and_save)
+            return results
 
-        return results
+        return await generate_and_save()
 
+    except HTTPException:
+        raise
+    except GenerationTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Flashcard generation timed out: {e.message}")
+    except GenerationCapacityError as e:
+        raise HTTPException(status_code=503, detail=f"Flashcard generation is busy: {e.message}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate flashcards: {str(e)}")
 
 
+@router.post("/generate/stream")
+async def generate_flashcards_stream(
+    request: GenerateFlashcardsRequest,
+    writer: FlashcardWriter = Depends(get_writer),
+    llm_service: FlashcardGeneratorService = Depends(get_llm_service),
+):
+    """
+    Generate flashcards and stream them back as Server-Sent Events
+
+    Each card is persisted and sent as a `card` event as soon as it is generated,
+    followed by one `summary` event. Failures are reported as an `error` event.
+    Comment lines are sent while waiting so proxies do not drop idle connections.
+    The cards of one stream share a batch, created before generation starts.
+    """
+
+    async def event_stream() -> AsyncIterator[str]:
+        saved_ids = []
+        try:
+            batch_id = await writer.run(
+                lambda service: service.create_batch(request.user_id, request.source_url, commit=False)
+            )
+            cards = llm_service.stream_flashcards(
+                _build_conversation(request),
+                bypass_cache=request.bypass_cache,
+                tier=request.quality,
+                user_id=request.user_id,
+                model=request.model,
+                num_cards=request.card_count,
+            )
+            async for card in _with_heartbeat(cards, SSE_HEARTBEAT_SECONDS):
+                if card is None:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                fields = _card_fields(request, card)
+                saved = await writer.run(lambda service: service.add_flashcard(**fields, batch_id=batch_id, commit=False))
+                flashcard = FlashcardResponse.model_validate(saved)
+                saved_ids.append(flashcard.id)
+                yield _sse_event("card", flashcard.model_dump(mode="json"))
+
+            summary = {"user_id": request.user_id, "batch_id": batch_id, "count": len(saved_ids), "flashcard_ids": saved_ids}
+            yield _sse_event("summary", summary)
+
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Failed to generate flashcards: {str(e)}", "count": len(saved_ids)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _with_heartbeat(items: AsyncIterator[dict], interval: float) -> AsyncIterator[Optional[dict]]:
+    """Relay ``items``, yielding None whenever nothing arrived for ``interval`` seconds"""
+    iterator = items.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield None
+                continue
+            try:
+                item = pending.result()
+            except StopAsyncIteration:
+                return
+            yield item
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        if not pending.done():
+            pending.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await pending
+        await iterator.aclose()
+
+
 @router.get("/user/{user_id}/stats")
-async def get_user_dashboard(user_id: str, db: Session = Depends(get_db)):
+async def get_user_dashboard(user_id: str, db: AsyncSession = Depends(get_read_db)):
     """Get user's flashcard dashboard stats"""
-    service = FlashcardService(db)
-    stats = service.get_flashcard_stats(user_id)
-    pending = service.get_pending_flashcards(user_id)
+    service = AsyncFlashcardService(db)
+    stats = await service.get_flashcard_stats(user_id)
+    pending = await service.get_pending_flashcards(user_id)
 
     return {
         "user_id": user_id,
@@ -33,6 +33,14 @@ class DestinationType(str, Enum):
     ANKI = "anki"
 
 
+class GenerationTier(str, Enum):
+    """Quality/latency tier for LLM flashcard generation"""
+
+    AUTO = "auto"  # Pick from input size
+    FAST = "fast"  # Single fused LLM call
+    FULL = "full"  # Analyze -> prioritize -> generate pipeline
+
+
 class FlashcardRequest(BaseModel):
     """Request to generate flashcards"""
 
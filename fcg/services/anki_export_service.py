@@ -1,37 +1,64 @@
 """
 fcg.services.anki_export_service
 ================================
-Module that provides AnkiExportService, an implementation of the ExportService
-interface that exports flashcards to Anki using the AnkiConnect HTTP API.
+Module that provides AnkiExportService and AsyncAnkiExportService, the
+ExportService and AsyncExportService implementations that export flashcards
+to Anki using the AnkiConnect HTTP API.
 Summary
 -------
 This module wraps calls to AnkiConnect (default at http://127.0.0.1:8765) to:
 - create a uniquely named deck,
 - add flashcards as Anki notes using the built-in "Basic" model,
 - surface clear, high-level success/failure information to callers.
+An export takes two round trips however many cards it has (more only past
+``batch_size`` notes): one ``multi`` request creating the deck and checking
+every note with ``canAddNotes``, then ``addNotes`` for the notes that can be
+added. If ``addNotes`` fails a batch, one more ``multi`` request of
+``findNotes`` lookups finds which of its notes were added anyway. All
+requests share one keep-alive connection.
 Public classes and functions
 ----------------------------
-AnkiExportService(anki_connect_url: str = "http://127.0.0.1:8765")
+AnkiExportService(anki_connect_url: str = "http://127.0.0.1:8765", timeout=30.0, connect_timeout=3.0, batch_size=500)
     ExportService implementation that sends requests to AnkiConnect.
     - export_flashcards(flashcards: List[Dict[str, Any]]) -> str
         Export a list of flashcards to Anki. Each flashcard is a dict with at
         least "question" and "answer" keys. If "topic" is present, it is added
         as a tag (spaces replaced with underscores). Returns a human-readable
         summary string of how many cards were added and the deck name.
-    - _create_anki_note(deck_name: str, card: Dict[str, Any])
-        Internal helper that formats and sends a single addNote request.
+    - add_notes(deck_name: str, flashcards: List[Dict[str, Any]], create_deck: bool = False)
+        Add flashcards to a deck (creating it first if asked); returns the new
+        note id per card, or None for cards Anki could not add.
+    - close()
+        Release the pooled HTTP connection.
+    - _build_note(deck_name: str, card: Dict[str, Any])
+        Internal helper that formats one flashcard as an AnkiConnect note.
     - _request(action, **params)
         Build the JSON payload including the AnkiConnect API version.
     - _invoke(action, **params)
         Send the JSON request to AnkiConnect, parse and validate the response,
         and return the "result" field or raise an appropriate exception.
+    - _multi(*actions)
+        Run several actions in one request and return their results.
+AsyncAnkiExportService(..., max_concurrency=2, deadline=120.0)
+    AsyncExportService implementation for the API's event loop, with the same
+    constructor arguments plus:
+    - max_concurrency: requests in flight to Anki at once, across all exports
+      sharing the instance; addNotes batches of one export run concurrently
+      up to this limit.
+    - deadline: seconds a whole export may take before it fails with
+      ExportError.
+    Cancelling an awaiting export (e.g. the client disconnected) cancels its
+    outstanding requests; batches not yet sent are never sent.
+    export_flashcards, add_notes and close are coroutines.
 Behavior and error handling
 ---------------------------
 - A unique deck name is generated for each export using a short UUID prefix.
 - Notes use the "Basic" model with fields "Front" and "Back".
 - Tags: the provided topic (spaces -> underscores) and a constant "FlashcardGen"
   tag are attached to each note.
-- Network errors or inability to reach Anki raise AnkiConnectionError.
+- Notes that fail the canAddNotes check (e.g. empty or duplicate) are skipped
+  and logged; the summary counts only the notes actually added.
+- Network errors, timeouts or inability to reach Anki raise AnkiConnectionError.
 - Unexpected or error-containing responses from AnkiConnect raise
   AnkiResponseError.
 - Any other failures during export are wrapped and re-raised as ExportError.
@@ -39,6 +66,7 @@ Dependencies and requirements
 -----------------------------
 - Requires Anki to be running with the AnkiConnect plugin installed and enabled.
 - Uses AnkiConnect API version 6 when building requests.
+- Uses httpx for pooled keep-alive connections with connect/read timeouts.
 - Relies on exceptions and interfaces from the fcg package:
   AnkiConnectionError, AnkiResponseError, ExportError, and ExportService.
 Example
@@ -51,63 +79,83 @@ Basic usage:
     ]
     result_summary = service.export_flashcards(flashcards)
     print(result_summary)
+    service.close()
 Notes
 -----
 - The module intentionally keeps network and response parsing logic internal
   and presents a simple, high-level interface to callers.
-- The default AnkiConnect URL and API version can be adjusted if needed by
-  modifying the constructor and _request implementation respectively.
+- The AnkiConnect URL, timeouts, batch size, concurrency and deadline come
+  from the ANKI_CONNECT_* settings when the service is built by the application container.
 """
 
-import json
-import urllib.error
-import urllib.request
+import asyncio
+import threading
 import uuid
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
 
 from fcg.exceptions import AnkiConnectionError, AnkiResponseError, ExportError
-from fcg.interfaces.export_service import ExportService
+from fcg.interfaces.export_service import AsyncExportService, ExportService
 from fcg.utils.logging import logger
 
+ANKI_CONNECT_VERSION = 6
 
-class AnkiExportService(ExportService):
-    """Anki implementation of export service using AnkiConnect"""
 
-    def __init__(self, anki_connect_url: str = "http://127.0.0.1:8765"):
-        self.anki_connect_url = anki_connect_url
+def _check_response(response: Any) -> Any:
+    """Validate one AnkiConnect response envelope and return its result"""
+    if not isinstance(response, dict) or len(response) != 2:
+        raise AnkiResponseError("Response has an unexpected number of fields")
+    if "error" not in response:
+        raise AnkiResponseError("Response is missing required error field")
+    if "result" not in response:
+        raise AnkiResponseError("Response is missing required result field")
+    if response["error"] is not None:
+        raise AnkiResponseError(response["error"])
+    return response["result"]
 
-    def export_flashcards(self, flashcards: List[Dict[str, Any]]) -> str:
-        """Export flashcards to Anki via AnkiConnect"""
-        if not flashcards:
-            return "No flashcards to export"
 
-        # Create a unique deck name
-        deck_name = f"FlashcardGen_{uuid.uuid4().hex[:8]}"
+@contextmanager
+def _translate_errors(action: str) -> Iterator[None]:
+    """Map httpx failures around one AnkiConnect request to the fcg exceptions"""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise AnkiConnectionError(f"AnkiConnect did not answer {action} in time. Is Anki busy or stuck?") from e
+    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+        raise AnkiConnectionError("Cannot connect to Anki. Make sure Anki is running with AnkiConnect installed.") from e
+    except ValueError as e:
+        raise AnkiResponseError("Response is not valid JSON") from e
 
-        try:
-            # Create deck
-            self._invoke("createDeck", deck=deck_name)
-
-            # Add each flashcard
-            cards_added = 0
-            for card in flashcards:
-                try:
-                    self._create_anki_note(deck_name, card)
-                    cards_added += 1
-                except (AnkiConnectionError, AnkiResponseError) as e:
-                    logger.error(
-                        "Failed to add card: %s, Error: %s",
-                        card.get("question", "Unknown"),
-                        e,
-                    )
 
-            return f"Successfully exported {cards_added}/{len(flashcards)} " f"cards to Anki deck: {deck_name}"
+def _search_literal(text: str) -> str:
+    """Escape ``text`` so an Anki search matches it literally inside a quoted term"""
+    for special in ("\\", '"', "*", "_"):
+        text = text.replace(special, "\\" + special)
+    return text
 
-        except Exception as e:
-            raise ExportError(f"Failed to export to Anki: {e}") from e
 
-    def _create_anki_note(self, deck_name: str, card: Dict[str, Any]):
-        """Create a single note in Anki"""
+async def _close_quietly(client: httpx.AsyncClient):
+    """Close a client whose event loop has stopped
+
+    Its connections belong to the stopped loop and may fail to close from
+    this one; the client is dropped either way.
+    """
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug("Closing an AnkiConnect client from a stopped event loop failed: %s", e)
+
+
+class _AnkiConnectNotes:
+    """Request building shared by the sync and async exporters"""
+
+    anki_connect_url: str
+    batch_size: int
+
+    def _build_note(self, deck_name: str, card: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a single flashcard as an AnkiConnect note"""
         note = {
             "deckName": deck_name,
             "modelName": "Basic",  # Using basic card type
@@ -126,28 +174,276 @@ class AnkiExportService(ExportService):
         # Add general tag
         note["tags"].append("FlashcardGen")
 
-        self._invoke("addNote", note=note)
+        return note
 
     def _request(self, action, **params):
         """Create AnkiConnect request"""
-        return {"action": action, "params": params, "version": 6}
+        return {"action": action, "params": params, "version": ANKI_CONNECT_VERSION}
+
+    def _precheck_actions(self, deck_name: str, notes: List[Dict[str, Any]], create_deck: bool) -> List[Dict[str, Any]]:
+        """Actions for the single ``multi`` round trip: create the deck (if asked) and precheck every note"""
+        actions = [{"action": "createDeck", "params": {"deck": deck_name}}] if create_deck else []
+        actions.append({"action": "canAddNotes", "params": {"notes": notes}})
+        return actions
+
+    def _batches(self, flashcards: List[Dict[str, Any]], addable: List[bool]) -> List[List[int]]:
+        """Indexes of the cards that passed the precheck, in ``batch_size`` chunks"""
+        candidates = []
+        for index, can_add in enumerate(addable):
+            if can_add:
+                candidates.append(index)
+            else:
+                logger.error("Cannot add card to Anki: %s", flashcards[index].get("question", "Unknown"))
+        return [candidates[start : start + self.batch_size] for start in range(0, len(candidates), self.batch_size)]
+
+    def _find_actions(self, notes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``findNotes`` actions looking each note up by deck and front, in one ``multi`` round trip"""
+        return [
+            {
+                "action": "findNotes",
+                "params": {
+                    "query": f'"deck:{_search_literal(note["deckName"])}" "front:{_search_literal(note["fields"]["Front"])}"'
+                },
+            }
+            for note in notes
+        ]
+
+    def _found_note_ids(self, found: List[List[int]]) -> List[Optional[int]]:
+        """Note id per note from its ``findNotes`` result; None where the note was not added
+
+        Notes with the same front in one batch share a search, so each takes
+        the next id not claimed by an earlier one.
+        """
+        claimed = set()
+        note_ids: List[Optional[int]] = []
+        for candidates in found:
+            note_id = next((candidate for candidate in sorted(candidates) if candidate not in claimed), None)
+            claimed.add(note_id)
+            note_ids.append(note_id)
+        return note_ids
+
+    def _record_added(
+        self, flashcards: List[Dict[str, Any]], batch: List[int], added: List[Optional[int]], note_ids: List[Optional[int]]
+    ):
+        for index, note_id in zip(batch, added):
+            note_ids[index] = note_id
+            if note_id is None:
+                logger.error("Failed to add card: %s", flashcards[index].get("question", "Unknown"))
+
+
+class AnkiExportService(_AnkiConnectNotes, ExportService):
+    """Anki implementation of export service using AnkiConnect"""
+
+    def __init__(
+        self,
+        anki_connect_url: str = "http://127.0.0.1:8765",
+        timeout: float = 30.0,
+        connect_timeout: float = 3.0,
+        batch_size: int = 500,
+    ):
+        self.anki_connect_url = anki_connect_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.batch_size = batch_size
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    def export_flashcards(self, flashcards: List[Dict[str, Any]]) -> str:
+        """Export flashcards to Anki via AnkiConnect"""
+        if not flashcards:
+            return "No flashcards to export"
+
+        # Create a unique deck name
+        deck_name = f"FlashcardGen_{uuid.uuid4().hex[:8]}"
+
+        try:
+            note_ids = self.add_notes(deck_name, flashcards, create_deck=True)
+            cards_added = sum(note_id is not None for note_id in note_ids)
+            return f"Successfully exported {cards_added}/{len(flashcards)} " f"cards to Anki deck: {deck_name}"
+
+        except Exception as e:
+            raise ExportError(f"Failed to export to Anki: {e}") from e
+
+    def add_notes(self, deck_name: str, flashcards: List[Dict[str, Any]], create_deck: bool = False) -> List[Optional[int]]:
+        """Add flashcards to ``deck_name``; returns the new note id per card (None where Anki refused it)"""
+        notes = [self._build_note(deck_name, card) for card in flashcards]
+        addable = self._multi(*self._precheck_actions(deck_name, notes, create_deck))[-1]
+
+        note_ids: List[Optional[int]] = [None] * len(notes)
+        for batch in self._batches(flashcards, addable):
+            batch_notes = [notes[index] for index in batch]
+            try:
+                added = self._invoke("addNotes", notes=batch_notes)
+            except AnkiResponseError as e:
+                added = self._added_despite_error(batch_notes, e)
+            self._record_added(flashcards, batch, added, note_ids)
+        return note_ids
+
+    def _added_despite_error(self, notes: List[Dict[str, Any]], error: AnkiResponseError) -> List[Optional[int]]:
+        """Look up which notes of a failed ``addNotes`` request were added anyway"""
+        # Newer AnkiConnect versions report any failed note as an error for the whole batch but add the others
+        logger.warning("addNotes failed for a batch of %d cards, looking up which were added: %s", len(notes), error)
+        try:
+            return self._found_note_ids(self._multi(*self._find_actions(notes)))
+        except AnkiResponseError as e:
+            logger.error("Failed to add %d cards: %s (lookup failed: %s)", len(notes), error, e)
+            return [None] * len(notes)
+
+    def _multi(self, *actions: Dict[str, Any]) -> List[Any]:
+        """Run several actions in one request; raises if any of them failed"""
+        return [_check_response(response) for response in self._invoke("multi", actions=list(actions))]
+
+    @property
+    def client(self) -> httpx.Client:
+        """Keep-alive HTTP client, created on first use"""
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout)
+            return self._client
 
     def _invoke(self, action, **params):
         """Send request to AnkiConnect and return response"""
-        request_json = json.dumps(self._request(action, **params)).encode("utf-8")
+        with _translate_errors(action):
+            response = self.client.post(self.anki_connect_url, json=self._request(action, **params))
+            response.raise_for_status()
+            body = response.json()
+
+        return _check_response(body)
+
+    def close(self):
+        """Release the pooled HTTP connection"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+class AsyncAnkiExportService(_AnkiConnectNotes, AsyncExportService):
+    """AnkiConnect exporter for async callers; waiting on Anki never blocks the event loop
+
+    At most ``max_concurrency`` requests are in flight to Anki at once across
+    all exports sharing the instance, an export that has not finished within
+    ``deadline`` seconds fails with ExportError, and cancelling the caller
+    cancels its outstanding requests without sending the remaining batches.
+    """
+
+    def __init__(
+        self,
+        anki_connect_url: str = "http://127.0.0.1:8765",
+        timeout: float = 30.0,
+        connect_timeout: float = 3.0,
+        batch_size: int = 500,
+        max_concurrency: int = 2,
+        deadline: float = 120.0,
+    ):
+        self.anki_connect_url = anki_connect_url
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.deadline = deadline
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Closes of clients left behind by a stopped event loop, still running on the current one
+        self._closing: "set[asyncio.Task]" = set()
+
+    async def export_flashcards(self, flashcards: List[Dict[str, Any]]) -> str:
+        """Export flashcards to Anki via AnkiConnect within the export deadline"""
+        if not flashcards:
+            return "No flashcards to export"
+
+        # Create a unique deck name
+        deck_name = f"FlashcardGen_{uuid.uuid4().hex[:8]}"
+
+        try:
+            note_ids = await asyncio.wait_for(self.add_notes(deck_name, flashcards, create_deck=True), self.deadline)
+            cards_added = sum(note_id is not None for note_id in note_ids)
+            return f"Successfully exported {cards_added}/{len(flashcards)} " f"cards to Anki deck: {deck_name}"
+
+        except asyncio.TimeoutError as e:
+            raise ExportError(f"Export to Anki did not finish within {self.deadline:g}s") from e
+        except Exception as e:
+            raise ExportError(f"Failed to export to Anki: {e}") from e
+
+    async def add_notes(
+        self, deck_name: str, flashcards: List[Dict[str, Any]], create_deck: bool = False
+    ) -> List[Optional[int]]:
+        """Add flashcards to ``deck_name``; returns the new note id per card (None where Anki refused it)"""
+        notes = [self._build_note(deck_name, card) for card in flashcards]
+        addable = (await self._multi(*self._precheck_actions(deck_name, notes, create_deck)))[-1]
+
+        note_ids: List[Optional[int]] = [None] * len(notes)
 
+        async def add_batch(batch: List[int]):
+            batch_notes = [notes[index] for index in batch]
+            try:
+                added = await self._invoke("addNotes", notes=batch_notes)
+            except AnkiResponseError as e:
+                added = await self._added_despite_error(batch_notes, e)
+            self._record_added(flashcards, batch, added, note_ids)
+
+        tasks = [asyncio.ensure_future(add_batch(batch)) for batch in self._batches(flashcards, addable)]
         try:
-            response = json.load(urllib.request.urlopen(urllib.request.Request(self.anki_connect_url, request_json)))
-        except urllib.error.URLError as e:
-            raise AnkiConnectionError("Cannot connect to Anki. Make sure Anki is running with AnkiConnect installed.") from e
-
-        if len(response) != 2:
-            raise AnkiResponseError("Response has an unexpected number of fields")
-        if "error" not in response:
-            raise AnkiResponseError("Response is missing required error field")
-        if "result" not in response:
-            raise AnkiResponseError("Response is missing required result field")
-        if response["error"] is not None:
-            raise AnkiResponseError(response["error"])
-
-        return response["result"]
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed batch, the deadline or a cancelled caller: do not leave the others running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return note_ids
+
+    async def _multi(self, *actions: Dict[str, Any]) -> List[Any]:
+        """Run several actions in one request; raises if any of them failed"""
+        return [_check_response(response) for response in await self._invoke("multi", actions=list(actions))]
+
+    async def _added_despite_error(self, notes: List[Dict[str, Any]], error: AnkiResponseError) -> List[Optional[int]]:
+        """Look up which notes of a failed ``addNotes`` request were added anyway"""
+        # Newer AnkiConnect versions report any failed note as an error for the whole batch but add the others
+        logger.warning("addNotes failed for a batch of %d cards, looking up which were added: %s", len(notes), error)
+        try:
+            return self._found_note_ids(await self._multi(*self._find_actions(notes)))
+        except AnkiResponseError as e:
+            logger.error("Failed to add %d cards: %s (lookup failed: %s)", len(notes), error, e)
+            return [None] * len(notes)
+
+    def _connection(self):
+        """Client and concurrency limit for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        # Both are bound to the loop they were first used on
+        if self._client is None or self._loop is not loop:
+            self._discard_client()
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=httpx.Limits(max_connections=self.max_concurrency))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client, self._semaphore
+
+    def _discard_client(self):
+        """Close the client of another event loop, on that loop while it still runs"""
+        client, loop = self._client, self._loop
+        if client is None:
+            return
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        task = asyncio.ensure_future(_close_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _invoke(self, action, **params):
+        """Send request to AnkiConnect and return response"""
+        client, semaphore = self._connection()
+        async with semaphore:
+            with _translate_errors(action):
+                response = await client.post(self.anki_connect_url, json=self._request(action, **params))
+                response.raise_for_status()
+                body = response.json()
+
+        return _check_response(body)
+
+    async def close(self):
+        """Release the pooled HTTP connections"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await client.aclose()
+        if self._closing:
+            await asyncio.gather(*self._closing)
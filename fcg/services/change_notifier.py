@@ -0,0 +1,117 @@
+"""
+Long-poll support: wait until a user's change version moves.
+
+Every write to a user's cards bumps their row in ``user_change_versions``.
+Waiting requests register here and hold no database connection while they
+wait. One poller task per process reads the versions of all watched users
+in a single query every ``poll_interval`` seconds and wakes the waiters
+whose user has moved on. Since it reads the shared table, writes made by
+other workers or processes wake waiters too.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fcg.models.flashcard import UserChangeVersion
+from fcg.utils.logging import logger
+
+# Users per version query; well below SQLite's bound parameter limit
+_QUERY_CHUNK_SIZE = 500
+
+
+class ChangeNotifier:
+    """Wakes waiters when a user's change version exceeds the one they have seen"""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], poll_interval: float = 1.0):
+        self._session_factory = session_factory
+        self.poll_interval = poll_interval
+        self._waiters: Dict[str, List[Tuple[int, asyncio.Future]]] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self._polls = 0
+        self._wakeups = 0
+        self._timeouts = 0
+
+    async def _read_versions(self, user_ids: List[str]) -> Dict[str, int]:
+        """Current change versions of the given users (users who never wrote are absent)"""
+        versions: Dict[str, int] = {}
+        async with self._session_factory() as db:
+            for start in range(0, len(user_ids), _QUERY_CHUNK_SIZE):
+                rows = await db.execute(
+                    select(UserChangeVersion.user_id, UserChangeVersion.version).where(
+                        UserChangeVersion.user_id.in_(user_ids[start : start + _QUERY_CHUNK_SIZE])
+                    )
+                )
+                versions.update(rows.tuples().all())
+        return versions
+
+    async def wait_for_change(self, user_id: str, since: int, timeout: float) -> int:
+        """Return the user's change version as soon as it exceeds ``since``
+
+        After ``timeout`` seconds without a change the current version is
+        returned instead, so callers compare the result with ``since``.
+        """
+        version = (await self._read_versions([user_id])).get(user_id, 0)
+        if version > since or timeout <= 0:
+            return version
+
+        waiter = (since, asyncio.get_running_loop().create_future())
+        self._waiters.setdefault(user_id, []).append(waiter)
+        self._ensure_poller()
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            return version
+        finally:
+            waiters = self._waiters.get(user_id, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._waiters.pop(user_id, None)
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        # A poller left behind by a closed event loop never runs again
+        if self._poller is None or self._poller.done() or self._poller.get_loop() is not loop:
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        """Check every watched user's version once per interval until nobody waits"""
+        while self._waiters:
+            await asyncio.sleep(self.poll_interval)
+            user_ids = list(self._waiters)
+            try:
+                versions = await self._read_versions(user_ids)
+            except Exception as e:
+                logger.warning("Polling change versions failed: %s", e)
+                continue
+            self._polls += 1
+            for user_id, version in versions.items():
+                for since, future in self._waiters.get(user_id, []):
+                    if version > since and not future.done():
+                        future.set_result(version)
+                        self._wakeups += 1
+
+    async def close(self):
+        """Stop polling; waiting requests return at once, reporting no change"""
+        for waiters in list(self._waiters.values()):
+            for since, future in waiters:
+                if not future.done():
+                    future.set_result(since)
+        if self._poller is not None and not self._poller.done():
+            self._poller.cancel()
+        self._poller = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Waiting clients and poller counters"""
+        return {
+            "users": len(self._waiters),
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            "poll_interval_seconds": self.poll_interval,
+            "polls": self._polls,
+            "wakeups": self._wakeups,
+            "timeouts": self._timeouts,
+        }
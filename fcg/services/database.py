@@ -1,12 +1,232 @@
+import asyncio
+import base64
+import binascii
 import uuid
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Generator, List, Optional
+from typing import Any, Awaitable, Callable, Dict, Generator, Iterator, List, Optional, Set, Tuple, TypeVar, Union
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, and_, create_engine, event, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
 from fcg.config.settings import Settings
-from fcg.models.flashcard import Base, Flashcard, FlashcardBatch
+from fcg.exceptions import ValidationError
+from fcg.models.flashcard import AckOutcome, Flashcard, FlashcardBatch, UserChangeVersion
+from fcg.services.db_pool import PoolMetrics, TimedAsyncAdaptedQueuePool, TimedQueuePool
+from fcg.services.migrations import run_migrations
+
+T = TypeVar("T")
+
+
+def to_async_url(database_url: str) -> str:
+    """Map a sync database URL to the matching async driver (aiosqlite or asyncpg)"""
+    scheme, _, rest = database_url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("postgresql") or scheme == "postgres":
+        return f"postgresql+asyncpg://{rest}"
+    return database_url
+
+
+# Columns a caller may set when creating a flashcard
+FLASHCARD_FIELDS = ("user_id", "front", "back", "source_url", "source_text", "deck_name", "tags", "difficulty")
+
+
+def _bulk_rows(flashcards: List[Dict[str, Any]], batch_id: Optional[str]) -> List[Dict[str, Any]]:
+    """Parameter rows for a bulk flashcard INSERT (change_seq is filled in per user)"""
+    # Every row gets the same keys so the rows go out as one executemany INSERT
+    rows = []
+    for card in flashcards:
+        row = {field: card.get(field) for field in FLASHCARD_FIELDS}
+        row["deck_name"] = row["deck_name"] or "Default"
+        row["batch_id"] = batch_id
+        row["change_seq"] = 0
+        rows.append(row)
+    return rows
+
+
+def _bump_change_version(dialect_name: str, user_id: str):
+    """Statement incrementing a user's change version and returning the new value
+
+    The upsert keeps the user's counter row locked until commit, so writers
+    for one user commit in version order and the change feed never skips a
+    version that becomes visible later.
+    """
+    upsert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = upsert(UserChangeVersion).values(user_id=user_id, version=1)
+    return statement.on_conflict_do_update(
+        index_elements=[UserChangeVersion.user_id], set_={"version": UserChangeVersion.version + 1}
+    ).returning(UserChangeVersion.version)
+
+
+def _not_leased(now: datetime):
+    """Cards no client holds an unexpired lease on"""
+    return or_(Flashcard.lease_expires_at.is_(None), Flashcard.lease_expires_at <= now)
+
+
+# Ids per statement when acknowledging cards; well below SQLite's bound parameter limit
+ACK_CHUNK_SIZE = 500
+
+
+def _id_chunks(flashcard_ids: List[int]) -> Iterator[List[int]]:
+    """Distinct ids in request order, ACK_CHUNK_SIZE at a time"""
+    distinct_ids = list(dict.fromkeys(flashcard_ids))
+    for start in range(0, len(distinct_ids), ACK_CHUNK_SIZE):
+        yield distinct_ids[start : start + ACK_CHUNK_SIZE]
+
+
+def _status_rows(user_id: str, flashcard_ids: List[int]):
+    """Current status and lease of those of the given cards ``user_id`` owns
+
+    The rows stay locked until commit, so the plan made from them still
+    holds when ``_status_update`` runs.
+    """
+    return (
+        select(Flashcard.id, Flashcard.status, Flashcard.lease_id)
+        .where(Flashcard.user_id == user_id, Flashcard.id.in_(flashcard_ids))
+        .order_by(Flashcard.id)
+        .with_for_update()
+    )
+
+
+def _plan_status_change(
+    flashcard_ids: List[int], rows, status: str, lease_id: Optional[str]
+) -> Tuple[Dict[int, AckOutcome], List[int]]:
+    """Outcome for each id of moving it to ``status``, and the ids that actually change"""
+    found = {row.id: row for row in rows}
+    done = AckOutcome.SYNCED if status == "synced" else AckOutcome.FAILED
+    outcomes: Dict[int, AckOutcome] = {}
+    ready = []
+    for flashcard_id in flashcard_ids:
+        row = found.get(flashcard_id)
+        if row is None:
+            outcomes[flashcard_id] = AckOutcome.NOT_FOUND
+        elif lease_id is not None and row.lease_id != lease_id:
+            outcomes[flashcard_id] = AckOutcome.LEASE_MISMATCH
+        elif row.status == "synced":
+            # Synced is final: a failure report cannot undo an import
+            outcomes[flashcard_id] = AckOutcome.ALREADY_SYNCED
+        elif row.status == status:
+            outcomes[flashcard_id] = AckOutcome.ALREADY_FAILED
+        else:
+            outcomes[flashcard_id] = done
+            ready.append(flashcard_id)
+    return outcomes, ready
+
+
+def _status_update(user_id: str, flashcard_ids: List[int], status: str, lease_id: Optional[str], change_seq: int):
+    """Statement moving the given cards to ``status`` and ending their leases
+
+    It re-checks what ``_plan_status_change`` decided, so a concurrent
+    acknowledgement of the same cards cannot apply twice.
+    """
+    conditions = [
+        Flashcard.user_id == user_id,
+        Flashcard.id.in_(flashcard_ids),
+        Flashcard.status.not_in(["synced", status]),
+    ]
+    if lease_id is not None:
+        conditions.append(Flashcard.lease_id == lease_id)
+    values: Dict[str, Any] = {"status": status, "change_seq": change_seq, "lease_expires_at": None}
+    if status == "synced":
+        values["synced_at"] = datetime.utcnow()
+    return update(Flashcard).where(*conditions).values(**values).execution_options(synchronize_session=False)
+
+
+def encode_change_cursor(change_seq: int, flashcard_id: int) -> str:
+    """Opaque change feed cursor pointing just after the given card"""
+    return base64.urlsafe_b64encode(f"{change_seq}:{flashcard_id}".encode()).decode().rstrip("=")
+
+
+def decode_change_cursor(cursor: Optional[str]) -> Tuple[int, int]:
+    """(change_seq, id) position of a cursor; no cursor means the start of the feed"""
+    if not cursor:
+        return 0, 0
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        change_seq, flashcard_id = (int(part) for part in decoded.split(":"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError("Invalid change cursor", details={"cursor": cursor}) from None
+    return change_seq, flashcard_id
+
+
+def _changes_query(user_id: str, cursor: Optional[str], limit: int):
+    """Cards of ``user_id`` written after ``cursor``, in feed order"""
+    change_seq, flashcard_id = decode_change_cursor(cursor)
+    return (
+        select(Flashcard)
+        .where(
+            Flashcard.user_id == user_id,
+            or_(
+                Flashcard.change_seq > change_seq,
+                and_(Flashcard.change_seq == change_seq, Flashcard.id > flashcard_id),
+            ),
+        )
+        .order_by(Flashcard.change_seq, Flashcard.id)
+        .limit(limit)
+    )
+
+
+def _supports_bulk_returning(dialect) -> bool:
+    """Whether one executemany INSERT can return the new rows in parameter order"""
+    return bool(getattr(dialect, "insert_executemany_returning_sort_by_parameter_order", False))
+
+
+def _batch_total_update(batch_id: str, added: int):
+    """Statement adding ``added`` cards to a batch's total"""
+    return (
+        update(FlashcardBatch)
+        .where(FlashcardBatch.batch_id == batch_id)
+        .values(total_cards=func.coalesce(FlashcardBatch.total_cards, 0) + added)
+    )
+
+
+_SQLITE_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def _sqlite_pragmas(settings: Settings, read_only: bool = False) -> List[str]:
+    """Per-connection PRAGMAs for a file SQLite database"""
+    synchronous = settings.sqlite_synchronous.upper()
+    if synchronous not in _SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(_SQLITE_SYNCHRONOUS_MODES)}")
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA synchronous = {synchronous}",
+        f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}",
+    ]
+    if settings.sqlite_wal_enabled:
+        # Persistent in the file; repeating it on connect is a no-op
+        pragmas.insert(0, "PRAGMA journal_mode = WAL")
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    return pragmas
+
+
+def _configure_sqlite(engine: Engine, pragmas: List[str], begin: str):
+    """Run ``pragmas`` on every new connection and open transactions with ``begin``
+
+    pysqlite starts transactions lazily with a deferred BEGIN, so a writer
+    only asks for the write lock at its first INSERT and fails with
+    "database is locked" when it cannot upgrade. Taking over BEGIN lets
+    writers use BEGIN IMMEDIATE, which waits (up to busy_timeout) for the
+    lock before doing any work.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql(begin)
 
 
 class DatabaseService:
@@ -34,20 +254,82 @@ class DatabaseService:
             # Ensure SQLite directory exists
             self._ensure_sqlite_directory()
 
-        # Create engine with appropriate settings
+        # Create engines with appropriate settings; pools are bounded by the DB_POOL_* settings
         if self.database_url.startswith("postgresql"):
             # PostgreSQL settings
+            pool_options = self._pool_options(settings)
             self.engine = create_engine(
                 self.database_url,
+                poolclass=TimedQueuePool,
                 pool_pre_ping=True,  # Verify connections before use
-                pool_recycle=300,  # Recycle connections every 5 minutes
+                **pool_options,
             )
-        else:
-            # SQLite settings
+            self.async_engine = create_async_engine(
+                to_async_url(self.database_url),
+                poolclass=TimedAsyncAdaptedQueuePool,
+                pool_pre_ping=True,
+                **pool_options,
+            )
+            self.async_read_engine = self.async_engine
+        elif self._is_memory_database():
+            # In-memory SQLite needs SQLAlchemy's single-connection pools
             self.engine = create_engine(self.database_url, connect_args={"check_same_thread": False})
+            self.async_engine = create_async_engine(to_async_url(self.database_url))
+            self.async_read_engine = self.async_engine
+        else:
+            # SQLite allows one writer at a time, so the async write engine is the only
+            # writer and holds a single connection: writers in this process queue on the
+            # pool instead of on the file lock. The sync engine and a separate async pool
+            # are read-only; migrations get their own short-lived writer (init_database)
+            pool_options = self._pool_options(settings)
+            writer_options = dict(pool_options, pool_size=1, max_overflow=0)
+            self.engine = create_engine(
+                self.database_url,
+                poolclass=TimedQueuePool,
+                connect_args={"check_same_thread": False},
+                **pool_options,
+            )
+            self.async_engine = create_async_engine(
+                to_async_url(self.database_url), poolclass=TimedAsyncAdaptedQueuePool, **writer_options
+            )
+            self.async_read_engine = create_async_engine(
+                to_async_url(self.database_url), poolclass=TimedAsyncAdaptedQueuePool, **pool_options
+            )
+
+            self._writer_pragmas = _sqlite_pragmas(settings)
+            reader_pragmas = _sqlite_pragmas(settings, read_only=True)
+            _configure_sqlite(self.engine, reader_pragmas, "BEGIN")
+            _configure_sqlite(self.async_engine.sync_engine, self._writer_pragmas, "BEGIN IMMEDIATE")
+            _configure_sqlite(self.async_read_engine.sync_engine, reader_pragmas, "BEGIN")
+            self.async_read_engine.sync_engine.pool.pool_metrics = PoolMetrics("async_read")
 
-        # Create session factory
+        self.engine.pool.pool_metrics = PoolMetrics("sync")
+        self.async_engine.sync_engine.pool.pool_metrics = PoolMetrics("async")
+
+        # Create session factories; async sessions keep attributes loaded after commit
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+        if self.async_read_engine is self.async_engine:
+            # PostgreSQL and in-memory SQLite read through the main engine
+            self.AsyncReadSessionLocal = self.AsyncSessionLocal
+        else:
+            self.AsyncReadSessionLocal = async_sessionmaker(self.async_read_engine, autoflush=False, expire_on_commit=False)
+
+    @staticmethod
+    def _pool_options(settings: Settings) -> dict:
+        """Pool bounds shared by the sync and async engines"""
+        return {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout_seconds,
+            "pool_recycle": settings.db_pool_recycle_seconds,
+        }
+
+    def _is_memory_database(self) -> bool:
+        return self.database_url in ("sqlite://", "sqlite:///") or ":memory:" in self.database_url
+
+    def _is_file_sqlite(self) -> bool:
+        return self.database_url.startswith("sqlite") and not self._is_memory_database()
 
     def _ensure_sqlite_directory(self):
         """Ensure the directory for SQLite database exists"""
@@ -58,34 +340,57 @@ class DatabaseService:
             # Create directory if it doesn't exist
             db_dir.mkdir(parents=True, exist_ok=True)
 
-    def init_database(self):
-        """Initialize database tables"""
-        Base.metadata.create_all(bind=self.engine)
+    def init_database(self) -> int:
+        """Bring the schema up to date by applying pending migrations"""
+        if not self._is_file_sqlite():
+            return run_migrations(self.engine)
+
+        # The sync engine is read-only on file SQLite; migrate through a
+        # one-connection writer that is closed before the app starts writing
+        engine = create_engine(self.database_url, poolclass=NullPool)
+        _configure_sqlite(engine, self._writer_pragmas, "BEGIN IMMEDIATE")
+        try:
+            return run_migrations(engine)
+        finally:
+            engine.dispose()
 
     def get_db(self) -> Generator[Session, None, None]:
-        """Dependency for getting database session"""
+        """Dependency for getting a sync database session (read-only on file SQLite)"""
         db = self.SessionLocal()
         try:
             yield db
         finally:
             db.close()
 
+    def pool_stats(self) -> dict:
+        """Checkout/wait counters and live gauges for each connection pool"""
+        pools = {"sync": self.engine.pool, "async": self.async_engine.sync_engine.pool}
+        if self.async_read_engine is not self.async_engine:
+            pools["async_read"] = self.async_read_engine.sync_engine.pool
+        stats = {}
+        for name, pool in pools.items():
+            metrics = getattr(pool, "pool_metrics", None)
+            stats[name] = metrics.stats(pool) if metrics is not None else {"pool": type(pool).__name__}
+        return stats
+
 
-class FlashcardService:
-    """Service for managing flashcard operations"""
+class AsyncFlashcardService:
+    """Service for managing flashcard operations on the event loop"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_batch(self, user_id: str, source_url: Optional[str] = None) -> str:
-        """Create a new flashcard batch and return batch_id"""
+    async def create_batch(self, user_id: str, source_url: Optional[str] = None, commit: bool = True) -> str:
+        """Create a new flashcard batch and return batch_id (flushed only with ``commit=False``)"""
         batch_id = str(uuid.uuid4())
-        batch = FlashcardBatch(user_id=user_id, batch_id=batch_id, source_url=source_url)
-        self.db.add(batch)
-        self.db.commit()
+        self.db.add(FlashcardBatch(user_id=user_id, batch_id=batch_id, source_url=source_url))
+        if commit:
+            await self.db.commit()
+        else:
+            await self.db.flush()
         return batch_id
 
-    def add_flashcard(
+    async def add_flashcard(
         self,
         user_id: str,
         front: str,
@@ -96,8 +401,9 @@ class FlashcardService:
         deck_name: str = "Default",
         tags: Optional[str] = None,
         difficulty: Optional[str] = None,
+        commit: bool = True,
     ) -> Flashcard:
-        """Add a new flashcard to the database"""
+        """Add a new flashcard to the database (flushed only with ``commit=False``)"""
         flashcard = Flashcard(
             user_id=user_id,
             front=front,
@@ -107,61 +413,355 @@ class FlashcardService:
             deck_name=deck_name,
             tags=tags,
             difficulty=difficulty,
+            batch_id=batch_id,
+            change_seq=await self._next_change_seq(user_id),
         )
         self.db.add(flashcard)
-        self.db.commit()
-        self.db.refresh(flashcard)
+        if batch_id:
+            await self.db.execute(_batch_total_update(batch_id, 1))
+        if not commit:
+            await self.db.flush()
+            return flashcard
+        await self.db.commit()
+        await self.db.refresh(flashcard)
         return flashcard
 
-    def get_pending_flashcards(self, user_id: str) -> List[Flashcard]:
-        """Get all pending flashcards for a user"""
-        return (
-            self.db.query(Flashcard)
-            .filter(Flashcard.user_id == user_id, Flashcard.status == "pending")
+    async def add_flashcards_bulk(
+        self, flashcards: List[Dict[str, Any]], batch_id: Optional[str] = None, commit: bool = True
+    ) -> List[Flashcard]:
+        """Insert many flashcards in a single transaction
+
+        Each item takes the same fields as ``add_flashcard``. Ids and
+        defaults come back through INSERT ... RETURNING where the database
+        supports it. When ``batch_id`` is given, the cards are linked to that
+        batch and its total is updated in the same transaction.
+        """
+        if not flashcards:
+            return []
+
+        rows = _bulk_rows(flashcards, batch_id)
+        # Counter rows are locked in a stable order so concurrent writers cannot deadlock
+        user_ids = sorted({row["user_id"] for row in rows})
+        change_seqs = {user_id: await self._next_change_seq(user_id) for user_id in user_ids}
+        for row in rows:
+            row["change_seq"] = change_seqs[row["user_id"]]
+
+        if _supports_bulk_returning(self.db.get_bind().dialect):
+            statement = insert(Flashcard).returning(Flashcard, sort_by_parameter_order=True)
+            created = list((await self.db.scalars(statement, rows)).all())
+        else:
+            created = [Flashcard(**row) for row in rows]
+            self.db.add_all(created)
+            await self.db.flush()
+
+        if batch_id:
+            await self.db.execute(_batch_total_update(batch_id, len(created)))
+
+        await self._finish(commit)
+        return created
+
+    async def _finish(self, commit: bool):
+        """Commit, or only flush when the caller owns the transaction"""
+        if commit:
+            await self.db.commit()
+        else:
+            await self.db.flush()
+
+    async def _next_change_seq(self, user_id: str) -> int:
+        """Bump the user's change version; rows written in this transaction carry it"""
+        result = await self.db.execute(_bump_change_version(self.db.get_bind().dialect.name, user_id))
+        return result.scalar_one()
+
+    async def get_change_version(self, user_id: str) -> int:
+        """The user's current change version (0 before their first write)"""
+        version = await self.db.scalar(select(UserChangeVersion.version).where(UserChangeVersion.user_id == user_id))
+        return version or 0
+
+    async def get_changes(self, user_id: str, cursor: Optional[str] = None, limit: int = 100) -> List[Flashcard]:
+        """Cards created or changed after ``cursor``, oldest change first"""
+        return list((await self.db.scalars(_changes_query(user_id, cursor, limit))).all())
+
+    async def get_pending_flashcards(self, user_id: str, limit: Optional[int] = None) -> List[Flashcard]:
+        """Get pending flashcards for a user, newest first, skipping cards leased to a client"""
+        result = await self.db.execute(
+            select(Flashcard)
+            .where(Flashcard.user_id == user_id, Flashcard.status == "pending", _not_leased(datetime.utcnow()))
             .order_by(Flashcard.created_at.desc())
-            .all()
+            .limit(limit)
         )
+        return list(result.scalars().all())
 
-    def mark_flashcards_synced(self, flashcard_ids: List[int]) -> int:
-        """Mark multiple flashcards as synced"""
-        from datetime import datetime
+    async def reclaim_expired_leases(self, user_id: str, commit: bool = True) -> int:
+        """Release all of the user's pending cards whose lease ran out, in one statement
 
-        updated_count = (
-            self.db.query(Flashcard)
-            .filter(Flashcard.id.in_(flashcard_ids))
-            .update({"status": "synced", "synced_at": datetime.utcnow()}, synchronize_session=False)
+        Reclaimed cards take the user's next change version, so they show up
+        again in every client's change feed. Their lease_id is kept: a late
+        acknowledgement of that lease still counts until the card is leased
+        again.
+        """
+        expired = (
+            Flashcard.user_id == user_id,
+            Flashcard.status == "pending",
+            Flashcard.lease_expires_at <= datetime.utcnow(),
         )
+        # Only bump the change version when there is something to reclaim
+        if await self.db.scalar(select(Flashcard.id).where(*expired).limit(1)) is None:
+            return 0
 
-        self.db.commit()
-        return updated_count
+        result = await self.db.execute(
+            update(Flashcard)
+            .where(*expired)
+            .values(lease_expires_at=None, change_seq=await self._next_change_seq(user_id))
+            .execution_options(synchronize_session=False)
+        )
+        await self._finish(commit)
+        return result.rowcount
 
-    def mark_flashcard_failed(self, flashcard_id: int, error_message: Optional[str] = None) -> bool:
-        """Mark a flashcard as failed to sync"""
-        flashcard = self.db.query(Flashcard).filter(Flashcard.id == flashcard_id).first()
-        if flashcard:
-            flashcard.status = "failed"
-            # Could add error_message field to model later
-            self.db.commit()
-            return True
-        return False
+    async def lease_flashcards(
+        self, user_id: str, flashcard_ids: List[int], lease_seconds: int, commit: bool = True
+    ) -> List[Flashcard]:
+        """Lease those of the given pending cards that no other client holds, under one new lease
 
-    def get_flashcard_stats(self, user_id: str) -> dict:
-        """Get statistics for user's flashcards"""
-        from sqlalchemy import func
+        Returns the cards actually leased. Leasing is not a change: it does
+        not move the cards in the change feed.
+        """
+        if not flashcard_ids:
+            return []
 
-        stats = (
-            self.db.query(Flashcard.status, func.count(Flashcard.id))
-            .filter(Flashcard.user_id == user_id)
-            .group_by(Flashcard.status)
-            .all()
+        lease_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        await self.db.execute(
+            update(Flashcard)
+            .where(
+                Flashcard.id.in_(flashcard_ids),
+                Flashcard.user_id == user_id,
+                Flashcard.status == "pending",
+                _not_leased(now),
+            )
+            .values(lease_id=lease_id, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        leased = await self.db.scalars(
+            select(Flashcard)
+            .where(Flashcard.lease_id == lease_id)
+            .order_by(Flashcard.id)
+            .execution_options(populate_existing=True)
+        )
+        leased_cards = list(leased.all())
+        await self._finish(commit)
+        return leased_cards
+
+    async def lease_pending_flashcards(
+        self, user_id: str, lease_seconds: int, limit: Optional[int] = None, commit: bool = True
+    ) -> List[Flashcard]:
+        """Reclaim expired leases, then lease up to ``limit`` available pending cards (newest first)"""
+        await self.reclaim_expired_leases(user_id, commit=False)
+        available = await self.get_pending_flashcards(user_id, limit=limit)
+        leased_ids = {
+            flashcard.id
+            for flashcard in await self.lease_flashcards(
+                user_id, [flashcard.id for flashcard in available], lease_seconds, commit=False
+            )
+        }
+        await self._finish(commit)
+        return [flashcard for flashcard in available if flashcard.id in leased_ids]
+
+    async def acknowledge_flashcards(
+        self, user_id: str, flashcard_ids: List[int], lease_id: Optional[str] = None, commit: bool = True
+    ) -> Dict[int, AckOutcome]:
+        """Mark the user's cards as synced and report what happened to each id
+
+        Ids of other users' cards are ``not_found``. With ``lease_id`` only
+        cards received under that lease are acknowledged. Acknowledging a
+        card again reports ``already_synced``, so retries are safe.
+        """
+        return await self._change_status(user_id, flashcard_ids, "synced", lease_id, commit)
+
+    async def report_failed_flashcards(
+        self, user_id: str, flashcard_ids: List[int], lease_id: Optional[str] = None, commit: bool = True
+    ) -> Dict[int, AckOutcome]:
+        """Mark the user's cards as failed to sync and report what happened to each id
+
+        Synced cards stay synced. Failed cards drop out of the pending set
+        and their leases end.
+        """
+        return await self._change_status(user_id, flashcard_ids, "failed", lease_id, commit)
+
+    async def _change_status(
+        self, user_id: str, flashcard_ids: List[int], status: str, lease_id: Optional[str], commit: bool
+    ) -> Dict[int, AckOutcome]:
+        outcomes: Dict[int, AckOutcome] = {}
+        ready_chunks = []
+        for chunk in _id_chunks(flashcard_ids):
+            rows = (await self.db.execute(_status_rows(user_id, chunk))).all()
+            chunk_outcomes, ready = _plan_status_change(chunk, rows, status, lease_id)
+            outcomes.update(chunk_outcomes)
+            if ready:
+                ready_chunks.append(ready)
+
+        # The planned rows are locked, so the updates change exactly them; a
+        # request that changes nothing leaves the user's version alone
+        if ready_chunks:
+            # Every chunk of one request shares a single change version
+            change_seq = await self._next_change_seq(user_id)
+            for ready in ready_chunks:
+                await self.db.execute(_status_update(user_id, ready, status, lease_id, change_seq))
+        await self._finish(commit)
+        return outcomes
+
+    async def get_flashcard_stats(self, user_id: str) -> dict:
+        """Get statistics for user's flashcards"""
+        rows = await self.db.execute(
+            select(Flashcard.status, func.count(Flashcard.id)).where(Flashcard.user_id == user_id).group_by(Flashcard.status)
         )
 
         result = {"pending": 0, "synced": 0, "failed": 0}
-        for status, count in stats:
+        for status, count in rows.all():
             result[status] = count
 
         return result
 
 
+# A unit of write work: runs against a service whose session it must not commit
+WriteOperation = Callable[[AsyncFlashcardService], Awaitable[T]]
+
+
+class SessionWriter:
+    """Runs each write operation in its own transaction on one session (the default path)"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run(self, operation: WriteOperation[T]) -> T:
+        try:
+            result = await operation(AsyncFlashcardService(self.db))
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return result
+
+
+class GroupCommitter:
+    """Coalesces write operations from concurrent requests into shared transactions
+
+    Operations submitted within ``window_seconds`` of each other (or until
+    ``max_batch`` are waiting) run back to back in one transaction and are
+    committed with a single fsync. Each runs inside its own SAVEPOINT, so a
+    failing operation is rolled back and re-raised to its caller alone; the
+    others still commit. ``run`` resolves with the operation's own result
+    once the shared transaction has committed.
+
+    Transactions are committed one at a time, which suits SQLite's single
+    writer and keeps the number of connections used for writes at one.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        window_seconds: float = 0.005,
+        max_batch: int = 256,
+    ):
+        self._session_factory = session_factory
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: List[Tuple[WriteOperation[Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._commit_lock = asyncio.Lock()
+        self._transactions = 0
+        self._operations = 0
+        self._failures = 0
+
+    async def run(self, operation: WriteOperation[T]) -> T:
+        """Queue ``operation`` for the next shared transaction and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((operation, future))
+        if len(self._pending) >= self.max_batch:
+            self._spawn(self._commit(self._take()))
+        elif self._timer is None:
+            self._timer = self._spawn(self._commit_after_window())
+        return await future
+
+    def _spawn(self, coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _take(self) -> List[Tuple[WriteOperation[Any], asyncio.Future]]:
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+        return batch
+
+    async def _commit_after_window(self):
+        await asyncio.sleep(self.window_seconds)
+        self._timer = None
+        batch = self._take()
+        if self._pending:
+            self._timer = self._spawn(self._commit_after_window())
+        await self._commit(batch)
+
+    async def _commit(self, batch: List[Tuple[WriteOperation[Any], asyncio.Future]]):
+        # Callers that were cancelled while waiting are skipped
+        batch = [(operation, future) for operation, future in batch if not future.done()]
+        if not batch:
+            return
+
+        async with self._commit_lock:
+            outcomes: List[Tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+            try:
+                async with self._session_factory() as db:
+                    async with db.begin():
+                        service = AsyncFlashcardService(db)
+                        for operation, future in batch:
+                            try:
+                                async with db.begin_nested():
+                                    outcomes.append((future, await operation(service), None))
+                            except Exception as e:
+                                outcomes.append((future, None, e))
+            except Exception as e:
+                # The shared transaction itself failed: nothing was committed
+                self._failures += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self._transactions += 1
+            self._operations += len(batch)
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """Commit whatever is still queued"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            await self._commit(self._take())
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Transactions committed and how many operations each carried"""
+        return {
+            "transactions": self._transactions,
+            "operations": self._operations,
+            "failed_transactions": self._failures,
+            "avg_operations_per_transaction": (round(self._operations / self._transactions, 2) if self._transactions else 0.0),
+            "queued": len(self._pending),
+        }
+
+
+# What routes write through: SessionWriter by default, GroupCommitter when enabled
+FlashcardWriter = Union[SessionWriter, GroupCommitter]
+
+
 # Global database service instance
 db_service = DatabaseService()
@@ -0,0 +1,102 @@
+"""
+Connection pools that record checkout and wait metrics.
+
+``TimedQueuePool`` and ``TimedAsyncAdaptedQueuePool`` behave exactly like
+SQLAlchemy's queue pools but time how long each checkout waited for a free
+connection and count checkouts, checkins and pool timeouts into a
+``PoolMetrics`` instance shared by every pool an engine recreates.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """Thread-safe counters for one engine's connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._checkouts = 0
+        self._checkins = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def record_checkin(self):
+        with self._lock:
+            self._checkins += 1
+
+    def record_timeout(self, waited: float):
+        with self._lock:
+            self._timeouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+    def stats(self, pool: Optional[Pool] = None) -> Dict[str, Any]:
+        """Snapshot of the counters plus the pool's live gauges when given"""
+        with self._lock:
+            snapshot: Dict[str, Any] = {
+                "checkouts": self._checkouts,
+                "checkins": self._checkins,
+                "timeouts": self._timeouts,
+                "wait_avg_ms": round(1000 * self._wait_total / self._checkouts, 3) if self._checkouts else 0.0,
+                "wait_max_ms": round(1000 * self._wait_max, 3),
+            }
+        if isinstance(pool, QueuePool):
+            snapshot.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                }
+            )
+        return snapshot
+
+
+class _TimedPoolMixin:
+    """Times ``_do_get`` (where callers wait for a connection) and counts returns"""
+
+    pool_metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()  # type: ignore[misc]
+        except exc.TimeoutError:
+            if self.pool_metrics is not None:
+                self.pool_metrics.record_timeout(time.perf_counter() - started)
+            raise
+        if self.pool_metrics is not None:
+            self.pool_metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)  # type: ignore[misc]
+        if self.pool_metrics is not None:
+            self.pool_metrics.record_checkin()
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting into the same metrics
+        pool = super().recreate()  # type: ignore[misc]
+        pool.pool_metrics = self.pool_metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool with checkout/wait metrics"""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout/wait metrics"""
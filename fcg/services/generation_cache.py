@@ -0,0 +1,208 @@
+"""
+Content-addressed cache for LLM flashcard generations.
+
+Entries are stored in the application database so every uvicorn worker shares
+them. The key is a sha256 digest of the whitespace-normalized input text, the
+model name, the requested card count and the pipeline version, so changing any
+of those naturally misses the cache.
+
+Lookups only read, through the read pool. Hits are counted in memory and
+written in one statement per entry together with the next cache write (or
+once ``HIT_FLUSH_THRESHOLD`` entries are pending, or at shutdown), so a
+lookup never takes SQLite's write lock. Writes go through the async write
+engine, SQLite's single writer.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fcg.models.generation_cache import GenerationCacheEntry
+from fcg.services.database import DatabaseService
+from fcg.utils.logging import logger
+
+# Distinct entries hit since the last write before their usage is flushed on a lookup
+HIT_FLUSH_THRESHOLD = 100
+
+
+class GenerationCache:
+    """Database-backed generation cache with TTL and size-based eviction"""
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_entries: int = 10000,
+        enabled: bool = True,
+    ):
+        self.database = database
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        self._errors = 0
+        # cache_key -> (hits, last hit) not yet written; flushed with the next write
+        self._pending_hits: Dict[str, Tuple[int, datetime]] = {}
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Collapse whitespace so cosmetic differences map to the same key"""
+        return " ".join(text.split())
+
+    @classmethod
+    def make_key(cls, text: str, model: str, num_cards: int, pipeline_version: str) -> str:
+        """Build the content-addressed cache key for a generation request"""
+        payload = json.dumps(
+            [cls.normalize_text(text), model, num_cards, pipeline_version],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached flashcards for ``key`` or None on a miss"""
+        if not self.enabled:
+            return None
+
+        try:
+            async with self.database.AsyncReadSessionLocal() as db:
+                entry = await db.get(GenerationCacheEntry, key)
+                if entry is None or self._is_expired(entry):
+                    self._count("_misses")
+                    return None
+                flashcards = json.loads(entry.flashcards)
+        except Exception as e:
+            # A broken cache must never break generation
+            self._count("_errors")
+            logger.warning("Generation cache lookup failed: %s", e)
+            return None
+
+        self._count("_hits")
+        self._record_hit(key)
+        if len(self._pending_hits) >= HIT_FLUSH_THRESHOLD:
+            await self.flush()
+        return flashcards
+
+    async def set(self, key: str, flashcards: List[Dict[str, Any]], model: str, num_cards: int, pipeline_version: str):
+        """Store flashcards under ``key``, replacing any previous entry"""
+        if not self.enabled:
+            return
+
+        now = datetime.utcnow()
+        try:
+            async with self.database.AsyncSessionLocal() as db:
+                await db.merge(
+                    GenerationCacheEntry(
+                        cache_key=key,
+                        model=model,
+                        num_cards=num_cards,
+                        pipeline_version=pipeline_version,
+                        flashcards=json.dumps(flashcards),
+                        hit_count=0,
+                        created_at=now,
+                        last_accessed_at=now,
+                    )
+                )
+                # Same transaction: recorded hits keep the LRU order right for eviction
+                hits = self._take_pending_hits()
+                await self._apply_hits(db, hits)
+                await db.flush()
+                removed = await self._evict(db)
+                await db.commit()
+        except Exception as e:
+            self._count("_errors")
+            logger.warning("Generation cache write failed: %s", e)
+            return
+
+        self._count("_writes")
+        if removed:
+            self._count("_evictions", removed)
+
+    async def flush(self):
+        """Write recorded hits (hit_count and last_accessed_at) in one transaction"""
+        hits = self._take_pending_hits()
+        if not hits:
+            return
+        try:
+            async with self.database.AsyncSessionLocal() as db:
+                await self._apply_hits(db, hits)
+                await db.commit()
+        except Exception as e:
+            # Usage statistics only; losing them just makes eviction less precise
+            self._count("_errors")
+            logger.warning("Generation cache hit flush failed: %s", e)
+
+    def _record_hit(self, key: str):
+        with self._lock:
+            count, _ = self._pending_hits.get(key, (0, None))
+            self._pending_hits[key] = (count + 1, datetime.utcnow())
+
+    def _take_pending_hits(self) -> Dict[str, Tuple[int, datetime]]:
+        with self._lock:
+            hits, self._pending_hits = self._pending_hits, {}
+        return hits
+
+    @staticmethod
+    async def _apply_hits(db: AsyncSession, hits: Dict[str, Tuple[int, datetime]]):
+        for key, (count, accessed_at) in hits.items():
+            await db.execute(
+                update(GenerationCacheEntry)
+                .where(GenerationCacheEntry.cache_key == key)
+                .values(
+                    hit_count=func.coalesce(GenerationCacheEntry.hit_count, 0) + count,
+                    last_accessed_at=accessed_at,
+                )
+            )
+
+    async def _evict(self, db: AsyncSession) -> int:
+        """Drop expired entries, then the least recently used ones over the size limit"""
+        removed = 0
+        if self.ttl_seconds:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            result = await db.execute(delete(GenerationCacheEntry).where(GenerationCacheEntry.created_at < cutoff))
+            removed += result.rowcount
+
+        if self.max_entries:
+            overflow = (await db.execute(select(func.count()).select_from(GenerationCacheEntry))).scalar() - self.max_entries
+            if overflow > 0:
+                stale_keys = (
+                    select(GenerationCacheEntry.cache_key)
+                    .order_by(GenerationCacheEntry.last_accessed_at.asc())
+                    .limit(overflow)
+                    .scalar_subquery()
+                )
+                result = await db.execute(delete(GenerationCacheEntry).where(GenerationCacheEntry.cache_key.in_(stale_keys)))
+                removed += result.rowcount
+        return removed
+
+    def _is_expired(self, entry: GenerationCacheEntry) -> bool:
+        if not self.ttl_seconds or entry.created_at is None:
+            return False
+        return entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of hit/miss counters for this process"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "writes": self._writes,
+                "evictions": self._evictions,
+                "errors": self._errors,
+                "pending_hits": len(self._pending_hits),
+            }
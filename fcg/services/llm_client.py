@@ -0,0 +1,135 @@
+"""
+App-scoped LLM client.
+
+Owns the DSPy language models and the HTTP connection pool they share.
+Nothing is built at import time: LMs (and with them litellm) are created on
+first use, so processes that never generate flashcards never pay for them.
+
+Models are bound per call through ``dspy.context`` by ``ResilientInvoker``
+rather than with ``dspy.configure``, so a request can override the model
+without touching global DSPy state.
+"""
+
+import sys
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import httpx
+
+from fcg.config.settings import Settings
+from fcg.utils.llm_resilience import ResilientInvoker
+
+if TYPE_CHECKING:
+    import dspy
+
+OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
+
+
+class LLMClient:
+    """Lazily built DSPy LMs, resilient invoker and pooled HTTP client for one application"""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.default_model = settings.openrouter_model
+        self._lms: Dict[str, "dspy.LM"] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional[httpx.Client] = None
+        self._invoker: Optional[ResilientInvoker] = None
+
+    def models_for(self, model: Optional[str] = None) -> List[str]:
+        """Ordered models to try for a call: the requested (or default) model, then the fallbacks"""
+        models = [model or self.default_model]
+        for fallback in self.settings.openrouter_fallback_models:
+            if fallback not in models:
+                models.append(fallback)
+        return models
+
+    def model_name(self, model: Optional[str] = None) -> str:
+        """Provider-qualified name of a model, as used in cache keys"""
+        return f"openrouter/{model or self.default_model}"
+
+    def lm(self, model: Optional[str] = None) -> "dspy.LM":
+        """Return the LM for ``model`` (default model if None), building it on first use"""
+        model = model or self.default_model
+        with self._lock:
+            if model not in self._lms:
+                self._lms[model] = self._build_lm(model)
+            return self._lms[model]
+
+    def _build_lm(self, model: str) -> "dspy.LM":
+        import dspy
+        import litellm
+
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.settings.llm_http_max_connections,
+                    max_keepalive_connections=self.settings.llm_http_max_keepalive_connections,
+                ),
+                timeout=self.settings.llm_timeout_seconds,
+            )
+            # Every LM shares one keep-alive pool instead of opening connections per call
+            litellm.client_session = self._http_client
+
+        return dspy.LM(
+            model=self.model_name(model),
+            api_base=OPENROUTER_API_BASE,
+            api_key=self.settings.openrouter_api_key,
+            max_tokens=self.settings.openrouter_max_tokens,
+            num_retries=0,  # Retries are handled by ResilientInvoker
+            # GenerationCache is the only response cache; DSPy's would answer bypass_cache requests too
+            cache=False,
+        )
+
+    @property
+    def invoker(self) -> ResilientInvoker:
+        """Invoker adding deadlines, retries, hedging and model fallback to stage calls"""
+        with self._lock:
+            if self._invoker is None:
+                settings = self.settings
+                self._invoker = ResilientInvoker(
+                    models=self.models_for(),
+                    lm_factory=self.lm,
+                    stage_deadlines=settings.llm_stage_deadlines,
+                    default_deadline=settings.llm_stage_default_deadline_seconds,
+                    max_retries=settings.llm_max_retries,
+                    backoff_base=settings.llm_backoff_base_seconds,
+                    backoff_max=settings.llm_backoff_max_seconds,
+                    hedging_enabled=settings.llm_hedging_enabled,
+                    hedge_percentile=settings.llm_hedge_percentile,
+                    hedge_min_samples=settings.llm_hedge_min_samples,
+                    # Hedges may double the calls of every executor worker
+                    max_workers=settings.llm_max_workers * 2,
+                )
+            return self._invoker
+
+    def warm_up(self):
+        """Start the invoker, and build the default LM when LLM_EAGER_INIT is set"""
+        self.invoker
+        if self.settings.llm_eager_init:
+            self.lm()
+
+    def close(self):
+        """Release the invoker threads and the HTTP connection pool"""
+        with self._lock:
+            if self._invoker is not None:
+                self._invoker.shutdown()
+                self._invoker = None
+            if self._http_client is not None:
+                litellm = sys.modules.get("litellm")
+                if litellm is not None and litellm.client_session is self._http_client:
+                    litellm.client_session = None
+                self._http_client.close()
+                self._http_client = None
+            self._lms.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Loaded models and invoker counters, without building anything"""
+        with self._lock:
+            invoker = self._invoker
+            loaded = sorted(self._lms)
+        return {
+            "default_model": self.default_model,
+            "loaded_models": loaded,
+            "invoker": invoker.stats() if invoker is not None else None,
+        }
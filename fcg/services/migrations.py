@@ -0,0 +1,266 @@
+"""
+Versioned schema migrations, applied at startup.
+
+Each migration has an integer version and runs in its own transaction. The
+versions applied so far are recorded in the ``schema_migrations`` table, so a
+database only ever runs the migrations it has not seen. Databases created
+before migrations existed are detected by their tables and brought forward
+from the baseline without losing data.
+
+Migrations describe the schema as it was at that version with their own Core
+tables, never with the ORM models, which always reflect the latest schema.
+
+To change the schema, append a new ``Migration`` to ``MIGRATIONS``; never
+edit one that has shipped.
+"""
+
+from datetime import datetime
+from typing import Callable, List
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    SmallInteger,
+    String,
+    Table,
+    Text,
+    inspect,
+    text,
+)
+from sqlalchemy.engine import Connection
+
+from fcg.utils.logging import logger
+
+# Arbitrary key for the PostgreSQL advisory lock serializing concurrent migrators
+_PG_LOCK_KEY = 7_310_214
+
+
+class Migration:
+    """One schema change"""
+
+    def __init__(self, version: int, description: str, upgrade: Callable[[Connection], None]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+
+_migrations_table = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _baseline(connection: Connection):
+    """v1: tables as they were before migrations (create_all); existing tables are kept"""
+    metadata = MetaData()
+    Table(
+        "flashcards",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", String(255), index=True, nullable=False),
+        Column("front", Text, nullable=False),
+        Column("back", Text, nullable=False),
+        Column("source_url", String(500)),
+        Column("source_text", Text),
+        Column("deck_name", String(255)),
+        Column("status", String(50)),
+        Column("created_at", DateTime),
+        Column("synced_at", DateTime),
+        Column("tags", String(500)),
+        Column("difficulty", String(20)),
+    )
+    Table(
+        "flashcard_batches",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", String(255), index=True, nullable=False),
+        Column("batch_id", String(100), nullable=False),
+        Column("source_url", String(500)),
+        Column("total_cards", Integer),
+        Column("processed_cards", Integer),
+        Column("status", String(50)),
+        Column("created_at", DateTime),
+        Column("completed_at", DateTime),
+    )
+    Table(
+        "generation_cache",
+        metadata,
+        Column("cache_key", String(64), primary_key=True),
+        Column("model", String(255), nullable=False),
+        Column("num_cards", Integer, nullable=False),
+        Column("pipeline_version", String(50), nullable=False),
+        Column("flashcards", Text, nullable=False),
+        Column("hit_count", Integer),
+        Column("created_at", DateTime, index=True),
+        Column("last_accessed_at", DateTime, index=True),
+    )
+    metadata.create_all(connection, checkfirst=True)
+
+
+def _flashcard_batch_link(connection: Connection):
+    """v2: flashcards.batch_id linking cards to their FlashcardBatch"""
+    columns = {column["name"] for column in inspect(connection).get_columns("flashcards")}
+    if "batch_id" not in columns:
+        connection.execute(text("ALTER TABLE flashcards ADD COLUMN batch_id VARCHAR(100)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_flashcards_batch_id ON flashcards (batch_id)"))
+
+
+_STATUS_CODE_SQL = "CASE status WHEN 'synced' THEN 1 WHEN 'failed' THEN 2 ELSE 0 END"
+
+_V3_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_flashcards_user_status_created ON flashcards (user_id, status, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_flashcards_pending ON flashcards (user_id, created_at) WHERE status = 0",
+)
+
+
+def _compact_status_and_indexes(connection: Connection):
+    """v3: SMALLINT status codes, composite (user_id, status, created_at) and partial pending indexes"""
+    status = next(column for column in inspect(connection).get_columns("flashcards") if column["name"] == "status")
+    if isinstance(status["type"], Integer):
+        # Tables created straight from the current models already use codes
+        pass
+    elif connection.dialect.name == "sqlite":
+        _rebuild_sqlite_flashcards(connection)
+    else:
+        connection.execute(text("ALTER TABLE flashcards ALTER COLUMN status DROP DEFAULT"))
+        connection.execute(text(f"ALTER TABLE flashcards ALTER COLUMN status TYPE SMALLINT USING ({_STATUS_CODE_SQL})"))
+        connection.execute(text("ALTER TABLE flashcards ALTER COLUMN status SET DEFAULT 0"))
+        connection.execute(text("ALTER TABLE flashcards ALTER COLUMN status SET NOT NULL"))
+        # The composite index starts with user_id, so the single-column one is redundant
+        connection.execute(text("DROP INDEX IF EXISTS ix_flashcards_user_id"))
+
+    for statement in _V3_INDEXES:
+        connection.execute(text(statement))
+
+
+def _rebuild_sqlite_flashcards(connection: Connection):
+    """SQLite cannot change a column type in place: copy into a new table and swap"""
+    metadata = MetaData()
+    rebuilt = Table(
+        "flashcards_v3",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_id", String(255), nullable=False),
+        Column("front", Text, nullable=False),
+        Column("back", Text, nullable=False),
+        Column("source_url", String(500)),
+        Column("source_text", Text),
+        Column("deck_name", String(255)),
+        Column("batch_id", String(100)),
+        Column("status", SmallInteger, nullable=False, server_default=text("0")),
+        Column("created_at", DateTime),
+        Column("synced_at", DateTime),
+        Column("tags", String(500)),
+        Column("difficulty", String(20)),
+    )
+    metadata.create_all(connection)
+
+    copied = [column.name for column in rebuilt.columns if column.name != "status"]
+    column_list = ", ".join(copied)
+    connection.execute(
+        text(f"INSERT INTO flashcards_v3 ({column_list}, status) " f"SELECT {column_list}, {_STATUS_CODE_SQL} FROM flashcards")
+    )
+    connection.execute(text("DROP TABLE flashcards"))
+    connection.execute(text("ALTER TABLE flashcards_v3 RENAME TO flashcards"))
+
+    # Indexes went away with the old table
+    connection.execute(text("CREATE INDEX ix_flashcards_id ON flashcards (id)"))
+    connection.execute(text("CREATE INDEX ix_flashcards_batch_id ON flashcards (batch_id)"))
+
+
+def _change_feed(connection: Connection):
+    """v4: flashcards.change_seq and per-user change versions for the delta sync feed"""
+    columns = {column["name"] for column in inspect(connection).get_columns("flashcards")}
+    if "change_seq" not in columns:
+        # Existing cards start at version 0, before anything written from now on
+        connection.execute(text("ALTER TABLE flashcards ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_flashcards_user_change ON flashcards (user_id, change_seq, id)"))
+
+    metadata = MetaData()
+    Table(
+        "user_change_versions",
+        metadata,
+        Column("user_id", String(255), primary_key=True),
+        Column("version", BigInteger, nullable=False),
+    )
+    metadata.create_all(connection, checkfirst=True)
+
+
+def _sync_leases(connection: Connection):
+    """v5: lease columns for two-phase sync"""
+    columns = {column["name"] for column in inspect(connection).get_columns("flashcards")}
+    if "lease_id" not in columns:
+        connection.execute(text("ALTER TABLE flashcards ADD COLUMN lease_id VARCHAR(36)"))
+    if "lease_expires_at" not in columns:
+        connection.execute(text(f"ALTER TABLE flashcards ADD COLUMN lease_expires_at {_timestamp_type(connection)}"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_flashcards_lease_id ON flashcards (lease_id)"))
+
+
+def _batch_lookup_index(connection: Connection):
+    """v6: index on flashcard_batches.batch_id, which card inserts use to update their batch"""
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_flashcard_batches_batch_id ON flashcard_batches (batch_id)"))
+
+
+def _timestamp_type(connection: Connection) -> str:
+    """Column type DateTime maps to on this database"""
+    return DateTime().compile(dialect=connection.dialect)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "link flashcards to batches", _flashcard_batch_link),
+    Migration(3, "compact status encoding and pending indexes", _compact_status_and_indexes),
+    Migration(4, "change feed sequence", _change_feed),
+    Migration(5, "sync leases", _sync_leases),
+    Migration(6, "batch lookup index", _batch_lookup_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(connection: Connection) -> int:
+    """Highest applied migration version (0 for an empty database)"""
+    if not inspect(connection).has_table("schema_migrations"):
+        return 0
+    version = connection.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+    return version or 0
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations in order and return the resulting schema version"""
+    with engine.begin() as connection:
+        _migrations_table.create(connection, checkfirst=True)
+
+    for migration in MIGRATIONS:
+        with engine.begin() as connection:
+            _lock(connection)
+            # Re-check under the lock: another worker may have just applied it
+            if current_version(connection) >= migration.version:
+                continue
+
+            logger.info("Applying schema migration %d: %s", migration.version, migration.description)
+            migration.upgrade(connection)
+            connection.execute(
+                _migrations_table.insert().values(
+                    version=migration.version, description=migration.description, applied_at=datetime.utcnow()
+                )
+            )
+
+    with engine.connect() as connection:
+        return current_version(connection)
+
+
+def _lock(connection: Connection):
+    """Serialize migrators across processes for the rest of this transaction"""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_LOCK_KEY})
+    elif connection.dialect.name == "sqlite":
+        # A write statement takes SQLite's RESERVED lock; other migrators wait on it
+        connection.execute(text("UPDATE schema_migrations SET version = version WHERE 0 = 1"))
@@ -4,12 +4,17 @@ OpenRouter Flashcard Generation Service
 This service provides flashcard generation powered by DSPy.
 """
 
-from typing import List
+import hashlib
+import json
+import uuid
+from typing import Any, AsyncIterator, List, Optional
 
 from fcg.config.settings import Settings
 from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
-from fcg.schemas import ChatMessage
+from fcg.schemas import ChatMessage, GenerationTier
+from fcg.utils.flashcard_generator import GenerationContext
 from fcg.utils.flashcard_generator import generate_flashcards as dspy_generate_flashcards
+from fcg.utils.flashcard_generator import stream_flashcards as dspy_stream_flashcards
 
 
 class OpenRouterFlashcardService(FlashcardGeneratorService):
@@ -18,27 +23,53 @@ class OpenRouterFlashcardService(FlashcardGeneratorService):
     Now powered by DSPy for better quality and maintainability.
     """
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, context: Optional[GenerationContext] = None):
         if not settings.openrouter_api_key:
             raise ValueError("OpenRouter API key is required")
 
+        # App-scoped client, executor, cache and coalescing; the app passes the container's
+        self.context = context or GenerationContext.create(settings)
+        self.llm_client = self.context.llm_client
         self.api_key = settings.openrouter_api_key
         self.api_url = settings.openrouter_url
         self.model = settings.openrouter_model
         self.max_tokens = settings.openrouter_max_tokens
+        self.coalescing_enabled = settings.generation_coalescing_enabled
 
-    async def generate_flashcards(self, conversation: List[ChatMessage]) -> List[dict]:
+    @staticmethod
+    def coalescing_key(user_id: str, conversation: List[ChatMessage], **params: Any) -> str:
+        """Key identifying duplicate generation requests from the same user"""
+        text_hash = hashlib.sha256("\n".join(msg.content for msg in conversation).encode("utf-8")).hexdigest()
+        payload = json.dumps([user_id, text_hash, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def generate_flashcards(
+        self,
+        conversation: List[ChatMessage],
+        bypass_cache: bool = False,
+        tier: GenerationTier = GenerationTier.AUTO,
+        user_id: Optional[str] = None,
+        model: Optional[str] = None,
+        num_cards: Optional[int] = None,
+    ) -> List[dict]:
         """
         Generate flashcards from conversation using DSPy-powered generation.
 
         This delegates to the improved DSPy implementation which provides:
         - Simple card count calculation (~1 card per 100 words)
         - 3-stage pipeline: text analysis → concept prioritization → card generation
+        - Single-call "fast" tier, picked automatically for short inputs
         - Structured output with question, answer, explanation, and topic
         - No manual JSON parsing or prompt engineering
+        - Content-addressed result cache shared by all workers
 
         Args:
             conversation: List of ChatMessage objects to generate flashcards from
+            bypass_cache: Skip the cache lookup and regenerate
+            tier: Generation tier; AUTO picks FAST or FULL from input size
+            user_id: Requesting user; identical concurrent requests from the same user share one LLM call
+            model: OpenRouter model to use for this request instead of the configured one
+            num_cards: Number of cards to ask for; None derives it from the input length
 
         Returns:
             List of flashcard dictionaries with id, question, answer, explanation, and topic
@@ -46,5 +77,39 @@ class OpenRouterFlashcardService(FlashcardGeneratorService):
         Raises:
             RuntimeError: If flashcard generation fails
         """
-        return await dspy_generate_flashcards(conversation)
 
+        def generate():
+            return dspy_generate_flashcards(
+                conversation, self.context, bypass_cache=bypass_cache, tier=tier, model=model, num_cards=num_cards
+            )
+
+        if not user_id or not self.coalescing_enabled:
+            return await generate()
+
+        key = self.coalescing_key(
+            user_id, conversation, bypass_cache=bypass_cache, tier=tier, model=model, num_cards=num_cards
+        )
+        cards, _ = await self.context.flight.do(key, generate)
+        # Every caller gets its own copies with fresh ids
+        return [{**card, "id": str(uuid.uuid4())} for card in cards]
+
+    async def stream_flashcards(
+        self,
+        conversation: List[ChatMessage],
+        bypass_cache: bool = False,
+        tier: GenerationTier = GenerationTier.AUTO,
+        user_id: Optional[str] = None,
+        model: Optional[str] = None,
+        num_cards: Optional[int] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Yield flashcards chunk by chunk as the DSPy pipeline produces them.
+
+        Takes the same arguments as ``generate_flashcards``; streams are never
+        coalesced, since each caller persists the cards as they arrive.
+        """
+        cards = dspy_stream_flashcards(
+            conversation, self.context, bypass_cache=bypass_cache, tier=tier, model=model, num_cards=num_cards
+        )
+        async for card in cards:
+            yield card
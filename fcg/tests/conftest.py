@@ -1,3 +1,4 @@
+import os
 from unittest.mock import AsyncMock, Mock
 
 import pytest
@@ -7,6 +8,11 @@ from fcg.config.settings import Settings
 from fcg.interfaces.export_service import ExportService
 from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
 from fcg.interfaces.flashcard_repository import FlashcardRepository
+from fcg.utils.flashcard_generator import GenerationContext
+
+# litellm is imported lazily by the first test that builds an LM; use its bundled
+# model cost map instead of fetching one, so that import never touches the network
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
 
 
 @pytest.fixture
@@ -20,6 +26,15 @@ def mock_settings():
     )
 
 
+@pytest.fixture
+def generation_context(mock_settings):
+    """Standalone generation context, shut down after the test"""
+    context = GenerationContext.create(mock_settings)
+    yield context
+    context.executor.shutdown()
+    context.llm_client.close()
+
+
 @pytest.fixture
 def mock_flashcard_generator():
     """Mock flashcard generator service"""
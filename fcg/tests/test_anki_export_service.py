@@ -1,9 +1,12 @@
+import asyncio
 import json
-from unittest.mock import MagicMock, patch
+import threading
 
+import httpx
 import pytest
 
-from fcg.services.anki_export_service import AnkiExportService
+from fcg.exceptions import AnkiConnectionError, ExportError
+from fcg.services.anki_export_service import AnkiExportService, AsyncAnkiExportService
 
 
 @pytest.fixture
@@ -31,119 +34,147 @@ def sample_flashcards():
     ]
 
 
+class FakeAnkiConnect:
+    """AnkiConnect stand-in recording each request"""
+
+    def __init__(self, refused=(), errors=None, add_failures=()):
+        self.requests = []
+        self.refused = set(refused)  # Fronts canAddNotes rejects
+        self.errors = errors or {}  # action -> error message
+        self.add_failures = set(add_failures)  # Fronts addNotes fails on, erroring the request but adding the rest
+        self.added = {}  # findNotes query -> note id
+        self.next_id = 1000
+
+    def respond(self, action, params):
+        if action in self.errors:
+            return {"result": None, "error": self.errors[action]}
+        if action == "multi":
+            return {"result": [self.respond(a["action"], a.get("params", {})) for a in params["actions"]], "error": None}
+        if action == "canAddNotes":
+            return {"result": [note["fields"]["Front"] not in self.refused for note in params["notes"]], "error": None}
+        if action == "addNotes":
+            ids = []
+            for note in params["notes"]:
+                if note["fields"]["Front"] in self.add_failures:
+                    ids.append(None)
+                    continue
+                ids.append(self.next_id)
+                self.added[f'"deck:{note["deckName"]}" "front:{note["fields"]["Front"]}"'] = self.next_id
+                self.next_id += 1
+            if None in ids:
+                return {"result": None, "error": "['cannot create note because it is empty']"}
+            return {"result": ids, "error": None}
+        if action == "findNotes":
+            note_id = self.added.get(params["query"])
+            return {"result": [note_id] if note_id else [], "error": None}
+        return {"result": None, "error": None}
+
+    def handler(self, request):
+        payload = json.loads(request.content)
+        self.requests.append(payload)
+        return httpx.Response(200, json=self.respond(payload["action"], payload["params"]))
+
+    async def async_handler(self, request):
+        return self.handler(request)
+
+
+@pytest.fixture
+def anki_connect():
+    return FakeAnkiConnect()
+
+
 @pytest.fixture
-def anki_service():
-    """AnkiExportService instance for testing"""
-    return AnkiExportService()
+def anki_service(anki_connect):
+    """AnkiExportService talking to the fake AnkiConnect"""
+    service = AnkiExportService()
+    service._client = httpx.Client(transport=httpx.MockTransport(anki_connect.handler))
+    yield service
+    service.close()
 
 
 class TestAnkiExportService:
     """Test cases for AnkiExportService"""
 
-    @patch("urllib.request.urlopen")
-    def test_export_flashcards_success(self, mock_urlopen, anki_service, sample_flashcards):
-        """Test successful export of flashcards to Anki"""
-        # Arrange
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({"result": None, "error": None}).encode("utf-8")
-        mock_urlopen.return_value = mock_response
-
-        # Act
+    def test_export_flashcards_success(self, anki_service, anki_connect, sample_flashcards):
+        """Test an export takes two round trips: deck + precheck, then one bulk add"""
         result = anki_service.export_flashcards(sample_flashcards)
 
-        # Assert
         assert "Successfully exported 3/3 cards" in result
         assert "FlashcardGen_" in result
-        assert mock_urlopen.call_count == 4  # 1 createDeck + 3 addNote calls
+        assert [request["action"] for request in anki_connect.requests] == ["multi", "addNotes"]
+        multi = anki_connect.requests[0]["params"]["actions"]
+        assert [action["action"] for action in multi] == ["createDeck", "canAddNotes"]
+        assert len(anki_connect.requests[1]["params"]["notes"]) == 3
 
-    @patch("urllib.request.urlopen")
-    def test_export_empty_flashcards(self, mock_urlopen, anki_service):
+    def test_export_empty_flashcards(self, anki_service, anki_connect):
         """Test export with empty flashcard list"""
-        # Act
         result = anki_service.export_flashcards([])
 
-        # Assert
         assert result == "No flashcards to export"
-        mock_urlopen.assert_not_called()
+        assert anki_connect.requests == []
 
-    @patch("urllib.request.urlopen")
-    def test_anki_connection_error(self, mock_urlopen, anki_service, sample_flashcards):
+    def test_anki_connection_error(self, sample_flashcards):
         """Test handling of Anki connection errors"""
-        # Arrange
-        mock_urlopen.side_effect = Exception("Connection refused")
 
-        # Act & Assert
-        with pytest.raises(Exception) as exc_info:
-            anki_service.export_flashcards(sample_flashcards)
+        def refuse(request):
+            raise httpx.ConnectError("Connection refused", request=request)
+
+        service = AnkiExportService()
+        service._client = httpx.Client(transport=httpx.MockTransport(refuse))
+
+        with pytest.raises(ExportError) as exc_info:
+            service.export_flashcards(sample_flashcards)
 
         assert "Failed to export to Anki" in str(exc_info.value)
+        assert isinstance(exc_info.value.__cause__, AnkiConnectionError)
 
-    @patch("urllib.request.urlopen")
-    def test_anki_api_error_response(self, mock_urlopen, anki_service, sample_flashcards):
-        """Test handling of Anki API error responses"""
-        # Arrange
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({"result": None, "error": "Deck already exists"}).encode("utf-8")
-        mock_urlopen.return_value = mock_response
+    def test_timeout_is_a_connection_error(self, sample_flashcards):
+        """Test a hung Anki surfaces as an error instead of blocking"""
 
-        # Act & Assert
-        with pytest.raises(Exception) as exc_info:
-            anki_service.export_flashcards(sample_flashcards)
+        def hang(request):
+            raise httpx.ReadTimeout("timed out", request=request)
 
-        assert "Deck already exists" in str(exc_info.value)
+        service = AnkiExportService(timeout=0.1)
+        service._client = httpx.Client(transport=httpx.MockTransport(hang))
 
-    @patch("urllib.request.urlopen")
-    def test_create_anki_note_with_topic(self, mock_urlopen, anki_service):
-        """Test creating Anki note with topic tag"""
-        # Arrange
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({"result": None, "error": None}).encode("utf-8")
-        mock_urlopen.return_value = mock_response
+        with pytest.raises(ExportError) as exc_info:
+            service.export_flashcards(sample_flashcards)
 
-        card = {
-            "question": "Test question?",
-            "answer": "Test answer",
-            "topic": "Test Topic",
-        }
+        assert "in time" in str(exc_info.value)
 
-        # Act
-        anki_service._create_anki_note("TestDeck", card)
+    def test_anki_api_error_response(self, sample_flashcards):
+        """Test handling of Anki API error responses inside a multi request"""
+        anki_connect = FakeAnkiConnect(errors={"createDeck": "Deck already exists"})
+        service = AnkiExportService()
+        service._client = httpx.Client(transport=httpx.MockTransport(anki_connect.handler))
 
-        # Assert
-        mock_urlopen.assert_called_once()
-        call_args = mock_urlopen.call_args[0][0]
-        request_data = json.loads(call_args.data.decode("utf-8"))
-
-        assert request_data["action"] == "addNote"
-        assert request_data["params"]["note"]["deckName"] == "TestDeck"
-        assert request_data["params"]["note"]["fields"]["Front"] == "Test question?"
-        assert request_data["params"]["note"]["fields"]["Back"] == "Test answer"
-        assert "Test_Topic" in request_data["params"]["note"]["tags"]
-        assert "FlashcardGen" in request_data["params"]["note"]["tags"]
-
-    @patch("urllib.request.urlopen")
-    def test_create_anki_note_without_topic(self, mock_urlopen, anki_service):
-        """Test creating Anki note without topic tag"""
-        # Arrange
-        mock_response = MagicMock()
-        mock_response.read.return_value = json.dumps({"result": None, "error": None}).encode("utf-8")
-        mock_urlopen.return_value = mock_response
+        with pytest.raises(ExportError) as exc_info:
+            service.export_flashcards(sample_flashcards)
+
+        assert "Deck already exists" in str(exc_info.value)
 
+    def test_build_note_with_topic(self, anki_service):
+        """Test building an Anki note with topic tag"""
         card = {
             "question": "Test question?",
             "answer": "Test answer",
-            # No topic
+            "topic": "Test Topic",
         }
 
-        # Act
-        anki_service._create_anki_note("TestDeck", card)
+        note = anki_service._build_note("TestDeck", card)
 
-        # Assert
-        call_args = mock_urlopen.call_args[0][0]
-        request_data = json.loads(call_args.data.decode("utf-8"))
+        assert note["deckName"] == "TestDeck"
+        assert note["fields"]["Front"] == "Test question?"
+        assert note["fields"]["Back"] == "Test answer"
+        assert "Test_Topic" in note["tags"]
+        assert "FlashcardGen" in note["tags"]
+
+    def test_build_note_without_topic(self, anki_service):
+        """Test building an Anki note without topic tag"""
+        note = anki_service._build_note("TestDeck", {"question": "Test question?", "answer": "Test answer"})
 
         # Should only have FlashcardGen tag
-        assert request_data["params"]["note"]["tags"] == ["FlashcardGen"]
+        assert note["tags"] == ["FlashcardGen"]
 
     def test_request_format(self, anki_service):
         """Test AnkiConnect request format"""
@@ -156,27 +187,179 @@ class TestAnkiExportService:
         assert request["params"]["param1"] == "value1"
         assert request["params"]["param2"] == "value2"
 
-    @patch("urllib.request.urlopen")
-    def test_partial_failure_handling(self, mock_urlopen, anki_service, sample_flashcards):
-        """Test handling when some cards fail to be added"""
-        # Arrange - First call (createDeck) succeeds, second fails, third and fourth succeed
-        responses = [
-            json.dumps({"result": None, "error": None}),  # createDeck success
-            json.dumps({"result": None, "error": "Invalid note"}),  # first card fails
-            json.dumps({"result": None, "error": None}),  # second card success
-            json.dumps({"result": None, "error": None}),  # third card success
-        ]
-
-        mock_response = MagicMock()
-        mock_response.read.side_effect = [r.encode("utf-8") for r in responses]
-        mock_urlopen.return_value = mock_response
+    def test_partial_failure_handling(self, sample_flashcards):
+        """Test cards failing the canAddNotes precheck are skipped, and the rest added"""
+        anki_connect = FakeAnkiConnect(refused={"What is 2 + 2?"})
+        service = AnkiExportService()
+        service._client = httpx.Client(transport=httpx.MockTransport(anki_connect.handler))
 
-        # Act
-        with patch("builtins.print"):
-            result = anki_service.export_flashcards(sample_flashcards)
+        note_ids = service.add_notes("Deck", sample_flashcards)
 
-        # Assert
-        assert "Successfully exported 2/3 cards" in result
+        assert note_ids[1] is None
+        assert None not in (note_ids[0], note_ids[2])
+        assert len(anki_connect.requests[-1]["params"]["notes"]) == 2
+
+    def test_failed_batch_reports_the_notes_added_anyway(self, sample_flashcards):
+        """Test an addNotes error for one note is looked up per note instead of failing the whole batch"""
+        anki_connect = FakeAnkiConnect(add_failures={"What is 2 + 2?"})
+        service = AnkiExportService()
+        service._client = httpx.Client(transport=httpx.MockTransport(anki_connect.handler))
+
+        note_ids = service.add_notes("Deck", sample_flashcards)
+
+        assert note_ids[1] is None
+        assert None not in (note_ids[0], note_ids[2])
+        assert [request["action"] for request in anki_connect.requests] == ["multi", "addNotes", "multi"]
+        lookups = anki_connect.requests[-1]["params"]["actions"]
+        assert [action["action"] for action in lookups] == ["findNotes"] * 3
+
+    def test_note_lookup_matches_fronts_literally(self, anki_service):
+        """Test search syntax in a front is escaped in its findNotes query"""
+        note = anki_service._build_note("My_Deck", {"question": 'Is "a*b" C:\\path?', "answer": "Yes"})
+
+        query = anki_service._find_actions([note])[0]["params"]["query"]
+
+        assert query == '"deck:My\\_Deck" "front:Is \\"a\\*b\\" C:\\\\path?"'
+
+    def test_large_exports_are_batched(self, anki_connect):
+        """Test addNotes requests carry at most batch_size notes"""
+        service = AnkiExportService(batch_size=2)
+        service._client = httpx.Client(transport=httpx.MockTransport(anki_connect.handler))
+        cards = [{"question": f"Q{i}", "answer": f"A{i}"} for i in range(5)]
+
+        result = service.export_flashcards(cards)
+
+        assert "Successfully exported 5/5 cards" in result
+        add_requests = [request for request in anki_connect.requests if request["action"] == "addNotes"]
+        assert [len(request["params"]["notes"]) for request in add_requests] == [2, 2, 1]
+
+
+class SlowAnkiConnect(FakeAnkiConnect):
+    """FakeAnkiConnect answering addNotes only once ``release`` is set, tracking requests in flight"""
+
+    def __init__(self, delay=0.01):
+        super().__init__()
+        self.delay = delay
+        self.release = asyncio.Event()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def async_handler(self, request):
+        payload = json.loads(request.content)
+        self.requests.append(payload)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if payload["action"] == "addNotes":
+                await asyncio.sleep(self.delay)
+                await self.release.wait()
+            return httpx.Response(200, json=self.respond(payload["action"], payload["params"]))
+        finally:
+            self.in_flight -= 1
+
+
+def async_service(anki_connect, **kwargs):
+    """AsyncAnkiExportService talking to the fake AnkiConnect on the running loop"""
+    service = AsyncAnkiExportService(**kwargs)
+    service._connection()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(anki_connect.async_handler))
+    return service
+
+
+class TestAsyncAnkiExportService:
+    """Test cases for AsyncAnkiExportService"""
+
+    async def test_batches_run_concurrently_up_to_the_limit(self):
+        """Test addNotes batches overlap, but never more than max_concurrency at once"""
+        anki_connect = SlowAnkiConnect()
+        anki_connect.release.set()
+        service = async_service(anki_connect, batch_size=1, max_concurrency=2)
+        cards = [{"question": f"Q{i}", "answer": f"A{i}"} for i in range(6)]
+
+        note_ids = await service.add_notes("Deck", cards, create_deck=True)
+
+        assert None not in note_ids and len(set(note_ids)) == 6
+        assert anki_connect.max_in_flight == 2
+        await service.close()
+
+    async def test_failed_batch_reports_the_notes_added_anyway(self, sample_flashcards):
+        """Test the async exporter also looks up which notes a failed addNotes request added"""
+        anki_connect = FakeAnkiConnect(add_failures={"What is 2 + 2?"})
+        service = async_service(anki_connect)
+
+        note_ids = await service.add_notes("Deck", sample_flashcards)
+
+        assert note_ids[1] is None
+        assert None not in (note_ids[0], note_ids[2])
+        await service.close()
+
+    async def test_deadline_fails_the_export(self, sample_flashcards):
+        """Test an export Anki does not finish in time raises ExportError"""
+        anki_connect = SlowAnkiConnect()
+        service = async_service(anki_connect, deadline=0.05)
+
+        with pytest.raises(ExportError, match="did not finish within"):
+            await service.export_flashcards(sample_flashcards)
+        await service.close()
+
+    async def test_cancelling_stops_remaining_batches(self):
+        """Test a cancelled export cancels its requests and sends no further batches"""
+        anki_connect = SlowAnkiConnect()
+        service = async_service(anki_connect, batch_size=1, max_concurrency=1)
+        cards = [{"question": f"Q{i}", "answer": f"A{i}"} for i in range(5)]
+
+        export = asyncio.ensure_future(service.export_flashcards(cards))
+        await asyncio.sleep(0.05)
+        export.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await export
+
+        anki_connect.release.set()
+        await asyncio.sleep(0.05)
+        assert [request["action"] for request in anki_connect.requests] == ["multi", "addNotes"]
+        assert anki_connect.in_flight == 0
+        await service.close()
+
+    def test_client_of_a_finished_loop_is_closed(self):
+        """Test switching event loops closes the client built on the previous one"""
+        service = AsyncAnkiExportService()
+
+        async def connect():
+            client, _ = service._connection()
+            await asyncio.sleep(0)
+            return client
+
+        first = asyncio.run(connect())
+        second = asyncio.run(connect())
+
+        assert second is not first
+        assert first.is_closed
+        asyncio.run(service.close())
+        assert second.is_closed
+
+    async def test_client_of_a_running_loop_is_closed_on_that_loop(self):
+        """Test a client still owned by a running loop in another thread is closed there"""
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever)
+        thread.start()
+        service = AsyncAnkiExportService()
+        try:
+            first = asyncio.run_coroutine_threadsafe(_connect(service), other_loop).result()
+
+            second, _ = service._connection()
+            await asyncio.sleep(0.05)
+
+            assert second is not first
+            assert first.is_closed
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+            await service.close()
+
+
+async def _connect(service):
+    return service._connection()[0]
 
 
 @pytest.mark.integration
@@ -0,0 +1,77 @@
+"""
+Tests for ChangeNotifier long-poll waits
+"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+from fcg.services.change_notifier import ChangeNotifier
+from fcg.services.database import AsyncFlashcardService, DatabaseService
+
+
+@pytest.fixture
+async def temp_db():
+    """Temporary SQLite database with the current schema"""
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_file:
+        db_path = temp_file.name
+
+    db_service = DatabaseService(f"sqlite:///{db_path}")
+    db_service.init_database()
+
+    yield db_service
+
+    await db_service.async_engine.dispose()
+    await db_service.async_read_engine.dispose()
+    os.unlink(db_path)
+
+
+@pytest.fixture
+def notifier(temp_db):
+    return ChangeNotifier(temp_db.AsyncReadSessionLocal, poll_interval=0.01)
+
+
+async def add_card(temp_db, user_id):
+    async with temp_db.AsyncSessionLocal() as session:
+        await AsyncFlashcardService(session).add_flashcard(user_id, "Front", "Back")
+
+
+class TestChangeNotifier:
+    """Test waiting for a user's change version"""
+
+    async def test_returns_at_once_when_already_changed(self, temp_db, notifier):
+        """Test a waiter behind the current version does not wait"""
+        await add_card(temp_db, "user")
+
+        assert await asyncio.wait_for(notifier.wait_for_change("user", 0, timeout=30), 1) == 1
+
+    async def test_wakes_on_a_write(self, temp_db, notifier):
+        """Test a waiting request returns once the user writes"""
+        waiting = asyncio.create_task(notifier.wait_for_change("user", 0, timeout=30))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert notifier.stats()["waiters"] == 1
+
+        await add_card(temp_db, "user")
+
+        assert await asyncio.wait_for(waiting, 1) == 1
+        assert notifier.stats()["waiters"] == 0
+
+    async def test_other_users_writes_do_not_wake(self, temp_db, notifier):
+        """Test a waiter times out with its version when only another user writes"""
+        waiting = asyncio.create_task(notifier.wait_for_change("user", 0, timeout=0.2))
+        await add_card(temp_db, "other_user")
+
+        assert await waiting == 0
+        assert notifier.stats()["timeouts"] == 1
+
+    async def test_close_releases_waiters(self, notifier):
+        """Test shutdown lets waiting requests return without a change"""
+        waiting = asyncio.create_task(notifier.wait_for_change("user", 3, timeout=30))
+        await asyncio.sleep(0.05)
+
+        await notifier.close()
+
+        assert await asyncio.wait_for(waiting, 1) == 3
@@ -0,0 +1,169 @@
+import pytest
+
+from fcg.config.settings import Settings
+from fcg.schemas import ChatMessage, ChatRole
+from fcg.utils.chunking import chunk_conversation, split_text, word_count
+from fcg.utils.flashcard_generator import merge_flashcards
+
+
+def words(n: int, prefix: str = "w") -> str:
+    """Build a text of ``n`` distinct words"""
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+class TestSplitText:
+    """Test splitting a single text on natural boundaries"""
+
+    def test_short_text_is_untouched(self):
+        """Test text within the limit is returned as-is"""
+        assert split_text("a short text", 10) == ["a short text"]
+
+    def test_splits_on_headings_first(self):
+        """Test markdown headings are preferred split points"""
+        text = f"# Intro\n{words(8)}\n\n{words(4, 'x')}\n## Details\n{words(8, 'y')}"
+
+        pieces = split_text(text, 15)
+
+        assert len(pieces) == 2
+        assert pieces[0].startswith("# Intro")
+        assert pieces[1].startswith("## Details")
+
+    def test_splits_on_paragraphs_without_headings(self):
+        """Test blank lines are used when there are no headings"""
+        text = f"{words(8)}\n\n{words(8, 'x')}"
+
+        assert split_text(text, 10) == [words(8), words(8, "x")]
+
+    def test_falls_back_to_word_windows(self):
+        """Test unstructured text is split into fixed word windows"""
+        pieces = split_text(words(25), 10)
+
+        assert [word_count(p) for p in pieces] == [10, 10, 5]
+
+
+class TestChunkConversation:
+    """Test chunking whole conversations"""
+
+    def test_packs_messages_up_to_limit(self):
+        """Test adjacent messages share a chunk while they fit"""
+        conversation = [
+            ChatMessage(role=ChatRole.USER, content=words(4)),
+            ChatMessage(role=ChatRole.ASSISTANT, content=words(4, "a")),
+            ChatMessage(role=ChatRole.USER, content=words(4, "b")),
+        ]
+
+        chunks = chunk_conversation(conversation, 10)
+
+        assert len(chunks) == 2
+        assert words(4) in chunks[0] and words(4, "a") in chunks[0]
+        assert chunks[1] == words(4, "b")
+
+    def test_system_messages_prefix_every_chunk(self):
+        """Test system instructions are repeated in each chunk"""
+        conversation = [
+            ChatMessage(role=ChatRole.SYSTEM, content="Make cards."),
+            ChatMessage(role=ChatRole.USER, content=words(30)),
+        ]
+
+        chunks = chunk_conversation(conversation, 10)
+
+        assert len(chunks) == 3
+        assert all(chunk.startswith("Make cards.\n") for chunk in chunks)
+
+
+class TestMergeFlashcards:
+    """Test merging per-chunk results"""
+
+    def test_dedupes_by_normalized_question(self):
+        """Test questions differing only in case/punctuation are merged"""
+        merged = merge_flashcards(
+            [
+                [{"question": "What is DNA?", "answer": "A"}],
+                [{"question": "what is dna", "answer": "B"}, {"question": "What is RNA?", "answer": "C"}],
+            ]
+        )
+
+        assert [card["answer"] for card in merged] == ["A", "C"]
+
+    def test_respects_limit(self):
+        """Test the merged list is capped"""
+        cards = [[{"question": f"Q{i}", "answer": "A"} for i in range(10)]]
+
+        assert len(merge_flashcards(cards, limit=4)) == 4
+
+
+class TestChunkedGeneration:
+    """Test long conversations are generated chunk by chunk"""
+
+    @pytest.fixture
+    def context(self, generation_context):
+        """Generation context with a small chunk size and no result cache"""
+        from fcg.utils.flashcard_generator import GenerationContext
+
+        class NoCache:
+            def make_key(self, *args):
+                return "key"
+
+            async def get(self, key):
+                return None
+
+            async def set(self, *args, **kwargs):
+                pass
+
+        settings = Settings(openrouter_api_key="test", chunk_max_words=10)
+        shared = generation_context
+        return GenerationContext(settings, shared.llm_client, shared.executor, NoCache(), shared.stage_memos)
+
+    @pytest.fixture
+    def chunked_generator(self, monkeypatch):
+        """Patch the pipeline so chunking runs without an LLM"""
+        from fcg.utils import flashcard_generator
+        from fcg.utils.dspy_flashcard_generator import Flashcard
+
+        calls = []
+
+        def fake_pipeline(text_content, num_cards):
+            calls.append(text_content)
+            first_word = text_content.split()[0]
+            return [
+                Flashcard(question=f"About {first_word}?", answer="A", explanation="", topic="T"),
+                Flashcard(question="Shared question?", answer="A", explanation="", topic="T"),
+            ]
+
+        monkeypatch.setattr(flashcard_generator, "_build_pipeline", lambda tier, *args: (fake_pipeline, "test/1"))
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_long_conversation_is_chunked_and_deduped(self, chunked_generator, context):
+        """Test each chunk is generated once and duplicate questions are merged"""
+        from fcg.utils.flashcard_generator import generate_flashcards
+
+        conversation = [
+            ChatMessage(role=ChatRole.USER, content=words(8, "alpha")),
+            ChatMessage(role=ChatRole.ASSISTANT, content=words(8, "beta")),
+            ChatMessage(role=ChatRole.USER, content=words(8, "gamma")),
+        ]
+
+        cards = await generate_flashcards(conversation, context)
+
+        assert len(chunked_generator) == 3
+        questions = [card["question"] for card in cards]
+        assert questions.count("Shared question?") == 1
+        assert {"About alpha0?", "About beta0?", "About gamma0?"} <= set(questions)
+        assert all(card["id"] for card in cards)
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_deduped_cards_per_chunk(self, chunked_generator, context):
+        """Test streaming yields every chunk's cards once, skipping duplicates"""
+        from fcg.utils.flashcard_generator import stream_flashcards
+
+        conversation = [
+            ChatMessage(role=ChatRole.USER, content=words(8, "alpha")),
+            ChatMessage(role=ChatRole.ASSISTANT, content=words(8, "beta")),
+        ]
+
+        cards = [card async for card in stream_flashcards(conversation, context)]
+
+        questions = [card["question"] for card in cards]
+        assert len(chunked_generator) == 2
+        assert sorted(questions) == ["About alpha0?", "About beta0?", "Shared question?"]
@@ -0,0 +1,136 @@
+"""
+Tests for ServiceContainer lifetimes and lifecycle hooks
+"""
+
+import pytest
+
+from fcg.config.container import ServiceContainer
+
+
+class Service:
+    def __init__(self, settings):
+        self.settings = settings
+        self.warmed = False
+        self.disposed = False
+
+
+@pytest.fixture
+def container(mock_settings):
+    return ServiceContainer(mock_settings)
+
+
+class TestLifetimes:
+    """Test how long resolved instances live"""
+
+    def test_singleton_is_shared(self, container):
+        """Test a singleton factory runs once per container"""
+        container.register_singleton(Service, Service)
+
+        assert container.get(Service) is container.get(Service)
+
+    def test_register_factory_defaults_to_singleton(self, container):
+        """Test the existing register_factory API keeps caching instances"""
+        container.register_factory(Service, Service)
+
+        assert container.get(Service) is container.get(Service)
+
+    def test_transient_is_rebuilt(self, container):
+        """Test a transient factory runs on every get"""
+        container.register_transient(Service, Service)
+
+        assert container.get(Service) is not container.get(Service)
+
+
+class TestLifecycle:
+    """Test startup warm-up and shutdown disposal"""
+
+    @pytest.mark.asyncio
+    async def test_startup_warms_and_shutdown_disposes(self, container):
+        """Test warm-up hooks run at startup and dispose hooks at shutdown"""
+
+        async def dispose(service):
+            service.disposed = True
+
+        container.register_singleton(Service, Service, warm_up=lambda s: setattr(s, "warmed", True), dispose=dispose)
+
+        await container.startup()
+        service = container.get(Service)
+        assert service.warmed
+
+        await container.shutdown()
+        assert service.disposed
+        assert container.get(Service) is not service
+
+    @pytest.mark.asyncio
+    async def test_lazy_singletons_are_not_built_at_startup(self, container):
+        """Test singletons without eager or warm-up are left for first use"""
+        built = []
+        container.register_singleton(Service, lambda s: built.append(s) or Service(s))
+
+        await container.startup()
+
+        assert built == []
+
+    @pytest.mark.asyncio
+    async def test_failing_dispose_does_not_stop_shutdown(self, container):
+        """Test one failing dispose hook does not keep others from running"""
+
+        class Other(Service):
+            pass
+
+        def fail(service):
+            raise RuntimeError("boom")
+
+        container.register_singleton(Service, Service, dispose=lambda s: setattr(s, "disposed", True))
+        container.register_singleton(Other, Other, dispose=fail)
+        service = container.get(Service)
+        container.get(Other)
+
+        await container.shutdown()
+
+        assert service.disposed
+
+
+def test_app_lifespan_reuses_services():
+    """Test the app resolves its services once and disposes them at shutdown"""
+    from fastapi.testclient import TestClient
+
+    from fcg.main import create_app
+    from fcg.services.llm_client import LLMClient
+    from fcg.use_cases.flashcard_use_case import FlashcardUseCase
+
+    app = create_app()
+    container = app.state.container
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        use_case = container.get(FlashcardUseCase)
+        assert container.get(FlashcardUseCase) is use_case
+        assert container.get(LLMClient).stats()["invoker"] is not None
+
+    # Shutdown released the singletons
+    assert container.get(FlashcardUseCase) is not use_case
+
+
+def test_app_shuts_down_generation_services():
+    """Test generation shares the container's executor and cache, which shutdown releases"""
+    from fastapi.testclient import TestClient
+
+    from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
+    from fcg.main import create_app
+    from fcg.services.generation_cache import GenerationCache
+    from fcg.utils.llm_executor import LLMExecutor
+
+    app = create_app()
+    container = app.state.container
+
+    with TestClient(app) as client:
+        assert client.get("/metrics").status_code == 200
+        executor = container.get(LLMExecutor)
+        context = container.get(FlashcardGeneratorService).context
+        assert context.executor is executor
+        assert context.cache is container.get(GenerationCache)
+
+    # The executor's worker pool no longer accepts work
+    with pytest.raises(RuntimeError):
+        executor._pool.submit(print)
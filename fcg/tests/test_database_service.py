@@ -3,9 +3,11 @@ import tempfile
 from datetime import datetime
 
 import pytest
+from sqlalchemy import exc, select, text
 
-from fcg.models.flashcard import Flashcard, FlashcardBatch
-from fcg.services.database import DatabaseService, FlashcardService
+from fcg.models.flashcard import Flashcard, FlashcardBatch, UserChangeVersion
+from fcg.services import database as database_module
+from fcg.services.database import AsyncFlashcardService, DatabaseService, GroupCommitter, encode_change_cursor, to_async_url
 
 
 @pytest.fixture
@@ -27,22 +29,72 @@ def temp_db():
 
 
 @pytest.fixture
-def db_session(temp_db):
-    """Create a database session for testing"""
-    session = next(temp_db.get_db())
-    yield session
-    session.close()
-
-
-@pytest.fixture
-def flashcard_service(db_session):
-    """Create a FlashcardService instance for testing"""
-    return FlashcardService(db_session)
+async def db_session(temp_db):
+    """Create an async database session on the writer engine"""
+    async with temp_db.AsyncSessionLocal() as session:
+        yield session
+    await temp_db.async_engine.dispose()
 
 
 class TestDatabaseService:
     """Test DatabaseService functionality"""
 
+    def test_init_database_migrates_legacy_schema(self, tmp_path):
+        """Test databases created before migrations keep their data and reach the latest version"""
+        from sqlalchemy import create_engine, inspect
+
+        from fcg.services.migrations import LATEST_VERSION
+
+        db_url = f"sqlite:///{tmp_path / 'old.db'}"
+        engine = create_engine(db_url)
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    "CREATE TABLE flashcards (id INTEGER PRIMARY KEY, user_id VARCHAR(255) NOT NULL, "
+                    "front TEXT NOT NULL, back TEXT NOT NULL, source_url VARCHAR(500), source_text TEXT, "
+                    "deck_name VARCHAR(255), status VARCHAR(50), created_at DATETIME, synced_at DATETIME, "
+                    "tags VARCHAR(500), difficulty VARCHAR(20))"
+                )
+            )
+            connection.execute(
+                text(
+                    "INSERT INTO flashcards (user_id, front, back, status) VALUES "
+                    "('u', 'Q1', 'A1', 'pending'), ('u', 'Q2', 'A2', 'synced'), ('u', 'Q3', 'A3', 'failed')"
+                )
+            )
+        engine.dispose()
+
+        service = DatabaseService(db_url)
+        assert service.init_database() == LATEST_VERSION
+        # Running again is a no-op
+        assert service.init_database() == LATEST_VERSION
+
+        inspector = inspect(service.engine)
+        columns = {column["name"] for column in inspector.get_columns("flashcards")}
+        assert {"batch_id", "change_seq", "lease_id", "lease_expires_at"} <= columns
+        indexes = {index["name"] for index in inspector.get_indexes("flashcards")}
+        assert {
+            "ix_flashcards_user_status_created",
+            "ix_flashcards_pending",
+            "ix_flashcards_batch_id",
+            "ix_flashcards_user_change",
+        } <= indexes
+        batch_indexes = {index["name"] for index in inspector.get_indexes("flashcard_batches")}
+        assert "ix_flashcard_batches_batch_id" in batch_indexes
+
+        with service.engine.connect() as connection:
+            raw = connection.execute(text("SELECT front, status FROM flashcards ORDER BY id")).all()
+        assert raw == [("Q1", 0), ("Q2", 1), ("Q3", 2)]
+
+        session = service.SessionLocal()
+        assert [card.status for card in session.query(Flashcard).order_by(Flashcard.id)] == [
+            "pending",
+            "synced",
+            "failed",
+        ]
+        session.close()
+        service.engine.dispose()
+
     def test_database_initialization(self, temp_db):
         """Test database tables are created correctly"""
         # Check that tables exist
@@ -57,171 +109,362 @@ class TestDatabaseService:
         session.close()
 
 
-class TestFlashcardService:
-    """Test FlashcardService functionality"""
-
-    def test_create_batch(self, flashcard_service, db_session):
-        """Test creating a flashcard batch"""
-        user_id = "test_user_123"
-        source_url = "https://example.com"
-
-        batch_id = flashcard_service.create_batch(user_id, source_url)
-
-        assert batch_id is not None
-        assert len(batch_id) == 36  # UUID length
-
-        # Verify batch was created in database
-        batch = db_session.query(FlashcardBatch).filter_by(batch_id=batch_id).first()
-        assert batch is not None
-        assert batch.user_id == user_id
-        assert batch.source_url == source_url
-        assert batch.status == "processing"
-
-    def test_add_flashcard(self, flashcard_service, db_session):
-        """Test adding a flashcard"""
-        user_id = "test_user_123"
-        front = "What is Python?"
-        back = "A programming language"
-
-        flashcard = flashcard_service.add_flashcard(
-            user_id=user_id, front=front, back=back, deck_name="Programming", tags="python,programming", difficulty="easy"
+@pytest.fixture
+async def async_flashcard_service(temp_db):
+    """Create an AsyncFlashcardService bound to the temporary database"""
+    async with temp_db.AsyncSessionLocal() as session:
+        yield AsyncFlashcardService(session)
+    await temp_db.async_engine.dispose()
+
+
+class TestAsyncFlashcardService:
+    """Test the AsyncFlashcardService API"""
+
+    def test_to_async_url(self):
+        """Test sync URLs map to their async drivers"""
+        assert to_async_url("sqlite:///./data/flashcards.db") == "sqlite+aiosqlite:///./data/flashcards.db"
+        assert to_async_url("postgresql://u:p@host:5432/db") == "postgresql+asyncpg://u:p@host:5432/db"
+        assert to_async_url("postgresql+psycopg2://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+
+    async def test_add_flashcard(self, async_flashcard_service):
+        """Test a new card stores its fields and starts pending"""
+        flashcard = await async_flashcard_service.add_flashcard(
+            "async_user",
+            "What is Python?",
+            "A programming language",
+            deck_name="Programming",
+            tags="python",
+            difficulty="easy",
         )
 
         assert flashcard.id is not None
-        assert flashcard.user_id == user_id
-        assert flashcard.front == front
-        assert flashcard.back == back
-        assert flashcard.deck_name == "Programming"
-        assert flashcard.tags == "python,programming"
-        assert flashcard.difficulty == "easy"
+        assert (flashcard.front, flashcard.back) == ("What is Python?", "A programming language")
+        assert (flashcard.deck_name, flashcard.tags, flashcard.difficulty) == ("Programming", "python", "easy")
         assert flashcard.status == "pending"
-        assert flashcard.created_at is not None
-
-    def test_get_pending_flashcards(self, flashcard_service, db_session):
-        """Test retrieving pending flashcards"""
-        user_id = "test_user_123"
-
-        # Create multiple flashcards
-        flashcard1 = flashcard_service.add_flashcard(user_id, "Front 1", "Back 1")
-        flashcard2 = flashcard_service.add_flashcard(user_id, "Front 2", "Back 2")
-        other_user_flashcard = flashcard_service.add_flashcard("other_user", "Front 3", "Back 3")
-
-        # Verify flashcards created
-        assert flashcard1.id is not None
-        assert flashcard2.id is not None
-        assert other_user_flashcard.id is not None
-
-        # Mark one as synced
-        flashcard1.status = "synced"
-        db_session.commit()
-
-        pending = flashcard_service.get_pending_flashcards(user_id)
 
-        assert len(pending) == 1
-        assert pending[0].id == flashcard2.id
-        assert pending[0].front == "Front 2"
+    async def test_add_and_get_pending(self, async_flashcard_service):
+        """Test cards added asynchronously are returned as pending, newest first"""
+        first = await async_flashcard_service.add_flashcard("async_user", "Front 1", "Back 1")
+        second = await async_flashcard_service.add_flashcard("async_user", "Front 2", "Back 2", deck_name="Deck")
+        await async_flashcard_service.add_flashcard("other_user", "Front 3", "Back 3")
 
-        # Verify other user's flashcard is not included
-        assert other_user_flashcard.id not in [fc.id for fc in pending]
+        pending = await async_flashcard_service.get_pending_flashcards("async_user")
 
-    def test_mark_flashcards_synced(self, flashcard_service, db_session):
-        """Test marking flashcards as synced"""
-        user_id = "test_user_123"
+        assert {card.id for card in pending} == {first.id, second.id}
+        assert second.deck_name == "Deck"
+        assert second.created_at is not None
 
-        # Create flashcards
-        flashcard1 = flashcard_service.add_flashcard(user_id, "Front 1", "Back 1")
-        flashcard2 = flashcard_service.add_flashcard(user_id, "Front 2", "Back 2")
-        flashcard3 = flashcard_service.add_flashcard(user_id, "Front 3", "Back 3")
+    async def test_sync_fail_and_stats(self, async_flashcard_service):
+        """Test status updates are reflected in the stats"""
+        cards = [await async_flashcard_service.add_flashcard("async_user", f"F{i}", f"B{i}") for i in range(3)]
 
-        # Mark some as synced
-        updated_count = flashcard_service.mark_flashcards_synced([flashcard1.id, flashcard2.id])
+        assert await async_flashcard_service.acknowledge_flashcards("async_user", [cards[0].id]) == {cards[0].id: "synced"}
+        assert await async_flashcard_service.report_failed_flashcards("async_user", [cards[1].id, 99999]) == {
+            cards[1].id: "failed",
+            99999: "not_found",
+        }
 
-        assert updated_count == 2
+        stats = await async_flashcard_service.get_flashcard_stats("async_user")
+        assert stats == {"pending": 1, "synced": 1, "failed": 1}
 
-        # Verify status changed
-        db_session.refresh(flashcard1)
-        db_session.refresh(flashcard2)
-        db_session.refresh(flashcard3)
+    async def test_create_batch(self, async_flashcard_service):
+        """Test batch creation returns a new batch id"""
+        batch_id = await async_flashcard_service.create_batch("async_user", "https://example.com")
 
-        assert flashcard1.status == "synced"
-        assert flashcard2.status == "synced"
-        assert flashcard3.status == "pending"
-        assert flashcard1.synced_at is not None
-        assert flashcard2.synced_at is not None
+        assert len(batch_id) == 36
 
-    def test_mark_flashcard_failed(self, flashcard_service, db_session):
-        """Test marking a flashcard as failed"""
-        user_id = "test_user_123"
-        flashcard = flashcard_service.add_flashcard(user_id, "Front", "Back")
+    async def test_add_flashcards_bulk(self, async_flashcard_service):
+        """Test the async bulk insert links cards to the batch created in the same transaction"""
+        batch_id = await async_flashcard_service.create_batch("async_user", commit=False)
 
-        success = flashcard_service.mark_flashcard_failed(flashcard.id)
+        cards = await async_flashcard_service.add_flashcards_bulk(
+            [{"user_id": "async_user", "front": f"F{i}", "back": f"B{i}"} for i in range(3)], batch_id=batch_id
+        )
 
-        assert success is True
+        assert [card.front for card in cards] == ["F0", "F1", "F2"]
+        assert all(card.batch_id == batch_id and card.id is not None for card in cards)
+        pending = await async_flashcard_service.get_pending_flashcards("async_user")
+        assert len(pending) == 3
+        batch = await async_flashcard_service.db.scalar(select(FlashcardBatch).where(FlashcardBatch.batch_id == batch_id))
+        assert batch.total_cards == 3
 
-        # Verify status changed
-        db_session.refresh(flashcard)
-        assert flashcard.status == "failed"
+    async def test_add_flashcards_bulk_without_returning(self, async_flashcard_service, monkeypatch):
+        """Test the fallback path for databases without executemany RETURNING"""
+        monkeypatch.setattr(database_module, "_supports_bulk_returning", lambda dialect: False)
 
-    def test_mark_nonexistent_flashcard_failed(self, flashcard_service):
-        """Test marking a non-existent flashcard as failed"""
-        success = flashcard_service.mark_flashcard_failed(99999)
-        assert success is False
+        cards = await async_flashcard_service.add_flashcards_bulk(
+            [{"user_id": "u", "front": "F1", "back": "B1"}, {"user_id": "u", "front": "F2", "back": "B2"}]
+        )
 
-    def test_get_flashcard_stats(self, flashcard_service, db_session):
-        """Test getting user flashcard statistics"""
-        user_id = "test_user_123"
+        assert [card.front for card in cards] == ["F1", "F2"]
+        assert cards[0].id is not None and cards[1].id > cards[0].id
 
-        # Create flashcards with different statuses
-        flashcard1 = flashcard_service.add_flashcard(user_id, "Front 1", "Back 1")
-        flashcard2 = flashcard_service.add_flashcard(user_id, "Front 2", "Back 2")
-        flashcard3 = flashcard_service.add_flashcard(user_id, "Front 3", "Back 3")
-        flashcard4 = flashcard_service.add_flashcard("other_user", "Front 4", "Back 4")
+    async def test_add_flashcards_bulk_empty(self, async_flashcard_service):
+        """Test an empty bulk insert is a no-op"""
+        assert await async_flashcard_service.add_flashcards_bulk([]) == []
 
-        # Verify all flashcards were created
-        assert flashcard1.id is not None
-        assert flashcard2.id is not None
-        assert flashcard3.id is not None
-        assert flashcard4.id is not None
+    async def test_acknowledge_reports_each_id(self, async_flashcard_service):
+        """Test acknowledgements are scoped to the user and report an outcome per id"""
+        mine = await async_flashcard_service.add_flashcard("async_user", "F1", "B1")
+        theirs = await async_flashcard_service.add_flashcard("other_user", "F2", "B2")
 
-        # Update statuses
-        flashcard1.status = "synced"
-        flashcard2.status = "failed"
-        # flashcard3 remains "pending"
-        # flashcard4 is for other_user, should not affect test_user_123's stats
-        db_session.commit()
+        outcomes = await async_flashcard_service.acknowledge_flashcards("async_user", [mine.id, theirs.id, 99999])
+        again = await async_flashcard_service.acknowledge_flashcards("async_user", [mine.id])
 
-        stats = flashcard_service.get_flashcard_stats(user_id)
+        assert outcomes == {mine.id: "synced", theirs.id: "not_found", 99999: "not_found"}
+        assert again == {mine.id: "already_synced"}
+        assert (await async_flashcard_service.get_flashcard_stats("other_user"))["pending"] == 1
 
-        assert stats["pending"] == 1  # flashcard3
-        assert stats["synced"] == 1  # flashcard1
-        assert stats["failed"] == 1  # flashcard2
+    async def test_acknowledge_in_chunks(self, async_flashcard_service, monkeypatch):
+        """Test large acknowledgements are split into chunks under one change version"""
+        monkeypatch.setattr(database_module, "ACK_CHUNK_SIZE", 2)
+        cards = await async_flashcard_service.add_flashcards_bulk(
+            [{"user_id": "async_user", "front": f"F{i}", "back": f"B{i}"} for i in range(5)]
+        )
+        ids = [card.id for card in cards]
+
+        outcomes = await async_flashcard_service.acknowledge_flashcards("async_user", ids + ids[:1])
+
+        assert list(outcomes) == ids
+        assert set(outcomes.values()) == {"synced"}
+        rows = await async_flashcard_service.db.execute(select(Flashcard.change_seq).where(Flashcard.id.in_(ids)))
+        assert len({change_seq for (change_seq,) in rows.all()}) == 1
+
+    async def test_report_failed_keeps_synced_cards(self, async_flashcard_service):
+        """Test a failure report fails pending cards but leaves synced ones alone"""
+        cards = [await async_flashcard_service.add_flashcard("async_user", f"F{i}", f"B{i}") for i in range(2)]
+        await async_flashcard_service.acknowledge_flashcards("async_user", [cards[0].id])
+
+        outcomes = await async_flashcard_service.report_failed_flashcards("async_user", [card.id for card in cards])
+
+        assert outcomes == {cards[0].id: "already_synced", cards[1].id: "failed"}
+        assert await async_flashcard_service.get_flashcard_stats("async_user") == {"pending": 0, "synced": 1, "failed": 1}
+
+    async def test_no_op_status_changes_keep_the_change_version(self, async_flashcard_service):
+        """Test acknowledgements and failure reports that change nothing do not bump the user's version"""
+        service = async_flashcard_service
+        card = await service.add_flashcard("async_user", "F", "B")
+        card_id = card.id
+        await service.acknowledge_flashcards("async_user", [card_id])
+
+        async def version():
+            return await service.db.scalar(select(UserChangeVersion.version).where(UserChangeVersion.user_id == "async_user"))
+
+        before = await version()
+        assert await service.acknowledge_flashcards("async_user", [card_id, 99999]) == {
+            card_id: "already_synced",
+            99999: "not_found",
+        }
+        assert await service.report_failed_flashcards("async_user", [card_id]) == {card_id: "already_synced"}
+        assert await service.report_failed_flashcards("async_user", [99999]) == {99999: "not_found"}
+
+        assert await version() == before
+
+    async def test_get_flashcard_stats_empty(self, async_flashcard_service):
+        """Test a user without cards gets zero counts"""
+        assert await async_flashcard_service.get_flashcard_stats("nobody") == {"pending": 0, "synced": 0, "failed": 0}
+
+    async def test_writes_bump_the_users_change_version(self, async_flashcard_service):
+        """Test each write transaction stamps its rows with the user's next change version"""
+        first = await async_flashcard_service.add_flashcard("feed_user", "Front 1", "Back 1")
+        bulk = await async_flashcard_service.add_flashcards_bulk(
+            [{"user_id": "feed_user", "front": f"Bulk {n}", "back": "Back"} for n in range(2)]
+        )
+        other = await async_flashcard_service.add_flashcard("other_user", "Front", "Back")
+
+        assert first.change_seq == 1
+        assert [card.change_seq for card in bulk] == [2, 2]
+        assert other.change_seq == 1
+
+        first_id, cursor = first.id, encode_change_cursor(2, bulk[-1].id)
+        await async_flashcard_service.acknowledge_flashcards("feed_user", [first_id])
+        # Sessions keep loaded objects across commits; reload the updated row
+        async_flashcard_service.db.expire_all()
+        changes = await async_flashcard_service.get_changes("feed_user", cursor)
+        assert [(card.id, card.change_seq, card.status) for card in changes] == [(first_id, 3, "synced")]
+
+
+class TestConnectionPool:
+    """Test pool bounds, metrics and session lifecycle"""
+
+    def test_pool_uses_settings(self, temp_db):
+        """Test SQLite writes share one async connection and reads use the configured pool bounds"""
+        stats = temp_db.pool_stats()
+
+        assert stats["sync"]["size"] == 5
+        assert stats["async"]["size"] == 1
+        assert stats["async_read"]["size"] == 5
+
+    def test_checkouts_are_counted(self, temp_db):
+        """Test checkouts and checkins are recorded and connections are returned"""
+        with temp_db.SessionLocal() as session:
+            session.execute(text("SELECT 1"))
+
+        stats = temp_db.pool_stats()["sync"]
+        assert stats["checkouts"] >= 1
+        assert stats["checkins"] == stats["checkouts"]
+        assert stats["checked_out"] == 0
+
+    def test_pool_timeouts_are_counted(self, monkeypatch):
+        """Test an exhausted pool times out and the timeout is recorded"""
+        monkeypatch.setenv("DB_POOL_SIZE", "1")
+        monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+        monkeypatch.setenv("DB_POOL_TIMEOUT_SECONDS", "0.05")
+        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_file:
+            db_path = temp_file.name
+        service = DatabaseService(f"sqlite:///{db_path}")
+
+        try:
+            with service.engine.connect():
+                with pytest.raises(exc.TimeoutError):
+                    service.engine.connect()
+            assert service.pool_stats()["sync"]["timeouts"] == 1
+        finally:
+            service.engine.dispose()
+            os.unlink(db_path)
+
+    async def test_get_db_dependency_closes_session(self, temp_db, monkeypatch):
+        """Test the request-scoped dependency returns its connection when the request ends"""
+        from fcg.routes import dependencies
+
+        monkeypatch.setattr(dependencies, "db_service", temp_db)
+        session_gen = dependencies.get_db()
+        session = await session_gen.__anext__()
+        await session.execute(text("SELECT 1"))
+        assert temp_db.pool_stats()["async"]["checked_out"] == 1
+
+        await session_gen.aclose()
+
+        assert temp_db.pool_stats()["async"]["checked_out"] == 0
+        await temp_db.async_engine.dispose()
+
+
+class TestSQLiteMode:
+    """Test WAL pragmas, read-only read connections and the serialized writer"""
+
+    async def test_writer_connections_are_tuned(self, temp_db):
+        """Test new connections get WAL journaling, busy_timeout and synchronous=NORMAL"""
+        async with temp_db.async_engine.connect() as connection:
+            assert (await connection.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+            assert (await connection.exec_driver_sql("PRAGMA busy_timeout")).scalar() == 5000
+            assert (await connection.exec_driver_sql("PRAGMA synchronous")).scalar() == 1
+        await temp_db.async_engine.dispose()
+
+    async def test_read_connections_are_read_only(self, temp_db):
+        """Test the read pool refuses writes"""
+        async with temp_db.AsyncReadSessionLocal() as db:
+            with pytest.raises(exc.OperationalError):
+                await db.execute(text("DELETE FROM flashcards"))
+        await temp_db.async_read_engine.dispose()
+
+    def test_sync_engine_is_read_only(self, temp_db):
+        """Test the sync engine cannot compete with the async writer for the write lock"""
+        with temp_db.SessionLocal() as session:
+            assert session.execute(text("SELECT COUNT(*) FROM flashcards")).scalar() == 0
+            with pytest.raises(exc.OperationalError):
+                session.execute(text("DELETE FROM flashcards"))
+
+    async def test_concurrent_writes_are_serialized(self, temp_db):
+        """Test concurrent writers queue for the writer connection instead of failing with a lock error"""
+        import asyncio
+
+        async def write(index):
+            async with temp_db.AsyncSessionLocal() as db:
+                await AsyncFlashcardService(db).add_flashcard(user_id="u", front=f"Q{index}", back="A")
+
+        await asyncio.gather(*(write(index) for index in range(20)))
+
+        async with temp_db.AsyncReadSessionLocal() as db:
+            assert len(await AsyncFlashcardService(db).get_pending_flashcards("u")) == 20
+        await temp_db.async_engine.dispose()
+        await temp_db.async_read_engine.dispose()
+
+    def test_invalid_synchronous_mode_is_rejected(self, monkeypatch, tmp_path):
+        """Test a misspelled SQLITE_SYNCHRONOUS fails at startup"""
+        monkeypatch.setenv("SQLITE_SYNCHRONOUS", "SOMETIMES")
+
+        with pytest.raises(ValueError):
+            DatabaseService(f"sqlite:///{tmp_path / 'bad.db'}")
+
+
+class TestGroupCommitter:
+    """Test coalescing concurrent writes into shared transactions"""
+
+    async def test_concurrent_writes_share_a_transaction(self, temp_db):
+        """Test each caller gets its own rows back from one shared commit"""
+        import asyncio
+
+        committer = GroupCommitter(temp_db.AsyncSessionLocal, window_seconds=0.05)
+
+        async def add(index):
+            cards = [{"user_id": f"user{index}", "front": f"Q{index}-{n}", "back": "A"} for n in range(3)]
+            return await committer.run(lambda service: service.add_flashcards_bulk(cards, commit=False))
+
+        results = await asyncio.gather(*(add(index) for index in range(10)))
+
+        for index, cards in enumerate(results):
+            assert [card.front for card in cards] == [f"Q{index}-{n}" for n in range(3)]
+            assert all(card.id is not None and card.user_id == f"user{index}" for card in cards)
+        assert committer.stats()["transactions"] == 1
+        assert committer.stats()["operations"] == 10
+        await temp_db.async_engine.dispose()
+
+    async def test_failing_operation_only_fails_its_caller(self, temp_db):
+        """Test a failing write is rolled back to its savepoint and the rest commit"""
+        import asyncio
 
-        # Verify flashcard3 is the pending one
-        assert flashcard3.status == "pending"
+        committer = GroupCommitter(temp_db.AsyncSessionLocal, window_seconds=0.05)
+
+        async def broken(service):
+            await service.add_flashcard(user_id="u", front="lost", back="A", commit=False)
+            raise RuntimeError("boom")
 
-        # Verify other_user's flashcard doesn't affect test_user_123's stats
-        other_user_stats = flashcard_service.get_flashcard_stats("other_user")
-        assert other_user_stats["pending"] == 1  # flashcard4
+        good, bad = await asyncio.gather(
+            committer.run(lambda service: service.add_flashcard(user_id="u", front="kept", back="A", commit=False)),
+            committer.run(broken),
+            return_exceptions=True,
+        )
 
-    def test_get_flashcard_stats_empty(self, flashcard_service):
-        """Test getting stats for user with no flashcards"""
-        stats = flashcard_service.get_flashcard_stats("nonexistent_user")
+        assert good.front == "kept"
+        assert isinstance(bad, RuntimeError)
+        async with temp_db.AsyncSessionLocal() as db:
+            assert [card.front for card in await AsyncFlashcardService(db).get_pending_flashcards("u")] == ["kept"]
+        await temp_db.async_engine.dispose()
+
+    async def test_full_batch_commits_without_waiting_for_the_window(self, temp_db):
+        """Test reaching max_batch commits immediately and close() drains the queue"""
+        import asyncio
+
+        committer = GroupCommitter(temp_db.AsyncSessionLocal, window_seconds=60, max_batch=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *(
+                    committer.run(
+                        lambda service, n=n: service.add_flashcard(user_id="u", front=f"Q{n}", back="A", commit=False)
+                    )
+                    for n in range(2)
+                )
+            ),
+            timeout=5,
+        )
 
-        assert stats["pending"] == 0
-        assert stats["synced"] == 0
-        assert stats["failed"] == 0
+        assert [card.front for card in results] == ["Q0", "Q1"]
+        await committer.close()
+        assert committer.stats()["queued"] == 0
+        await temp_db.async_engine.dispose()
 
 
 class TestFlashcardModel:
     """Test Flashcard model directly"""
 
-    def test_flashcard_model_defaults(self, db_session):
+    async def test_flashcard_model_defaults(self, db_session):
         """Test flashcard model default values"""
         flashcard = Flashcard(user_id="test_user", front="Test front", back="Test back")
 
         db_session.add(flashcard)
-        db_session.commit()
-        db_session.refresh(flashcard)
+        await db_session.commit()
+        await db_session.refresh(flashcard)
 
         assert flashcard.deck_name == "Default"
         assert flashcard.status == "pending"
@@ -229,7 +472,7 @@ class TestFlashcardModel:
         assert flashcard.synced_at is None
         assert isinstance(flashcard.created_at, datetime)
 
-    def test_flashcard_model_custom_values(self, db_session):
+    async def test_flashcard_model_custom_values(self, db_session):
         """Test flashcard model with custom values"""
         custom_time = datetime.now()
 
@@ -248,8 +491,8 @@ class TestFlashcardModel:
         )
 
         db_session.add(flashcard)
-        db_session.commit()
-        db_session.refresh(flashcard)
+        await db_session.commit()
+        await db_session.refresh(flashcard)
 
         assert flashcard.source_url == "https://example.com"
         assert flashcard.source_text == "Original text here"
@@ -262,13 +505,13 @@ class TestFlashcardModel:
 class TestFlashcardBatchModel:
     """Test FlashcardBatch model"""
 
-    def test_batch_model_defaults(self, db_session):
+    async def test_batch_model_defaults(self, db_session):
         """Test batch model default values"""
         batch = FlashcardBatch(user_id="test_user", batch_id="test-batch-123")
 
         db_session.add(batch)
-        db_session.commit()
-        db_session.refresh(batch)
+        await db_session.commit()
+        await db_session.refresh(batch)
 
         assert batch.total_cards == 0
         assert batch.processed_cards == 0
@@ -31,17 +31,24 @@ def test_app(temp_db_url, monkeypatch):
 
     # Import here to get fresh app with new DATABASE_URL
     from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
     from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
 
     from fcg.main import create_app
 
     # Reinitialize the global db_service with temp database
-    from fcg.services.database import db_service
+    from fcg.services.database import db_service, to_async_url
 
     # Recreate engine and session with temp database
     db_service.database_url = temp_db_url
     db_service.engine = create_engine(temp_db_url, connect_args={"check_same_thread": False})
     db_service.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db_service.engine)
+    # TestClient runs each request on its own event loop, so async connections must not be pooled
+    db_service.async_engine = create_async_engine(to_async_url(temp_db_url), poolclass=NullPool)
+    db_service.AsyncSessionLocal = async_sessionmaker(db_service.async_engine, autoflush=False, expire_on_commit=False)
+    db_service.async_read_engine = db_service.async_engine
+    db_service.AsyncReadSessionLocal = db_service.AsyncSessionLocal
 
     # Initialize database tables using the db_service engine
     Base.metadata.create_all(bind=db_service.engine)
@@ -62,6 +69,13 @@ def client(test_app):
     return TestClient(test_app)
 
 
+def _create_flashcards(client, user_id, count):
+    """Create ``count`` cards for ``user_id`` in one batch and return their ids"""
+    flashcards = [{"user_id": user_id, "front": f"Q{n}", "back": f"A{n}"} for n in range(count)]
+    response = client.post("/api/v1/flashcards/batch", json={"user_id": user_id, "flashcards": flashcards})
+    return [card["id"] for card in response.json()]
+
+
 class TestFlashcardAPI:
     """Test flashcard API endpoints"""
 
@@ -112,6 +126,8 @@ class TestFlashcardAPI:
         assert data[1]["user_id"] == "test_user_123"
         assert data[0]["front"] == "What is Python?"
         assert data[1]["front"] == "What is Django?"
+        assert data[0]["batch_id"] is not None
+        assert data[0]["batch_id"] == data[1]["batch_id"]
 
     def test_get_pending_flashcards(self, client):
         """Test retrieving pending flashcards for a user"""
@@ -195,7 +211,7 @@ class TestFlashcardAPI:
 
         # Mark one as failed
         failed_id = flashcard2_response.json()["id"]
-        client.delete(f"/api/v1/flashcards/failed/{failed_id}")
+        client.delete(f"/api/v1/flashcards/failed/{failed_id}", params={"user_id": user_id})
 
         # Get stats
         response = client.get(f"/api/v1/flashcards/stats/{user_id}")
@@ -228,16 +244,26 @@ class TestFlashcardAPI:
         flashcard_id = flashcard_response.json()["id"]
 
         # Mark as failed
-        response = client.delete(f"/api/v1/flashcards/failed/{flashcard_id}")
+        response = client.delete(f"/api/v1/flashcards/failed/{flashcard_id}", params={"user_id": user_id})
 
         assert response.status_code == 200
         data = response.json()
 
         assert f"Flashcard {flashcard_id} marked as failed" in data["message"]
 
+    def test_mark_other_users_flashcard_failed(self, client):
+        """Test a user cannot mark another user's flashcard as failed"""
+        flashcard_response = client.post("/api/v1/flashcards/", json={"user_id": "owner", "front": "Q", "back": "A"})
+        flashcard_id = flashcard_response.json()["id"]
+
+        response = client.delete(f"/api/v1/flashcards/failed/{flashcard_id}", params={"user_id": "intruder"})
+
+        assert response.status_code == 404
+        assert client.get("/api/v1/flashcards/stats/owner").json()["pending"] == 1
+
     def test_mark_nonexistent_flashcard_failed(self, client):
         """Test marking non-existent flashcard as failed"""
-        response = client.delete("/api/v1/flashcards/failed/99999")
+        response = client.delete("/api/v1/flashcards/failed/99999", params={"user_id": "test_user"})
 
         assert response.status_code == 404
         data = response.json()
@@ -297,6 +323,188 @@ class TestFlashcardAPI:
         assert user2_data[0]["front"] == "User 2 Question"
 
 
+class TestChangeFeedAPI:
+    """Test the cursor-based change feed"""
+
+    def test_pages_through_changes_with_cursor(self, client):
+        """Test pages follow each other and an empty page keeps the cursor"""
+        ids = _create_flashcards(client, "feed_user", 5)
+        _create_flashcards(client, "other_user", 2)
+
+        first = client.get("/api/v1/flashcards/changes/feed_user", params={"limit": 3}).json()
+        assert [card["id"] for card in first["changes"]] == ids[:3]
+        assert first["has_more"] is True
+
+        second = client.get("/api/v1/flashcards/changes/feed_user", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+        assert [card["id"] for card in second["changes"]] == ids[3:]
+        assert second["has_more"] is False
+
+        empty = client.get("/api/v1/flashcards/changes/feed_user", params={"cursor": second["next_cursor"]}).json()
+        assert empty["changes"] == []
+        assert empty["next_cursor"] == second["next_cursor"]
+
+    def test_wait_reports_changes_after_cursor(self, client):
+        """Test the long-poll returns at once when changes exist and times out when caught up"""
+        _create_flashcards(client, "feed_user", 2)
+        cursor = client.get("/api/v1/flashcards/changes/feed_user").json()["next_cursor"]
+
+        fresh = client.get("/api/v1/flashcards/changes/feed_user/wait", params={"timeout": 0}).json()
+        caught_up = client.get("/api/v1/flashcards/changes/feed_user/wait", params={"cursor": cursor, "timeout": 0.1}).json()
+
+        assert fresh["changed"] is True
+        assert caught_up == {"user_id": "feed_user", "changed": False, "version": fresh["version"]}
+
+    def test_wait_past_own_acknowledgement(self, client):
+        """Test a client can wait past the version its own acknowledgement created"""
+        ids = _create_flashcards(client, "feed_user", 2)
+        page = client.get("/api/v1/flashcards/changes/feed_user").json()
+
+        ack = client.post("/api/v1/flashcards/sync", json={"user_id": "feed_user", "flashcard_ids": ids}).json()
+        repeat = client.post("/api/v1/flashcards/sync", json={"user_id": "feed_user", "flashcard_ids": ids}).json()
+        wait_params = {"cursor": page["next_cursor"], "timeout": 0.1}
+        woken = client.get("/api/v1/flashcards/changes/feed_user/wait", params=wait_params).json()
+        waited = client.get(
+            "/api/v1/flashcards/changes/feed_user/wait", params={**wait_params, "version": ack["version"]}
+        ).json()
+
+        assert ack["version"] == page["version"] + 1
+        assert repeat["version"] is None
+        assert woken["changed"] is True
+        assert waited["changed"] is False
+
+    def test_large_pages_are_gzipped(self, client):
+        """Test feed pages are compressed for clients that accept gzip"""
+        _create_flashcards(client, "feed_user", 30)
+
+        compressed = client.get("/api/v1/flashcards/changes/feed_user", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/api/v1/flashcards/changes/feed_user", headers={"Accept-Encoding": "identity"})
+
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in plain.headers
+        assert compressed.json() == plain.json()
+
+    def test_status_changes_reappear_in_feed(self, client):
+        """Test cards changed after the cursor are returned again with their new status"""
+        ids = _create_flashcards(client, "feed_user", 3)
+        cursor = client.get("/api/v1/flashcards/changes/feed_user").json()["next_cursor"]
+
+        client.post("/api/v1/flashcards/sync", json={"user_id": "feed_user", "flashcard_ids": [ids[1]]})
+        new_ids = _create_flashcards(client, "feed_user", 1)
+
+        changes = client.get("/api/v1/flashcards/changes/feed_user", params={"cursor": cursor}).json()["changes"]
+        assert [(card["id"], card["status"]) for card in changes] == [(ids[1], "synced"), (new_ids[0], "pending")]
+
+    def test_invalid_cursor_is_rejected(self, client):
+        """Test a malformed cursor is a client error"""
+        response = client.get("/api/v1/flashcards/changes/feed_user", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+
+class TestSyncLeasesAPI:
+    """Test leasing pending cards and acknowledging leases"""
+
+    def _expire_leases(self):
+        from sqlalchemy import text
+
+        from fcg.services.database import db_service
+
+        with db_service.engine.begin() as connection:
+            connection.execute(
+                text("UPDATE flashcards SET lease_expires_at = '2000-01-01 00:00:00' WHERE lease_expires_at IS NOT NULL")
+            )
+
+    def test_leased_cards_are_excluded_from_other_fetches(self, client):
+        """Test a lease hands each card to one client only"""
+        ids = _create_flashcards(client, "lease_user", 3)
+
+        leased = client.get("/api/v1/flashcards/pending/lease_user", params={"lease_seconds": 60}).json()
+        assert sorted(card["id"] for card in leased) == sorted(ids)
+        assert len({card["lease_id"] for card in leased}) == 1
+
+        assert client.get("/api/v1/flashcards/pending/lease_user", params={"lease_seconds": 60}).json() == []
+        assert client.get("/api/v1/flashcards/pending/lease_user").json() == []
+
+    def test_acknowledgement_is_idempotent(self, client):
+        """Test acknowledging the same lease twice reports the same result"""
+        ids = _create_flashcards(client, "lease_user", 2)
+        lease_id = client.get("/api/v1/flashcards/pending/lease_user", params={"lease_seconds": 60}).json()[0]["lease_id"]
+        payload = {"user_id": "lease_user", "flashcard_ids": ids, "lease_id": lease_id}
+
+        first = client.post("/api/v1/flashcards/sync", json=payload).json()
+        second = client.post("/api/v1/flashcards/sync", json=payload).json()
+
+        assert first["synced_count"] == second["synced_count"] == 2
+        stats = client.get("/api/v1/flashcards/stats/lease_user").json()
+        assert stats["synced"] == 2
+
+    def test_acknowledgement_needs_the_lease(self, client):
+        """Test cards leased under another lease are not acknowledged"""
+        ids = _create_flashcards(client, "lease_user", 1)
+        client.get("/api/v1/flashcards/pending/lease_user", params={"lease_seconds": 60})
+
+        response = client.post(
+            "/api/v1/flashcards/sync", json={"user_id": "lease_user", "flashcard_ids": ids, "lease_id": "other-lease"}
+        ).json()
+
+        assert response["synced_count"] == 0
+
+    def test_expired_leases_are_reclaimed(self, client):
+        """Test cards come back once their lease expires, and a late ack still counts until re-leased"""
+        ids = _create_flashcards(client, "lease_user", 2)
+        first = client.get("/api/v1/flashcards/changes/lease_user", params={"lease_seconds": 60}).json()
+        assert first["lease_id"] is not None
+        assert client.get("/api/v1/flashcards/changes/lease_user", params={"lease_seconds": 60}).json()["changes"] == []
+
+        self._expire_leases()
+
+        # Reclaimed cards are changes, so they reappear after the first client's cursor
+        again = client.get(
+            "/api/v1/flashcards/changes/lease_user", params={"cursor": first["next_cursor"], "lease_seconds": 60}
+        ).json()
+        assert sorted(card["id"] for card in again["changes"]) == sorted(ids)
+        assert again["lease_id"] != first["lease_id"]
+
+        # The old lease lost its cards to the new one
+        late = client.post(
+            "/api/v1/flashcards/sync", json={"user_id": "lease_user", "flashcard_ids": ids, "lease_id": first["lease_id"]}
+        ).json()
+        assert late["synced_count"] == 0
+        assert set(late["outcomes"].values()) == {"lease_mismatch"}
+
+
+class TestBulkAcknowledgementAPI:
+    """Test per-id outcomes and the bulk failure report"""
+
+    def test_sync_is_scoped_to_the_user(self, client):
+        """Test another user's cards are reported as not found and left pending"""
+        mine = _create_flashcards(client, "ack_user", 1)
+        theirs = _create_flashcards(client, "other_user", 1)
+
+        response = client.post("/api/v1/flashcards/sync", json={"user_id": "ack_user", "flashcard_ids": mine + theirs}).json()
+
+        assert response["synced_count"] == 1
+        assert response["outcomes"] == {str(mine[0]): "synced", str(theirs[0]): "not_found"}
+        assert client.get("/api/v1/flashcards/stats/other_user").json()["pending"] == 1
+
+    def test_report_failed_in_bulk(self, client):
+        """Test one request fails many cards and repeats are reported as already failed"""
+        ids = _create_flashcards(client, "ack_user", 3)
+        payload = {"user_id": "ack_user", "flashcard_ids": ids + [99999]}
+
+        first = client.post("/api/v1/flashcards/failed", json=payload)
+        second = client.post("/api/v1/flashcards/failed", json=payload).json()
+
+        assert first.status_code == 200
+        assert first.json()["failed_count"] == 3
+        assert first.json()["outcomes"]["99999"] == "not_found"
+        assert second["failed_count"] == 3
+        assert {second["outcomes"][str(card_id)] for card_id in ids} == {"already_failed"}
+        stats = client.get("/api/v1/flashcards/stats/ack_user").json()
+        assert stats["failed"] == 3
+        assert stats["pending"] == 0
+
+
 class TestAPIModels:
     """Test API model validation"""
 
@@ -333,3 +541,145 @@ class TestAPIModels:
         assert data["deck_name"] == "Custom Deck"
         assert data["tags"] == "tag1,tag2,tag3"
         assert data["difficulty"] == "hard"
+
+
+class TestGenerationAPI:
+    """Test the generation endpoint against the real DSPy pipeline with stubbed stages"""
+
+    @pytest.fixture
+    def stages(self, monkeypatch):
+        """Replace the LLM calls of every built pipeline with shared call-counting fakes"""
+        from unittest.mock import Mock
+
+        import dspy
+
+        from fcg.utils import flashcard_generator
+        from fcg.utils.dspy_flashcard_generator import Flashcard
+
+        def generate(**inputs):
+            count = int(inputs["num_cards"])
+            return dspy.Prediction(
+                flashcards=[Flashcard(question=f"Q{n}?", answer="A", explanation="E", topic="T") for n in range(count)]
+            )
+
+        stages = {
+            "analyze": Mock(
+                return_value=dspy.Prediction(
+                    key_concepts="orbits", concept_hierarchy="sun > earth", learning_priorities="orbits"
+                )
+            ),
+            "prioritize": Mock(return_value=dspy.Prediction(prioritized_concepts="1. orbits")),
+            "generate": Mock(side_effect=generate),
+        }
+        build_pipeline = flashcard_generator._build_pipeline
+
+        def stubbed_pipeline(*args, **kwargs):
+            pipeline, version = build_pipeline(*args, **kwargs)
+            for name, stage in stages.items():
+                setattr(pipeline, name, stage)
+            return pipeline, version
+
+        monkeypatch.setattr(flashcard_generator, "_build_pipeline", stubbed_pipeline)
+        return stages
+
+    def test_new_card_count_reuses_analysis_and_prioritization(self, client, stages):
+        """Test regenerating the same text with another card_count only reruns the final stage"""
+        for card_count in (5, 10):
+            response = client.post(
+                "/api/v1/flashcards/generate",
+                json={
+                    "user_id": "memo_user",
+                    "text": "The earth orbits the sun.",
+                    "card_count": card_count,
+                    "quality": "full",
+                },
+            )
+
+            assert response.status_code == 200
+            assert len(response.json()) == card_count
+
+        assert stages["analyze"].call_count == 1
+        assert stages["prioritize"].call_count == 1
+        assert [call.kwargs["num_cards"] for call in stages["generate"].call_args_list] == ["5", "10"]
+
+
+class TestGenerationStreamAPI:
+    """Test the SSE generation endpoint"""
+
+    @pytest.fixture
+    def fake_llm_service(self, test_app):
+        """Replace the app's generator with one that streams two cards"""
+        from fcg.routes.dependencies import get_llm_service
+
+        class FakeLLMService:
+            calls = []
+
+            async def stream_flashcards(self, conversation, **kwargs):
+                self.calls.append(kwargs)
+                yield {"id": "1", "question": "What is SSE?", "answer": "Server-Sent Events", "topic": "Web"}
+                yield {"id": "2", "question": "What is HTTP?", "answer": "A protocol", "topic": "Web"}
+
+        test_app.dependency_overrides[get_llm_service] = FakeLLMService
+        yield FakeLLMService
+        test_app.dependency_overrides.clear()
+
+    @staticmethod
+    def parse_events(body: str):
+        """Parse an SSE body into (event, data) pairs, skipping comments"""
+        import json
+
+        events = []
+        for block in body.strip().split("\n\n"):
+            lines = [line for line in block.splitlines() if not line.startswith(":")]
+            if not lines:
+                continue
+            event = lines[0].removeprefix("event: ")
+            data = json.loads(lines[1].removeprefix("data: "))
+            events.append((event, data))
+        return events
+
+    def test_stream_emits_cards_then_summary(self, client, fake_llm_service):
+        """Test each card is persisted and emitted before the summary event"""
+        response = client.post(
+            "/api/v1/flashcards/generate/stream",
+            json={"user_id": "stream_user", "text": "Server-Sent Events stream over HTTP."},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = self.parse_events(response.text)
+        assert [event for event, _ in events] == ["card", "card", "summary"]
+        assert events[0][1]["front"] == "What is SSE?"
+        assert events[0][1]["status"] == "pending"
+        assert events[2][1]["count"] == 2
+
+        pending = client.get("/api/v1/flashcards/pending/stream_user").json()
+        assert {card["id"] for card in pending} == set(events[2][1]["flashcard_ids"])
+
+    def test_stream_saves_cards_in_one_batch(self, client, fake_llm_service):
+        """Test the streamed cards share the batch created up front and the user is passed on"""
+        response = client.post("/api/v1/flashcards/generate/stream", json={"user_id": "stream_user", "text": "SSE."})
+
+        events = self.parse_events(response.text)
+        batch_id = events[-1][1]["batch_id"]
+        assert batch_id is not None
+        assert [data["batch_id"] for event, data in events if event == "card"] == [batch_id, batch_id]
+        assert fake_llm_service.calls[-1]["user_id"] == "stream_user"
+
+    def test_stream_reports_errors(self, client, test_app):
+        """Test generation failures are sent as an error event"""
+        from fcg.routes.dependencies import get_llm_service
+
+        class FailingLLMService:
+            async def stream_flashcards(self, conversation, **kwargs):
+                raise RuntimeError("LLM down")
+                yield  # pragma: no cover
+
+        test_app.dependency_overrides[get_llm_service] = FailingLLMService
+
+        response = client.post("/api/v1/flashcards/generate/stream", json={"user_id": "u", "text": "Some text here."})
+
+        events = self.parse_events(response.text)
+        assert events[-1][0] == "error"
+        assert "LLM down" in events[-1][1]["detail"]
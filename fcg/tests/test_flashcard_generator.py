@@ -1,7 +1,8 @@
 import pytest
 
+from fcg.config.settings import Settings
 from fcg.schemas import ChatMessage
-from fcg.utils.flashcard_generator import generate_flashcards
+from fcg.utils.flashcard_generator import GenerationContext, generate_flashcards
 
 
 @pytest.mark.llm
@@ -20,7 +21,7 @@ async def test_flashcard_generation():
     ]
 
     # Act
-    flashcards = await generate_flashcards(test_conversation)
+    flashcards = await generate_flashcards(test_conversation, GenerationContext.create(Settings()))
 
     # Assert
     assert isinstance(flashcards, list)
@@ -0,0 +1,196 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from fcg.models.generation_cache import GenerationCacheEntry
+from fcg.schemas import ChatMessage, ChatRole
+from fcg.services.database import DatabaseService
+from fcg.services.generation_cache import GenerationCache
+from fcg.utils.flashcard_generator import GenerationContext
+
+
+@pytest.fixture
+async def temp_db():
+    """Create a temporary SQLite database for testing"""
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as temp_file:
+        db_path = temp_file.name
+
+    db_service = DatabaseService(f"sqlite:///{db_path}")
+    db_service.init_database()
+
+    yield db_service
+
+    db_service.engine.dispose()
+    await db_service.async_engine.dispose()
+    await db_service.async_read_engine.dispose()
+    os.unlink(db_path)
+
+
+@pytest.fixture
+def cache(temp_db):
+    """GenerationCache backed by the temporary database"""
+    return GenerationCache(temp_db, ttl_seconds=3600, max_entries=3)
+
+
+SAMPLE_CARDS = [{"question": "What is Python?", "answer": "A language", "explanation": "", "topic": "Programming"}]
+
+
+class TestGenerationCacheKey:
+    """Test cache key construction"""
+
+    def test_key_ignores_whitespace_differences(self):
+        """Test cosmetic whitespace changes map to the same key"""
+        key1 = GenerationCache.make_key("Hello   world\n", "model-a", 5, "v1")
+        key2 = GenerationCache.make_key("  Hello world", "model-a", 5, "v1")
+
+        assert key1 == key2
+        assert len(key1) == 64
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ("Other text", "model-a", 5, "v1"),
+            ("Hello world", "model-b", 5, "v1"),
+            ("Hello world", "model-a", 6, "v1"),
+            ("Hello world", "model-a", 5, "v2"),
+        ],
+    )
+    def test_key_changes_with_inputs(self, args):
+        """Test text, model, card count and pipeline version all affect the key"""
+        assert GenerationCache.make_key("Hello world", "model-a", 5, "v1") != GenerationCache.make_key(*args)
+
+
+async def backdate(temp_db, key, **columns):
+    """Move an entry's timestamps into the past"""
+    async with temp_db.AsyncSessionLocal() as db:
+        entry = await db.get(GenerationCacheEntry, key)
+        for column, age in columns.items():
+            setattr(entry, column, datetime.utcnow() - age)
+        await db.commit()
+
+
+async def stored_entry(temp_db, key):
+    async with temp_db.AsyncReadSessionLocal() as db:
+        return await db.get(GenerationCacheEntry, key)
+
+
+class TestGenerationCache:
+    """Test GenerationCache storage behaviour"""
+
+    async def test_miss_then_hit(self, cache):
+        """Test a stored entry is returned and counted as a hit"""
+        key = cache.make_key("text", "model", 3, "v1")
+
+        assert await cache.get(key) is None
+        await cache.set(key, SAMPLE_CARDS, model="model", num_cards=3, pipeline_version="v1")
+
+        assert await cache.get(key) == SAMPLE_CARDS
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["writes"] == 1
+
+    async def test_hits_are_written_in_batches(self, cache, temp_db):
+        """Test lookups do not write; recorded hits reach hit_count on flush"""
+        key = cache.make_key("text", "model", 3, "v1")
+        await cache.set(key, SAMPLE_CARDS, model="model", num_cards=3, pipeline_version="v1")
+        await cache.get(key)
+        await cache.get(key)
+
+        assert (await stored_entry(temp_db, key)).hit_count == 0
+        assert cache.stats()["pending_hits"] == 1
+
+        await cache.flush()
+
+        assert (await stored_entry(temp_db, key)).hit_count == 2
+        assert cache.stats()["pending_hits"] == 0
+
+    async def test_expired_entry_is_a_miss(self, cache, temp_db):
+        """Test entries older than the TTL are ignored"""
+        key = cache.make_key("text", "model", 3, "v1")
+        await cache.set(key, SAMPLE_CARDS, model="model", num_cards=3, pipeline_version="v1")
+        await backdate(temp_db, key, created_at=timedelta(hours=2))
+
+        assert await cache.get(key) is None
+
+    async def test_size_based_eviction(self, cache, temp_db):
+        """Test least recently used entries are evicted beyond max_entries"""
+        unbounded = GenerationCache(temp_db, max_entries=0)
+        keys = [cache.make_key(f"text {i}", "model", 3, "v1") for i in range(5)]
+        for i, key in enumerate(keys):
+            await unbounded.set(key, SAMPLE_CARDS, model="model", num_cards=3, pipeline_version="v1")
+            await backdate(temp_db, key, last_accessed_at=timedelta(seconds=10 - i))
+
+        # A pending hit makes the oldest entry the most recently used one
+        await cache.get(keys[0])
+        newest = cache.make_key("newest", "model", 3, "v1")
+        await cache.set(newest, SAMPLE_CARDS, model="model", num_cards=3, pipeline_version="v1")
+
+        async with temp_db.AsyncReadSessionLocal() as db:
+            remaining = set((await db.execute(select(GenerationCacheEntry.cache_key))).scalars())
+
+        assert remaining == {keys[0], keys[4], newest}
+        assert cache.stats()["evictions"] == 3
+
+    async def test_disabled_cache(self, temp_db):
+        """Test a disabled cache never stores or returns entries"""
+        cache = GenerationCache(temp_db, enabled=False)
+        key = cache.make_key("text", "model", 3, "v1")
+        await cache.set(key, SAMPLE_CARDS, model="model", num_cards=3, pipeline_version="v1")
+
+        assert await cache.get(key) is None
+        assert cache.stats()["misses"] == 0
+
+
+class TestGenerateFlashcardsCaching:
+    """Test the cache sits in front of DSPy generation"""
+
+    @pytest.fixture
+    def context(self, generation_context, cache):
+        """Generation context using the temporary database's cache"""
+        context = generation_context
+        return GenerationContext(context.settings, context.llm_client, context.executor, cache, context.stage_memos)
+
+    @pytest.fixture
+    def fake_pipeline(self, monkeypatch):
+        """Replace the DSPy pipeline with a call-counting fake"""
+        from fcg.utils import flashcard_generator
+        from fcg.utils.dspy_flashcard_generator import Flashcard
+
+        calls = []
+
+        def fake_pipeline(text_content, num_cards):
+            calls.append(text_content)
+            return [Flashcard(question="Q?", answer="A", explanation="E", topic="T")]
+
+        monkeypatch.setattr(flashcard_generator, "_build_pipeline", lambda tier, *args: (fake_pipeline, "test/1"))
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_repeat_generation_served_from_cache(self, fake_pipeline, context):
+        """Test identical conversations only run the pipeline once"""
+        from fcg.utils.flashcard_generator import generate_flashcards
+
+        conversation = [ChatMessage(role=ChatRole.USER, content="The earth orbits the sun.")]
+
+        first = await generate_flashcards(conversation, context)
+        second = await generate_flashcards(conversation, context)
+
+        assert len(fake_pipeline) == 1
+        assert first[0]["question"] == second[0]["question"] == "Q?"
+        assert first[0]["id"] != second[0]["id"]
+
+    @pytest.mark.asyncio
+    async def test_bypass_cache_regenerates(self, fake_pipeline, context):
+        """Test bypass_cache forces a fresh pipeline run"""
+        from fcg.utils.flashcard_generator import generate_flashcards
+
+        conversation = [ChatMessage(role=ChatRole.USER, content="The earth orbits the sun.")]
+
+        await generate_flashcards(conversation, context)
+        await generate_flashcards(conversation, context, bypass_cache=True)
+
+        assert len(fake_pipeline) == 2
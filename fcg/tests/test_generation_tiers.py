@@ -0,0 +1,62 @@
+from unittest.mock import Mock
+
+import dspy
+import pytest
+
+from fcg.schemas import GenerationTier
+from fcg.utils.dspy_flashcard_generator import FastTextToFlashcards, Flashcard, TextToFlashcards
+from fcg.utils.flashcard_generator import _build_pipeline, resolve_generation_tier
+
+
+class TestResolveGenerationTier:
+    """Test automatic tier selection"""
+
+    def test_short_input_uses_fast_tier(self):
+        """Test short inputs resolve to the single-call tier"""
+        assert resolve_generation_tier("A short chat about orbits.") == GenerationTier.FAST
+
+    def test_long_input_uses_full_tier(self):
+        """Test inputs over the word threshold resolve to the full pipeline"""
+        assert resolve_generation_tier("word " * 5000) == GenerationTier.FULL
+
+    def test_threshold_comes_from_caller(self):
+        """Test the word threshold is the one passed in"""
+        assert resolve_generation_tier("word " * 50, fast_tier_max_words=10) == GenerationTier.FULL
+
+    @pytest.mark.parametrize("tier", [GenerationTier.FAST, GenerationTier.FULL])
+    def test_explicit_tier_is_respected(self, tier):
+        """Test an explicitly requested tier is never overridden"""
+        assert resolve_generation_tier("word " * 5000, tier) == tier
+        assert resolve_generation_tier("short", tier) == tier
+
+
+class TestBuildPipeline:
+    """Test pipeline construction per tier"""
+
+    def test_fast_tier_builds_fused_module(self, generation_context):
+        """Test FAST builds the single-call module with its own cache version"""
+        module, version = _build_pipeline(GenerationTier.FAST, generation_context)
+
+        assert isinstance(module, FastTextToFlashcards)
+        assert version.startswith("fused-flashcards/")
+
+    def test_full_tier_builds_memoized_pipeline(self, generation_context):
+        """Test FULL builds the 3-stage pipeline with stage memos attached"""
+        module, version = _build_pipeline(GenerationTier.FULL, generation_context)
+
+        assert isinstance(module, TextToFlashcards)
+        assert module.analysis_memo is generation_context.stage_memos.analysis
+        assert version.startswith("text-to-flashcards/")
+
+
+def test_fast_pipeline_makes_one_call():
+    """Test FastTextToFlashcards runs a single fused prediction"""
+    module = FastTextToFlashcards()
+    module.generate = Mock(
+        return_value=dspy.Prediction(flashcards=[Flashcard(question="Q?", answer="A", explanation="E", topic="T")])
+    )
+
+    cards = module(text_content="The earth orbits the sun.", num_cards=3)
+
+    module.generate.assert_called_once_with(text_content="The earth orbits the sun.", num_cards="3")
+    assert cards[0].question == "Q?"
@@ -27,15 +27,22 @@ def integration_client():
     # Import create_app after setting DATABASE_URL so the application
     # uses the temporary SQLite database for tests instead of the
     # default local database.
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
     from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
 
     from fcg.main import create_app
-    from fcg.services.database import db_service
+    from fcg.services.database import db_service, to_async_url
 
     # Reinitialize the global db_service with temp database
     db_service.database_url = db_url
     db_service.engine = create_engine(db_url, connect_args={"check_same_thread": False})
     db_service.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db_service.engine)
+    # TestClient runs each request on its own event loop, so async connections must not be pooled
+    db_service.async_engine = create_async_engine(to_async_url(db_url), poolclass=NullPool)
+    db_service.AsyncSessionLocal = async_sessionmaker(db_service.async_engine, autoflush=False, expire_on_commit=False)
+    db_service.async_read_engine = db_service.async_engine
+    db_service.AsyncReadSessionLocal = db_service.AsyncSessionLocal
 
     # Initialize database tables using the db_service engine
     Base.metadata.create_all(bind=db_service.engine)
@@ -138,7 +145,7 @@ class TestCompleteFlashcardFlow:
 
         # Step 5: Mark 1 flashcard as failed
         failed_id = created_flashcards[2]["id"]
-        failed_response = integration_client.delete(f"/api/v1/flashcards/failed/{failed_id}")
+        failed_response = integration_client.delete(f"/api/v1/flashcards/failed/{failed_id}", params={"user_id": user_id})
         assert failed_response.status_code == 200
 
         # Step 6: Verify pending flashcards are now empty
@@ -230,7 +237,7 @@ class TestCompleteFlashcardFlow:
         assert sync_response.json()["synced_count"] == 0
 
         # Test marking non-existent flashcard as failed
-        failed_response = integration_client.delete("/api/v1/flashcards/failed/99999")
+        failed_response = integration_client.delete("/api/v1/flashcards/failed/99999", params={"user_id": user_id})
         assert failed_response.status_code == 404
 
         # Test getting stats for user with no flashcards
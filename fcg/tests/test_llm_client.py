@@ -0,0 +1,81 @@
+"""
+Tests for the app-scoped LLM client
+"""
+
+import os
+import subprocess
+import sys
+
+from fcg.schemas import GenerationTier
+from fcg.services.llm_client import LLMClient
+from fcg.utils.flashcard_generator import _build_pipeline
+
+
+class TestLLMClient:
+    """Test lazy LM construction and model selection"""
+
+    def test_nothing_is_built_until_used(self, mock_settings):
+        """Test constructing the client does not build LMs or the invoker"""
+        client = LLMClient(mock_settings)
+
+        stats = client.stats()
+        assert stats["loaded_models"] == []
+        assert stats["invoker"] is None
+
+    def test_app_import_does_not_load_dspy(self):
+        """Test importing the app leaves DSPy and litellm unloaded until a generation needs them"""
+        code = "import sys, fcg.main; print(any(m.split('.')[0] in ('dspy', 'litellm') for m in sys.modules))"
+        env = dict(os.environ, OPENROUTER_API_KEY=os.environ.get("OPENROUTER_API_KEY", "test"))
+
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+
+        assert result.stdout.strip() == "False"
+
+    def test_lms_are_built_once_per_model(self, mock_settings, monkeypatch):
+        """Test each model's LM is built on first use and then reused"""
+        client = LLMClient(mock_settings)
+        built = []
+        monkeypatch.setattr(client, "_build_lm", lambda model: built.append(model) or object())
+
+        first = client.lm()
+        assert client.lm() is first
+        client.lm("other/model")
+
+        assert built == [mock_settings.openrouter_model, "other/model"]
+        assert client.stats()["loaded_models"] == sorted([mock_settings.openrouter_model, "other/model"])
+
+    def test_lms_skip_dspy_response_cache(self, mock_settings):
+        """Test LMs never answer from DSPy's cache, so bypass_cache really regenerates"""
+        client = LLMClient(mock_settings)
+
+        assert client.lm().cache is False
+        client.close()
+
+    def test_models_for_puts_override_before_fallbacks(self, mock_settings):
+        """Test a per-request model is tried first, followed by the configured fallbacks"""
+        mock_settings.openrouter_fallback_models = ["fallback/a", "override/model"]
+        client = LLMClient(mock_settings)
+
+        assert client.models_for() == [mock_settings.openrouter_model, "fallback/a", "override/model"]
+        assert client.models_for("override/model") == ["override/model", "fallback/a"]
+        assert client.model_name("override/model") == "openrouter/override/model"
+
+    def test_pipeline_uses_requested_model(self, mock_settings, generation_context):
+        """Test a model override reaches the pipeline without touching the default model"""
+        module, _ = _build_pipeline(GenerationTier.FULL, generation_context, "override/model")
+        default_module, _ = _build_pipeline(GenerationTier.FULL, generation_context)
+
+        assert module.models[0] == "override/model"
+        assert module.invoker is generation_context.llm_client.invoker
+        assert default_module.models[0] == mock_settings.openrouter_model
+
+    def test_close_releases_resources(self, mock_settings):
+        """Test close drops the invoker so the client can be rebuilt"""
+        client = LLMClient(mock_settings)
+        invoker = client.invoker
+
+        client.close()
+
+        assert client.stats()["invoker"] is None
+        assert client.invoker is not invoker
+        client.close()
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fcg.exceptions import GenerationCapacityError, GenerationTimeoutError
+from fcg.utils.llm_executor import LLMExecutor
+
+
+@pytest.fixture
+def executor():
+    """LLMExecutor with a small pool for testing"""
+    executor = LLMExecutor(max_workers=2, max_queue=2, timeout=5)
+    yield executor
+    executor.shutdown()
+
+
+class TestLLMExecutor:
+    """Test LLMExecutor behaviour"""
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result(self, executor):
+        """Test blocking function result is returned to the caller"""
+        result = await executor.run(lambda a, b=0: a + b, 2, b=3)
+
+        assert result == 5
+        assert executor.stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_run_does_not_block_event_loop(self, executor):
+        """Test the event loop keeps running while a call is in progress"""
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(executor.run(time.sleep, 0.2), ticker())
+
+        assert len(ticks) == 5
+        assert ticks[-1] - ticks[0] < 0.2
+
+    @pytest.mark.asyncio
+    async def test_run_propagates_exceptions(self, executor):
+        """Test exceptions raised in the worker reach the caller"""
+
+        def boom():
+            raise ValueError("bad input")
+
+        with pytest.raises(ValueError, match="bad input"):
+            await executor.run(boom)
+
+        assert executor.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, executor):
+        """Test a slow call raises GenerationTimeoutError"""
+        with pytest.raises(GenerationTimeoutError):
+            await executor.run(time.sleep, 0.5, timeout=0.05)
+
+        assert executor.stats()["timed_out"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_depth_and_rejection(self, executor):
+        """Test queued calls are counted and rejected once the queue is full"""
+        release = threading.Event()
+        # Two calls occupy both workers, two more fill the queue
+        tasks = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(4)]
+        await asyncio.sleep(0.1)
+
+        stats = executor.stats()
+        assert stats["running"] == 2
+        assert stats["queued"] == 2
+
+        with pytest.raises(GenerationCapacityError):
+            await executor.run(release.wait)
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        stats = executor.stats()
+        assert stats["running"] == 0
+        assert stats["queued"] == 0
+        assert stats["completed"] == 4
+        assert stats["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_while_queued_frees_queue_slot(self):
+        """Test a call that times out before starting is removed from the queue"""
+        executor = LLMExecutor(max_workers=1, max_queue=1, timeout=5)
+        release = threading.Event()
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(GenerationTimeoutError):
+            await executor.run(release.wait, timeout=0.05)
+
+        assert executor.stats()["queued"] == 0
+
+        release.set()
+        await running
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancel_while_queued_frees_queue_slot(self):
+        """Test cancelling a caller whose call is still queued releases its queue slot"""
+        executor = LLMExecutor(max_workers=1, max_queue=1, timeout=5)
+        release = threading.Event()
+        running = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        try:
+            for _ in range(3):
+                queued = asyncio.ensure_future(executor.run(release.wait))
+                await asyncio.sleep(0.01)
+                queued.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await queued
+                assert executor.stats()["queued"] == 0
+        finally:
+            release.set()
+            await running
+
+        assert await executor.run(lambda: "ok") == "ok"
+        executor.shutdown()
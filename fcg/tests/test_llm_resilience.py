@@ -0,0 +1,161 @@
+"""
+Tests for the resilient LLM stage invoker
+"""
+
+import threading
+import time
+
+import pytest
+
+from fcg.exceptions import FlashcardGenerationError, GenerationTimeoutError
+from fcg.utils.llm_resilience import ResilientInvoker, StageDeadlineExceeded, is_retriable
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def _invoker(**kwargs):
+    defaults = {
+        "models": ["primary", "fallback"],
+        "lm_factory": lambda model: None,
+        "default_deadline": 2.0,
+        "max_retries": 2,
+        "backoff_base": 0.0,
+        "backoff_max": 0.0,
+    }
+    defaults.update(kwargs)
+    return ResilientInvoker(**defaults)
+
+
+class TestIsRetriable:
+    def test_transient_statuses(self):
+        assert is_retriable(FakeStatusError(429))
+        assert is_retriable(FakeStatusError(503))
+        assert is_retriable(StageDeadlineExceeded("slow"))
+
+    def test_client_errors_are_not_retried(self):
+        assert not is_retriable(FakeStatusError(400))
+        assert not is_retriable(ValueError("bad output"))
+
+
+class TestResilientInvoker:
+    def test_retries_then_succeeds(self):
+        calls = []
+
+        def predictor(text):
+            calls.append(text)
+            if len(calls) < 3:
+                raise FakeStatusError(429)
+            return "ok"
+
+        invoker = _invoker()
+        result, model = invoker.call("analysis", predictor, text="hi")
+
+        assert (result, model) == ("ok", "primary")
+        assert len(calls) == 3
+        assert invoker.stats()["retries"] == 2
+
+    def test_falls_back_to_next_model(self, monkeypatch):
+        def predictor(model):
+            if model == "primary":
+                raise FakeStatusError(503)
+            return "ok"
+
+        invoker = _invoker()
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn(model=model))
+
+        result, model = invoker.call("generation", predictor)
+
+        assert (result, model) == ("ok", "fallback")
+        stats = invoker.stats()
+        assert stats["fallbacks"] == 1
+        assert stats["retries"] == 2
+        assert stats["served_by"] == {"fallback": 1}
+
+    def test_non_retriable_error_skips_to_next_model(self, monkeypatch):
+        attempts = []
+
+        def predictor(model):
+            attempts.append(model)
+            if model == "primary":
+                raise FakeStatusError(400)
+            return "ok"
+
+        invoker = _invoker()
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn(model=model))
+
+        _, model = invoker.call("generation", predictor)
+
+        assert model == "fallback"
+        assert attempts == ["primary", "fallback"]
+
+    def test_every_model_failing_raises(self, monkeypatch):
+        invoker = _invoker(max_retries=0)
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn())
+
+        def predictor():
+            raise FakeStatusError(500)
+
+        with pytest.raises(FlashcardGenerationError) as exc_info:
+            invoker.call("generation", predictor)
+        assert len(exc_info.value.details["errors"]) == 2
+
+    def test_deadline_raises_timeout_error(self, monkeypatch):
+        invoker = _invoker(models=["primary"], max_retries=0, stage_deadlines={"analysis": 0.05})
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn())
+
+        with pytest.raises(GenerationTimeoutError):
+            invoker.call("analysis", lambda: time.sleep(0.5))
+
+    def test_hedges_slow_calls(self, monkeypatch):
+        calls = []
+        lock = threading.Lock()
+
+        def predictor():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            # The first call hangs past the hedge delay; the duplicate returns quickly
+            time.sleep(0.5 if first else 0.0)
+            return "first" if first else "hedge"
+
+        invoker = _invoker(models=["primary"], hedging_enabled=True, hedge_min_samples=1)
+        invoker._tracker("generation").record(0.05)
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn())
+
+        result, _ = invoker.call("generation", predictor)
+
+        assert result == "hedge"
+        assert invoker.stats()["hedges"] == 1
+
+    def test_retries_stop_at_the_overall_deadline(self, monkeypatch):
+        calls = []
+
+        def predictor():
+            calls.append(1)
+            time.sleep(0.5)
+
+        # Three 0.2s attempts on each of two models would need 1.2s; the run only has 0.3s
+        invoker = _invoker(stage_deadlines={"analysis": 0.2})
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn())
+
+        started = time.monotonic()
+        with pytest.raises(GenerationTimeoutError) as exc_info:
+            invoker.call("analysis", predictor, deadline_at=started + 0.3)
+
+        assert time.monotonic() - started < 0.3
+        assert len(calls) == 1
+        assert "overall time budget" in str(exc_info.value)
+
+    def test_attempt_is_cut_to_the_overall_deadline(self, monkeypatch):
+        invoker = _invoker(models=["primary"], max_retries=0, stage_deadlines={"analysis": 5.0})
+        monkeypatch.setattr(invoker, "_run", lambda model, fn, inputs: fn())
+
+        started = time.monotonic()
+        with pytest.raises(GenerationTimeoutError):
+            invoker.call("analysis", lambda: time.sleep(1.0), deadline_at=started + 0.1)
+
+        assert time.monotonic() - started < 0.5
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from fcg.schemas import ChatMessage, ChatRole
+from fcg.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test SingleFlight coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test duplicate in-flight calls await the first caller's task"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+
+        assert len(calls) == 1
+        assert [value for value, _ in results] == ["result"] * 3
+        assert sorted(shared for _, shared in results) == [False, True, True]
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 2}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """Test calls with different keys are not coalesced"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b")))
+
+        assert sorted(calls) == ["a", "b"]
+        assert [value for value, _ in results] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_run_again(self):
+        """Test a finished call is not reused by later callers"""
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        assert (await flight.do("key", work))[0] == 1
+        assert (await flight.do("key", work))[0] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test an exception in the shared call is raised for all waiters"""
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("key", work), flight.do("key", work), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()["in_flight"] == 0
+
+
+class TestGenerationCoalescing:
+    """Test OpenRouterFlashcardService coalesces duplicate generations"""
+
+    @pytest.fixture
+    def service(self, monkeypatch, mock_settings, generation_context):
+        """Service whose DSPy call is replaced by a slow counting fake"""
+        from fcg.services import openrouter_flashcard_service
+        from fcg.services.openrouter_flashcard_service import OpenRouterFlashcardService
+
+        calls = []
+
+        async def fake_generate(conversation, context, **kwargs):
+            calls.append(conversation)
+            await asyncio.sleep(0.05)
+            return [{"id": "shared", "question": "Q?", "answer": "A", "topic": "T"}]
+
+        monkeypatch.setattr(openrouter_flashcard_service, "dspy_generate_flashcards", fake_generate)
+        service = OpenRouterFlashcardService(mock_settings, context=generation_context)
+        service.calls = calls
+        return service
+
+    @pytest.mark.asyncio
+    async def test_duplicate_requests_share_one_llm_call(self, service):
+        """Test concurrent identical requests from one user trigger one generation"""
+        conversation = [ChatMessage(role=ChatRole.USER, content="The earth orbits the sun.")]
+
+        first, second = await asyncio.gather(
+            service.generate_flashcards(conversation, user_id="user-1"),
+            service.generate_flashcards(conversation, user_id="user-1"),
+        )
+
+        assert len(service.calls) == 1
+        assert first[0]["question"] == second[0]["question"]
+        assert first[0]["id"] != second[0]["id"]
+
+    @pytest.mark.asyncio
+    async def test_different_users_are_not_coalesced(self, service):
+        """Test requests from different users run independently"""
+        conversation = [ChatMessage(role=ChatRole.USER, content="The earth orbits the sun.")]
+
+        await asyncio.gather(
+            service.generate_flashcards(conversation, user_id="user-1"),
+            service.generate_flashcards(conversation, user_id="user-2"),
+        )
+
+        assert len(service.calls) == 2
@@ -0,0 +1,99 @@
+import time
+from unittest.mock import Mock
+
+import dspy
+import pytest
+
+from fcg.utils.dspy_flashcard_generator import Flashcard, TextToFlashcards
+from fcg.utils.stage_memo import StageMemo
+
+
+class TestStageMemo:
+    """Test StageMemo storage behaviour"""
+
+    def test_miss_then_hit(self):
+        """Test stored outputs are returned for the same key"""
+        memo = StageMemo("analysis")
+        key = memo.make_key("model", text_content="hello")
+
+        assert memo.get(key) is None
+        memo.set(key, {"key_concepts": "greetings"})
+
+        assert memo.get(key) == {"key_concepts": "greetings"}
+        assert memo.stats()["hits"] == 1
+        assert memo.stats()["misses"] == 1
+
+    def test_key_depends_on_model_and_inputs(self):
+        """Test model name and inputs are part of the key"""
+        memo = StageMemo("analysis")
+
+        assert memo.make_key("a", text_content="x") != memo.make_key("b", text_content="x")
+        assert memo.make_key("a", text_content="x") != memo.make_key("a", text_content="y")
+
+    def test_lru_eviction(self):
+        """Test least recently used entries are dropped beyond max_entries"""
+        memo = StageMemo("analysis", max_entries=2)
+        memo.set("a", {"v": 1})
+        memo.set("b", {"v": 2})
+        memo.get("a")
+        memo.set("c", {"v": 3})
+
+        assert memo.get("b") is None
+        assert memo.get("a") == {"v": 1}
+        assert memo.get("c") == {"v": 3}
+
+    def test_ttl_expiry(self):
+        """Test entries older than the TTL are treated as misses"""
+        memo = StageMemo("analysis", ttl_seconds=0.01)
+        memo.set("a", {"v": 1})
+        time.sleep(0.02)
+
+        assert memo.get("a") is None
+        assert memo.stats()["entries"] == 0
+
+
+class TestTextToFlashcardsMemoization:
+    """Test TextToFlashcards reuses memoized stage outputs"""
+
+    @pytest.fixture
+    def pipeline(self):
+        """TextToFlashcards with mocked stages and fresh memo stores"""
+        pipeline = TextToFlashcards(analysis_memo=StageMemo("analysis"), priority_memo=StageMemo("prioritization"))
+        pipeline.analyze = Mock(
+            return_value=dspy.Prediction(key_concepts="orbits", concept_hierarchy="sun > earth", learning_priorities="orbits")
+        )
+        pipeline.prioritize = Mock(return_value=dspy.Prediction(prioritized_concepts="1. orbits"))
+        pipeline.generate = Mock(
+            return_value=dspy.Prediction(flashcards=[Flashcard(question="Q?", answer="A", explanation="E", topic="T")])
+        )
+        return pipeline
+
+    def test_regeneration_with_new_card_count_only_runs_final_stage(self, pipeline):
+        """Test a different num_cards skips analysis and prioritization"""
+        pipeline(text_content="The earth orbits the sun.", num_cards=3)
+        pipeline(text_content="The earth orbits the sun.", num_cards=8)
+
+        assert pipeline.analyze.call_count == 1
+        assert pipeline.prioritize.call_count == 1
+        assert pipeline.generate.call_count == 2
+        assert pipeline.generate.call_args.kwargs["prioritized_concepts"] == "1. orbits"
+        assert pipeline.generate.call_args.kwargs["num_cards"] == "8"
+
+    def test_different_text_runs_all_stages(self, pipeline):
+        """Test new input text misses the memo"""
+        pipeline(text_content="The earth orbits the sun.", num_cards=3)
+        pipeline(text_content="Water boils at 100 degrees.", num_cards=3)
+
+        assert pipeline.analyze.call_count == 2
+
+    def test_without_memos_every_stage_runs(self):
+        """Test the pipeline still works without memo stores"""
+        pipeline = TextToFlashcards()
+        pipeline.analyze = Mock(return_value=dspy.Prediction(key_concepts="k", concept_hierarchy="h"))
+        pipeline.prioritize = Mock(return_value=dspy.Prediction(prioritized_concepts="p"))
+        pipeline.generate = Mock(return_value=dspy.Prediction(flashcards=[]))
+
+        pipeline(text_content="text", num_cards=3)
+        pipeline(text_content="text", num_cards=3)
+
+        assert pipeline.analyze.call_count == 2
@@ -1,5 +1,8 @@
+from unittest.mock import AsyncMock, Mock
+
 import pytest
 
+from fcg.interfaces.export_service import AsyncExportService
 from fcg.schemas import (
     ChatMessage,
     ChatRole,
@@ -55,6 +58,22 @@ async def test_generate_and_export_flashcards_to_anki(container_with_mocks):
     assert response.data["count"] == 2
 
 
+@pytest.mark.asyncio
+async def test_export_to_anki_prefers_async_exporter(container_with_mocks, mock_export_service):
+    """Test the async exporter is awaited instead of the blocking one when registered"""
+    async_exporter = Mock(spec=AsyncExportService)
+    async_exporter.export_flashcards = AsyncMock(return_value="Successfully exported 2/2 cards")
+    container_with_mocks.register_instance(AsyncExportService, async_exporter)
+    use_case = FlashcardUseCase(container_with_mocks)
+
+    response = await use_case._export_to_anki([{"question": "Q", "answer": "A"}])
+
+    assert response.status == "success"
+    assert response.data["file_path"] == "Successfully exported 2/2 cards"
+    async_exporter.export_flashcards.assert_awaited_once()
+    mock_export_service.export_flashcards.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_generate_flashcards_with_empty_conversation(container_with_mocks, mock_flashcard_generator):
     """Test handling of empty flashcard generation"""
@@ -1,7 +1,8 @@
+import asyncio
 from typing import Any, Dict, List
 
 from fcg.config.container import ServiceContainer
-from fcg.interfaces.export_service import ExportService
+from fcg.interfaces.export_service import AsyncExportService, ExportService
 from fcg.interfaces.flashcard_generator_service import FlashcardGeneratorService
 from fcg.interfaces.flashcard_repository import FlashcardRepository
 from fcg.schemas import (
@@ -113,9 +114,15 @@ Text to study:"""
     async def _export_to_anki(self, flashcards: List[Dict[str, Any]]) -> FlashcardResponse:
         """Export flashcards to Anki format"""
         try:
-            export_service = self.container.get(ExportService)
             # TODO: verify connxn
-            file_path = export_service.export_flashcards(flashcards)
+            if self.container.is_registered(AsyncExportService):
+                file_path = await self.container.get(AsyncExportService).export_flashcards(flashcards)
+            else:
+                # Blocking exporter: keep the event loop free for other requests
+                export_service = self.container.get(ExportService)
+                file_path = await asyncio.get_running_loop().run_in_executor(
+                    None, export_service.export_flashcards, flashcards
+                )
 
             return FlashcardResponse(
                 status="success",
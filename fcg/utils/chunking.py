@@ -0,0 +1,76 @@
+"""
+Split long conversations into semantically coherent chunks for generation.
+
+Chunks are built from whole messages where possible. A message that is too
+long on its own is split on markdown headings, then on blank-line paragraph
+breaks, and only as a last resort on word boundaries. Adjacent pieces are then
+packed greedily so every chunk stays within ``max_words``.
+
+System messages carry instructions rather than study material, so they are
+prepended to every chunk instead of being packed into the first one.
+"""
+
+import re
+from typing import List
+
+from fcg.schemas import ChatMessage, ChatRole
+
+_HEADING_RE = re.compile(r"(?m)^(?=#{1,6}\s)")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def word_count(text: str) -> int:
+    """Count whitespace-separated words"""
+    return len(text.split())
+
+
+def chunk_conversation(conversation: List[ChatMessage], max_words: int) -> List[str]:
+    """Split a conversation into chunks of at most ``max_words`` words (plus preamble)"""
+    preamble = "\n".join(msg.content for msg in conversation if msg.role == ChatRole.SYSTEM)
+
+    segments: List[str] = []
+    for msg in conversation:
+        if msg.role != ChatRole.SYSTEM:
+            segments.extend(split_text(msg.content, max_words))
+
+    chunks = _pack(segments, max_words)
+    if preamble:
+        chunks = [f"{preamble}\n{chunk}" for chunk in chunks]
+    return chunks or ([preamble] if preamble else [])
+
+
+def split_text(text: str, max_words: int) -> List[str]:
+    """Split a single text into pieces of at most ``max_words`` words on natural boundaries"""
+    if word_count(text) <= max_words:
+        return [text]
+
+    for pattern in (_HEADING_RE, _PARAGRAPH_RE):
+        parts = [part.strip() for part in pattern.split(text) if part.strip()]
+        if len(parts) > 1:
+            pieces: List[str] = []
+            for part in parts:
+                pieces.extend(split_text(part, max_words))
+            return pieces
+
+    # No structural boundaries left: fall back to fixed-size word windows
+    words = text.split()
+    return [" ".join(words[i : i + max_words]) for i in range(0, len(words), max_words)]
+
+
+def _pack(segments: List[str], max_words: int) -> List[str]:
+    """Greedily merge adjacent segments into chunks of at most ``max_words`` words"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_words = 0
+
+    for segment in segments:
+        words = word_count(segment)
+        if current and current_words + words > max_words:
+            chunks.append("\n\n".join(current))
+            current, current_words = [], 0
+        current.append(segment)
+        current_words += words
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -5,11 +5,18 @@ This module uses DSPy signatures to generate flashcards from text content,
 adapted from the experimental dspy-poc branch but generalized for any text input.
 """
 
-from typing import List
+from typing import Any, Callable, Dict, List, Optional
 
 import dspy
 from pydantic import BaseModel
 
+from fcg.utils.llm_resilience import ResilientInvoker
+from fcg.utils.stage_memo import StageMemo
+
+# Bump whenever signatures or pipeline structure change so cached results are invalidated
+PIPELINE_VERSION = "text-to-flashcards/2"
+FAST_PIPELINE_VERSION = "fused-flashcards/2"
+
 
 class Flashcard(BaseModel):
     """Structure for a complete flashcard with three components"""
@@ -52,6 +59,7 @@ class FlashcardGeneration(dspy.Signature):
     - Treat information as factual and independent
     - Ensure each card covers a different concept without overlap
     - Make cards atomic - one concept per card
+    - Avoid explicitly referring to the author or article
     """
 
     prioritized_concepts = dspy.InputField(desc="concepts ranked by importance")
@@ -63,6 +71,32 @@ class FlashcardGeneration(dspy.Signature):
     )
 
 
+class FusedFlashcardGeneration(dspy.Signature):
+    """Read the text, pick its most important concepts and turn them into flashcards in one step.
+
+    Each flashcard should have:
+    1. Question: A concise concept title or focused question
+    2. Answer: A brief, direct answer that addresses the question
+    3. Explanation: A detailed explanation with examples to deepen understanding (4-5 sentences)
+    4. Topic: A single word or short phrase indicating the general subject area
+
+    Guidelines:
+    - Prefer the concepts most worth remembering over minor details
+    - Create concise, simple, straightforward and distinct flashcards
+    - Avoid repeating the question content in the answer
+    - Treat information as factual and independent
+    - Make cards atomic - one concept per card
+    - Avoid explicitly referring to the author or article
+    """
+
+    text_content = dspy.InputField(desc="the text to turn into flashcards")
+    num_cards = dspy.InputField(desc="approximate number of flashcards to generate")
+    flashcards: List[Flashcard] = dspy.OutputField(
+        desc="List of Flashcard models, each with question (concise concept/question), "
+        "answer (direct answer), explanation (detailed with examples), and topic (subject area)"
+    )
+
+
 class DistinctnessChecker(dspy.Signature):
     """Ensure flashcards cover different concepts without overlap"""
 
@@ -70,7 +104,39 @@ class DistinctnessChecker(dspy.Signature):
     distinct_flashcards = dspy.OutputField(desc="flashcards with overlapping content merged or removed")
 
 
-class TextToFlashcards(dspy.Module):
+class _StagedModule(dspy.Module):
+    """Base for pipelines whose stage calls can go through a ResilientInvoker"""
+
+    def __init__(self, invoker: Optional[ResilientInvoker] = None, models: Optional[List[str]] = None):
+        super().__init__()
+        self.invoker = invoker
+        # Models to try in order for this run; None uses the invoker's defaults
+        self.models = models
+        # Stage name -> model that served it ("memo" when served from a StageMemo)
+        self.served_by: Dict[str, str] = {}
+        # time.monotonic() time by which the whole run must finish; stage attempts are cut to it
+        self.deadline_at: Optional[float] = None
+
+    def _invoke(self, name: str, stage: Callable[..., Any], **inputs: Any) -> dspy.Prediction:
+        """Call one stage directly, or through the invoker when one is configured"""
+        if self.invoker is None:
+            return stage(**inputs)
+
+        prediction, model = self.invoker.call(name, stage, models=self.models, deadline_at=self.deadline_at, **inputs)
+        self.served_by[name] = model
+        return prediction
+
+    def _primary_model(self) -> str:
+        """Model the stages will try first, used to key memoized outputs"""
+        if self.models:
+            return self.models[0]
+        if self.invoker is not None:
+            return self.invoker.models[0]
+        lm = dspy.settings.lm
+        return getattr(lm, "model", "") if lm is not None else ""
+
+
+class TextToFlashcards(_StagedModule):
     """
     DSPy Module for converting text into high-quality flashcards.
 
@@ -80,13 +146,23 @@ class TextToFlashcards(dspy.Module):
     3. Generate flashcards with question, answer, explanation, and topic
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        analysis_memo: Optional[StageMemo] = None,
+        priority_memo: Optional[StageMemo] = None,
+        invoker: Optional[ResilientInvoker] = None,
+        models: Optional[List[str]] = None,
+    ):
+        super().__init__(invoker, models)
         # Core pipeline
         self.analyze = dspy.ChainOfThought(TextAnalysis)
         self.prioritize = dspy.ChainOfThought(ConceptPrioritization)
         self.generate = dspy.ChainOfThought(FlashcardGeneration)
 
+        # Optional memo stores for the stages that do not depend on num_cards
+        self.analysis_memo = analysis_memo
+        self.priority_memo = priority_memo
+
     def forward(self, text_content: str, num_cards: int = 5) -> List[Flashcard]:
         """
         Generate flashcards from text content.
@@ -99,19 +175,81 @@ class TextToFlashcards(dspy.Module):
             List of Flashcard objects with question, answer, explanation, and topic
         """
         # 1. Analyze the text
-        analysis = self.analyze(text_content=text_content)
+        analysis = self._run_stage(
+            "analysis",
+            self.analysis_memo,
+            self.analyze,
+            ["key_concepts", "concept_hierarchy", "learning_priorities"],
+            text_content=text_content,
+        )
 
         # 2. Rank/prioritize concepts
-        priorities = self.prioritize(
+        priorities = self._run_stage(
+            "prioritization",
+            self.priority_memo,
+            self.prioritize,
+            ["prioritized_concepts"],
             concepts=analysis.key_concepts,
             hierarchy=analysis.concept_hierarchy,
         )
 
         # 3. Generate the flashcards
-        generated = self.generate(
+        generated = self._invoke(
+            "generation",
+            self.generate,
             prioritized_concepts=priorities.prioritized_concepts,
             original_text=text_content,
             num_cards=str(num_cards),
         )
 
         return generated.flashcards
+
+    def _run_stage(
+        self,
+        name: str,
+        memo: Optional[StageMemo],
+        stage: Callable[..., Any],
+        output_fields: List[str],
+        **inputs: Any,
+    ) -> dspy.Prediction:
+        """Run a pipeline stage, serving it from ``memo`` when the same inputs were seen before"""
+        if memo is None:
+            return self._invoke(name, stage, **inputs)
+
+        key = memo.make_key(self._primary_model(), **inputs)
+        cached = memo.get(key)
+        if cached is not None:
+            self.served_by[name] = "memo"
+            return dspy.Prediction(**cached)
+
+        prediction = self._invoke(name, stage, **inputs)
+        outputs: Dict[str, Any] = {field: getattr(prediction, field) for field in output_fields}
+        memo.set(key, outputs)
+        return prediction
+
+
+class FastTextToFlashcards(_StagedModule):
+    """
+    Single-call variant of TextToFlashcards for short inputs.
+
+    Analysis, prioritization and generation are fused into one signature so the
+    whole request costs one LLM round trip.
+    """
+
+    def __init__(self, invoker: Optional[ResilientInvoker] = None, models: Optional[List[str]] = None):
+        super().__init__(invoker, models)
+        self.generate = dspy.Predict(FusedFlashcardGeneration)
+
+    def forward(self, text_content: str, num_cards: int = 5) -> List[Flashcard]:
+        """
+        Generate flashcards from text content in a single LLM call.
+
+        Args:
+            text_content: The text to convert into flashcards
+            num_cards: Approximate number of flashcards to generate (default: 5)
+
+        Returns:
+            List of Flashcard objects with question, answer, explanation, and topic
+        """
+        generated = self._invoke("fused", self.generate, text_content=text_content, num_cards=str(num_cards))
+        return generated.flashcards
@@ -1,58 +1,298 @@
-import os
+import asyncio
+import re
+import time
 import uuid
-from typing import List
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
 
-import dspy
-from dotenv import load_dotenv
+from fcg.config.settings import Settings
+from fcg.exceptions import FlashcardGenerationError
+from fcg.schemas import ChatMessage, GenerationTier
+from fcg.services.database import db_service
+from fcg.services.generation_cache import GenerationCache
+from fcg.services.llm_client import LLMClient
+from fcg.utils.chunking import chunk_conversation, word_count
+from fcg.utils.llm_executor import LLMExecutor
+from fcg.utils.logging import logger
+from fcg.utils.single_flight import SingleFlight
+from fcg.utils.stage_memo import StageMemos
 
-from fcg.schemas import ChatMessage
-from fcg.utils.dspy_flashcard_generator import Flashcard, TextToFlashcards
+if TYPE_CHECKING:
+    from fcg.utils.dspy_flashcard_generator import Flashcard
 
-load_dotenv()
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-# Configure DSPy with OpenRouter
-lm = dspy.LM(
-    model=f"openrouter/{os.getenv('OPENROUTER_MODEL', 'qwen/qwen3-4b:free')}",
-    api_base="https://openrouter.ai/api/v1",
-    api_key=OPENROUTER_API_KEY,
-    max_tokens=int(os.getenv("OPENROUTER_MAX_TOKENS", "4096")),
-)
-dspy.configure(lm=lm)
+class GenerationContext:
+    """App-scoped state shared by every generation
+
+    The application builds one from its container singletons (see fcg.main),
+    which also shut them down. ``create`` builds a standalone context owning
+    its own pieces, for scripts and tests.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        llm_client: LLMClient,
+        executor: LLMExecutor,
+        cache: GenerationCache,
+        stage_memos: StageMemos,
+    ):
+        self.settings = settings
+        self.llm_client = llm_client
+        self.executor = executor
+        self.cache = cache
+        self.stage_memos = stage_memos
+        # Coalesces duplicate generations from the same user
+        self.flight = SingleFlight()
+
+    @classmethod
+    def create(cls, settings: Settings) -> "GenerationContext":
+        """Standalone context built from ``settings``"""
+        return cls(
+            settings,
+            LLMClient(settings),
+            LLMExecutor(
+                max_workers=settings.llm_max_workers,
+                max_queue=settings.llm_max_queue,
+                timeout=settings.llm_timeout_seconds,
+            ),
+            GenerationCache(
+                db_service,
+                ttl_seconds=settings.generation_cache_ttl_seconds,
+                max_entries=settings.generation_cache_max_entries,
+                enabled=settings.generation_cache_enabled,
+            ),
+            StageMemos(max_entries=settings.stage_memo_max_entries, ttl_seconds=settings.stage_memo_ttl_seconds),
+        )
+
+
+def resolve_generation_tier(
+    content: str, tier: GenerationTier = GenerationTier.AUTO, fast_tier_max_words: int = 600
+) -> GenerationTier:
+    """Pick the fast single-call tier for short inputs unless a tier was requested explicitly"""
+    if tier != GenerationTier.AUTO:
+        return tier
+    if len(content.split()) <= fast_tier_max_words:
+        return GenerationTier.FAST
+    return GenerationTier.FULL
 
 
-async def generate_flashcards(conversation: List[ChatMessage]) -> List[dict]:
+def _build_pipeline(tier: GenerationTier, context: GenerationContext, model: Optional[str] = None):
+    """Create the DSPy module and its cache version for a resolved tier"""
+    # DSPy takes about a second to import; only processes that generate load it
+    from fcg.utils.dspy_flashcard_generator import (
+        FAST_PIPELINE_VERSION,
+        PIPELINE_VERSION,
+        FastTextToFlashcards,
+        TextToFlashcards,
+    )
+
+    invoker = context.llm_client.invoker
+    models = context.llm_client.models_for(model)
+    if tier == GenerationTier.FAST:
+        return FastTextToFlashcards(invoker=invoker, models=models), FAST_PIPELINE_VERSION
+
+    # Full pipeline shares the stage memos across requests
+    memos = context.stage_memos
+    pipeline = TextToFlashcards(
+        analysis_memo=memos.analysis, priority_memo=memos.prioritization, invoker=invoker, models=models
+    )
+    return pipeline, PIPELINE_VERSION
+
+
+async def generate_flashcards(
+    conversation: List[ChatMessage],
+    context: GenerationContext,
+    bypass_cache: bool = False,
+    tier: GenerationTier = GenerationTier.AUTO,
+    model: Optional[str] = None,
+    num_cards: Optional[int] = None,
+) -> List[dict]:
     """
     Generate flashcards from the conversation using DSPy
+
+    Short inputs use a single fused LLM call and longer ones the full
+    analyze -> prioritize -> generate pipeline, unless ``tier`` forces one.
+    Inputs longer than ``chunk_max_words`` are split into chunks that are
+    generated concurrently and merged, so latency tracks the slowest chunk.
+    Results are cached by content hash. ``bypass_cache`` skips the lookup and
+    stores a fresh generation in place of any cached one. ``model`` overrides
+    the configured OpenRouter model for this call only. ``num_cards`` asks for
+    that many cards; by default it follows the input length.
     """
     # Combine all messages into one content string
     content = "\n".join([msg.content for msg in conversation])
 
     try:
-        # Initialize the DSPy flashcard generator
-        flashcard_generator = TextToFlashcards()
+        settings = context.settings
+        if word_count(content) <= settings.chunk_max_words:
+            cards = await _generate_for_text(content, context, tier, bypass_cache, model, num_cards)
+        else:
+            chunks = chunk_conversation(conversation, settings.chunk_max_words)
+            chunk_cards = _cards_per_chunk(num_cards, len(chunks))
+            results = await asyncio.gather(
+                *(_generate_for_text(chunk, context, tier, bypass_cache, model, chunk_cards) for chunk in chunks),
+                return_exceptions=True,
+            )
+            successful = [result for result in results if not isinstance(result, BaseException)]
+            if not successful:
+                raise results[0]
+            cards = merge_flashcards(successful, limit=_card_limit(settings, num_cards))
 
-        # Calculate approximate number of cards based on content length
-        # Rule of thumb: ~1 card per 100 words
-        word_count = len(content.split())
-        num_cards = max(3, min(10, word_count // 100))  # Between 3-10 cards
-
-        # Generate flashcards using DSPy
-        generated_flashcards: List[Flashcard] = flashcard_generator(text_content=content, num_cards=num_cards)
-
-        # Convert Pydantic models to dictionaries and add UUIDs
-        flashcards_dict = []
-        for card in generated_flashcards:
-            card_dict = {
-                "id": str(uuid.uuid4()),
-                "question": card.question,
-                "answer": card.answer,
-                "explanation": card.explanation if hasattr(card, "explanation") else "",
-                "topic": card.topic if hasattr(card, "topic") else "General",
-            }
-            flashcards_dict.append(card_dict)
-
-        return flashcards_dict
+        # Add fresh UUIDs so every response gets its own card ids
+        return [{"id": str(uuid.uuid4()), **card} for card in cards]
 
+    except FlashcardGenerationError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error generating flashcards with DSPy: {e}") from e
+
+
+async def stream_flashcards(
+    conversation: List[ChatMessage],
+    context: GenerationContext,
+    bypass_cache: bool = False,
+    tier: GenerationTier = GenerationTier.AUTO,
+    model: Optional[str] = None,
+    num_cards: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Yield flashcards as soon as the chunk they belong to has been generated
+
+    Chunks run concurrently exactly as in ``generate_flashcards``, but cards are
+    yielded in completion order instead of being merged at the end. Duplicate
+    questions across chunks are skipped.
+    """
+    content = "\n".join([msg.content for msg in conversation])
+    settings = context.settings
+    if word_count(content) <= settings.chunk_max_words:
+        chunks = [content]
+    else:
+        chunks = chunk_conversation(conversation, settings.chunk_max_words)
+
+    chunk_cards = _cards_per_chunk(num_cards, len(chunks))
+    limit = _card_limit(settings, num_cards)
+    tasks = [
+        asyncio.ensure_future(_generate_for_text(chunk, context, tier, bypass_cache, model, chunk_cards)) for chunk in chunks
+    ]
+    seen = set()
+    emitted = 0
+    failures: List[BaseException] = []
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                cards = await next_done
+            except Exception as e:
+                failures.append(e)
+                continue
+
+            for card in cards:
+                key = _normalize_question(card.get("question", ""))
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                yield {"id": str(uuid.uuid4()), **card}
+                emitted += 1
+                if emitted >= limit:
+                    return
+
+        if failures and not emitted:
+            error = failures[0]
+            if isinstance(error, FlashcardGenerationError):
+                raise error
+            raise RuntimeError(f"Error generating flashcards with DSPy: {error}") from error
+    finally:
+        # Client went away or the card limit was hit: stop outstanding chunks
+        for task in tasks:
+            task.cancel()
+
+
+async def _generate_for_text(
+    content: str,
+    context: GenerationContext,
+    tier: GenerationTier,
+    bypass_cache: bool,
+    model: Optional[str] = None,
+    num_cards: Optional[int] = None,
+) -> List[dict]:
+    """Generate flashcards for one piece of text, going through the cache and the LLM executor"""
+    llm_client = context.llm_client
+    model_name = llm_client.model_name(model)
+
+    # Initialize the DSPy flashcard generator for the selected tier
+    tier = resolve_generation_tier(content, tier, context.settings.fast_tier_max_words)
+    flashcard_generator, pipeline_version = _build_pipeline(tier, context, model)
+
+    if num_cards is None:
+        # Calculate approximate number of cards based on content length
+        # Rule of thumb: ~1 card per 100 words
+        num_cards = max(3, min(10, word_count(content) // 100))  # Between 3-10 cards
+
+    cache = context.cache
+    cache_key = cache.make_key(content, model_name, num_cards, pipeline_version)
+    cached = None if bypass_cache else await cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Stage retries must fit in the executor's timeout, which covers the whole run
+    if context.executor.timeout is not None:
+        flashcard_generator.deadline_at = time.monotonic() + context.executor.timeout
+
+    # Generate flashcards using DSPy on the LLM executor so the event loop stays free
+    generated_flashcards: List["Flashcard"] = await context.executor.run(
+        flashcard_generator, text_content=content, num_cards=num_cards
+    )
+
+    # Record which model actually produced the cards (fallbacks may have kicked in)
+    served_by: Dict[str, str] = getattr(flashcard_generator, "served_by", {})
+    if served_by:
+        logger.info("Generation served by %s", served_by)
+    served_model = llm_client.model_name(served_by.get("generation") or served_by.get("fused") or model)
+
+    cards = [
+        {
+            "question": card.question,
+            "answer": card.answer,
+            "explanation": card.explanation if hasattr(card, "explanation") else "",
+            "topic": card.topic if hasattr(card, "topic") else "General",
+            "model": served_model,
+        }
+        for card in generated_flashcards
+    ]
+    await cache.set(cache_key, cards, model=model_name, num_cards=num_cards, pipeline_version=pipeline_version)
+    return cards
+
+
+def _cards_per_chunk(num_cards: Optional[int], chunk_count: int) -> Optional[int]:
+    """Share of a requested card count each chunk generates; None keeps the length-based default"""
+    if num_cards is None:
+        return None
+    return max(1, -(-num_cards // chunk_count))
+
+
+def _card_limit(settings: Settings, num_cards: Optional[int]) -> int:
+    """Most cards one request returns"""
+    if num_cards is None:
+        return settings.max_cards_per_request
+    return min(num_cards, settings.max_cards_per_request)
+
+
+def merge_flashcards(card_lists: List[List[dict]], limit: Optional[int] = None) -> List[dict]:
+    """Merge per-chunk results in order, dropping cards whose question was already seen"""
+    merged: List[dict] = []
+    seen = set()
+    for cards in card_lists:
+        for card in cards:
+            key = _normalize_question(card.get("question", ""))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(card)
+            if limit and len(merged) >= limit:
+                return merged
+    return merged
+
+
+def _normalize_question(question: str) -> str:
+    """Lowercase and strip punctuation so near-identical questions compare equal"""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
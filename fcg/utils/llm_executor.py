@@ -0,0 +1,123 @@
+"""
+Bounded executor for blocking LLM calls.
+
+DSPy modules are synchronous, so calling them from an ``async def`` freezes the
+event loop for the whole LLM round trip. ``LLMExecutor`` runs them on a
+dedicated thread pool instead:
+
+- ``max_workers`` caps how many LLM calls run at the same time
+- ``max_queue`` bounds how many calls may wait for a free worker
+- ``timeout`` is a per-call deadline measured from submission, so it includes
+  time spent waiting in the queue
+
+A call that times out or whose caller is cancelled while still queued is
+cancelled. A call that is already running cannot be interrupted; its result
+is discarded and the worker is freed once the underlying HTTP request returns.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fcg.exceptions import GenerationCapacityError, GenerationTimeoutError
+
+
+class LLMExecutor:
+    """Thread pool with a concurrency cap, queue-depth gauge and per-call timeout"""
+
+    def __init__(self, max_workers: int = 16, max_queue: int = 256, timeout: Optional[float] = 120.0):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool and await its result.
+
+        Raises:
+            GenerationCapacityError: If the queue is already full
+            GenerationTimeoutError: If the call does not finish within the timeout
+        """
+        with self._lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                self._rejected += 1
+                raise GenerationCapacityError(
+                    "LLM queue is full, try again later",
+                    details={"queued": self._queued, "max_queue": self.max_queue},
+                )
+            self._queued += 1
+
+        future = self._pool.submit(self._call, functools.partial(fn, *args, **kwargs))
+        deadline = self.timeout if timeout is None else timeout
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=deadline)
+        except asyncio.TimeoutError as e:
+            with self._lock:
+                self._timed_out += 1
+            self._dequeue(future)
+            raise GenerationTimeoutError(
+                f"LLM call did not finish within {deadline} seconds",
+                details={"timeout": deadline},
+            ) from e
+        except asyncio.CancelledError:
+            # The caller went away (e.g. a client disconnect); _call never runs for a cancelled call
+            self._dequeue(future)
+            raise
+
+    def _dequeue(self, future: Future):
+        """Drop a call that is still waiting for a worker from the queue"""
+        with self._lock:
+            # cancel() is also True when wrap_future already cancelled it, never when _call started
+            if future.cancel():
+                self._queued -= 1
+
+    def _call(self, fn: Callable[[], Any]) -> Any:
+        """Worker-side wrapper that keeps the gauges up to date"""
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            result = fn()
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        else:
+            with self._lock:
+                self._completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of executor gauges and counters"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "timeout": self.timeout,
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timed_out": self._timed_out,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work and release the worker threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,262 @@
+"""
+Resilient invocation of DSPy pipeline stages.
+
+Free OpenRouter models have a heavy latency tail and frequent 429/5xx errors.
+``ResilientInvoker`` wraps each stage call with:
+
+- a per-stage deadline, cut short by the overall deadline of the run
+- retries with jittered exponential backoff for transient errors
+- an optional hedged duplicate request once the stage's observed p95 latency
+  has passed without an answer
+- an ordered fallback list of models, tried when the current one keeps failing
+
+Each successful call reports which model actually served it.
+"""
+
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from fcg.exceptions import FlashcardGenerationError, GenerationTimeoutError
+from fcg.utils.logging import logger
+
+# HTTP statuses worth retrying on the same model
+RETRIABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+_RETRIABLE_NAME_HINTS = ("RateLimit", "Timeout", "ServerError", "ServiceUnavailable", "Transport", "Connection")
+
+
+class StageDeadlineExceeded(Exception):
+    """Raised internally when a single stage attempt misses its deadline"""
+
+
+def is_retriable(error: BaseException) -> bool:
+    """Whether an LLM error is transient and worth retrying on the same model"""
+    if isinstance(error, StageDeadlineExceeded):
+        return True
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRIABLE_STATUSES or status >= 500
+    return any(hint in type(error).__name__ for hint in _RETRIABLE_NAME_HINTS)
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies for one stage"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Latency at quantile ``q`` or None until ``min_samples`` were recorded"""
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientInvoker:
+    """Call DSPy predictors with deadlines, backoff, hedging and model fallback"""
+
+    def __init__(
+        self,
+        models: List[str],
+        lm_factory: Callable[[str], Any],
+        stage_deadlines: Optional[Dict[str, float]] = None,
+        default_deadline: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedging_enabled: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_samples: int = 20,
+        max_workers: int = 32,
+    ):
+        if not models:
+            raise ValueError("At least one model is required")
+
+        self.models = models
+        self.lm_factory = lm_factory
+        self.stage_deadlines = stage_deadlines or {}
+        self.default_deadline = default_deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedging_enabled = hedging_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-stage")
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self._served: Counter = Counter()
+        self._retries = 0
+        self._hedges = 0
+        self._fallbacks = 0
+
+    def call(
+        self,
+        stage: str,
+        predictor: Callable[..., Any],
+        *,
+        models: Optional[List[str]] = None,
+        deadline_at: Optional[float] = None,
+        **inputs: Any,
+    ) -> Tuple[Any, str]:
+        """Run ``predictor(**inputs)`` for ``stage``, trying ``models`` (default: the configured list) in order.
+
+        ``deadline_at`` is the ``time.monotonic()`` time by which the whole run
+        must finish. Each attempt gets the stage deadline or what is left of
+        that budget, whichever is shorter, and no retry or fallback starts
+        once less than one stage deadline is left.
+
+        Returns:
+            Tuple of the prediction and the name of the model that served it
+
+        Raises:
+            GenerationTimeoutError: If the last failure was a missed deadline
+            FlashcardGenerationError: If every model failed
+        """
+        models = models or self.models
+        stage_deadline = self.stage_deadlines.get(stage, self.default_deadline)
+        errors: List[str] = []
+        last_error: Optional[BaseException] = None
+        out_of_time = False
+
+        for model_index, model in enumerate(models):
+            if model_index:
+                if not self._has_budget(deadline_at, stage_deadline):
+                    out_of_time = True
+                    break
+                self._count("_fallbacks")
+                logger.warning("Stage %s falling back to model %s", stage, model)
+
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    backoff = self._backoff(attempt)
+                    if not self._has_budget(deadline_at, stage_deadline + backoff):
+                        out_of_time = True
+                        break
+                    self._count("_retries")
+                    time.sleep(backoff)
+                deadline = stage_deadline
+                if deadline_at is not None:
+                    deadline = min(stage_deadline, deadline_at - time.monotonic())
+                    if deadline <= 0:
+                        out_of_time = True
+                        break
+                try:
+                    prediction = self._attempt(stage, model, predictor, inputs, deadline)
+                except Exception as e:
+                    last_error = e
+                    errors.append(f"{model} attempt {attempt + 1}: {type(e).__name__}: {e}")
+                    logger.warning("Stage %s failed on %s (attempt %d): %s", stage, model, attempt + 1, e)
+                    if not is_retriable(e):
+                        break
+                    continue
+
+                with self._lock:
+                    self._served[model] += 1
+                logger.info("Stage %s served by %s", stage, model)
+                return prediction, model
+
+            if out_of_time:
+                break
+
+        details = {"stage": stage, "models": models, "errors": errors}
+        if out_of_time:
+            logger.warning("Stage %s stopped retrying: not enough of the overall deadline left", stage)
+            raise GenerationTimeoutError(f"Stage {stage} ran out of its overall time budget", details=details)
+        if isinstance(last_error, StageDeadlineExceeded):
+            raise GenerationTimeoutError(f"Stage {stage} missed its deadline on every model", details=details)
+        raise FlashcardGenerationError(f"Stage {stage} failed on every model: {last_error}", details=details) from last_error
+
+    def _attempt(self, stage: str, model: str, predictor: Callable[..., Any], inputs: Dict[str, Any], deadline: float) -> Any:
+        """One attempt on one model, optionally hedged, bounded by ``deadline`` seconds"""
+        started = time.monotonic()
+        futures = {self._pool.submit(self._run, model, predictor, inputs)}
+
+        hedge_after = self._hedge_delay(stage)
+        if hedge_after is not None and hedge_after < deadline:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                self._count("_hedges")
+                futures.add(self._pool.submit(self._run, model, predictor, inputs))
+
+        remaining = deadline - (time.monotonic() - started)
+        while futures and remaining > 0:
+            done, futures = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._tracker(stage).record(time.monotonic() - started)
+                    self._cancel(futures)
+                    return future.result()
+                error = future.exception()
+            if not futures:
+                raise error
+            remaining = deadline - (time.monotonic() - started)
+
+        self._cancel(futures)
+        raise StageDeadlineExceeded(f"Stage {stage} exceeded its {deadline:.1f}s deadline on {model}")
+
+    @staticmethod
+    def _has_budget(deadline_at: Optional[float], needed: float) -> bool:
+        """Whether at least ``needed`` seconds are left before ``deadline_at``"""
+        return deadline_at is None or deadline_at - time.monotonic() >= needed
+
+    def _run(self, model: str, predictor: Callable[..., Any], inputs: Dict[str, Any]) -> Any:
+        """Worker-side call with the model bound to this thread's DSPy context"""
+        # Imported here so the app does not load DSPy until the first generation
+        import dspy
+
+        with dspy.context(lm=self.lm_factory(model)):
+            return predictor(**inputs)
+
+    def _hedge_delay(self, stage: str) -> Optional[float]:
+        if not self.hedging_enabled:
+            return None
+        return self._tracker(stage).percentile(self.hedge_percentile, self.hedge_min_samples)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def _tracker(self, stage: str) -> LatencyTracker:
+        with self._lock:
+            if stage not in self._latencies:
+                self._latencies[stage] = LatencyTracker()
+            return self._latencies[stage]
+
+    @staticmethod
+    def _cancel(futures: "set[Future]"):
+        # Running calls cannot be interrupted; their results are simply ignored
+        for future in futures:
+            future.cancel()
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def shutdown(self):
+        """Stop accepting calls; in-flight attempts finish in the background"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of served-by counts, retry/hedge/fallback counters and stage p95s"""
+        with self._lock:
+            stages = dict(self._latencies)
+            snapshot: Dict[str, Any] = {
+                "models": list(self.models),
+                "served_by": dict(self._served),
+                "retries": self._retries,
+                "hedges": self._hedges,
+                "fallbacks": self._fallbacks,
+            }
+        snapshot["p95_seconds"] = {stage: tracker.percentile(0.95) for stage, tracker in stages.items()}
+        return snapshot
@@ -0,0 +1,46 @@
+"""
+Single-flight coalescing for identical concurrent async calls.
+
+While a call for a given key is in flight, later callers with the same key
+await the same task instead of starting their own. The shared task is
+shielded, so a caller that disconnects does not cancel the work for the others.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key"""
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+        self._leaders = 0
+        self._followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Run ``fn`` once per key at a time.
+
+        Returns:
+            Tuple of the result and whether it was shared from another caller's call
+        """
+        existing = self._calls.get(key)
+        if existing is not None:
+            self._followers += 1
+            return await asyncio.shield(existing), True
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        self._leaders += 1
+        return await asyncio.shield(task), False
+
+    def _forget(self, key: str, task: "asyncio.Future[Any]"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of in-flight keys and coalescing counters"""
+        return {"in_flight": len(self._calls), "leaders": self._leaders, "coalesced": self._followers}
@@ -0,0 +1,84 @@
+"""
+In-process memo store for individual DSPy pipeline stages.
+
+The analysis and prioritization stages of ``TextToFlashcards`` only depend on
+the input text, not on how many cards are requested. Memoizing their outputs
+means a regeneration with a different card count only pays for the final
+generation call.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class StageMemo:
+    """Thread-safe LRU store with TTL for one pipeline stage"""
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def make_key(self, model: str, **inputs: Any) -> str:
+        """Build a key from the model name and the stage inputs"""
+        payload = json.dumps([self.name, model, inputs], sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return memoized stage outputs or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return dict(entry[1])
+
+    def set(self, key: str, outputs: Dict[str, Any]):
+        """Store stage outputs, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), dict(outputs))
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all memoized entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of memo size and hit/miss counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+class StageMemos:
+    """Memo stores for the num_cards-independent stages of ``TextToFlashcards``"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        self.analysis = StageMemo("analysis", max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.prioritization = StageMemo("prioritization", max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of every stage memo"""
+        return {memo.name: memo.stats() for memo in (self.analysis, self.prioritization)}